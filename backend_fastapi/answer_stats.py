@@ -0,0 +1,344 @@
+"""
+Накопительная статистика ответов: по всем интервью, темам и вопросам
+
+Каждый ответ обновляет несколько счетчиков (количество, сумма, сумма
+квадратов, минимум, максимум, гистограмма) - за O(1), без хранения самих
+ответов. Из них считаются среднее и стандартное отклонение оценки,
+доля верных ответов, распределение time_spent, а по вопросам - средняя
+оценка для калибровки заявленной сложности. /api/stats отдает их из
+памяти вместо GROUP BY по всем строкам InterviewAnswer.
+
+С db_path прирост раз в flush_interval секунд добавляется в SQLite базу
+(общую для воркеров и переживающую перезапуск), после чего из нее
+перечитываются итоги всех воркеров: статистика одного воркера отстает от
+остальных не больше чем на flush_interval.
+"""
+
+import asyncio
+import bisect
+import logging
+import math
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from persistence import CORRECT_SCORE
+
+logger = logging.getLogger(__name__)
+
+SCOPE_ALL = "all"
+SCOPE_TOPIC = "topic"
+SCOPE_QUESTION = "question"
+SCOPE_INTERVIEW = "interview"
+
+# Верхние границы корзин гистограмм (последняя корзина - все, что больше)
+BUCKETS: Dict[str, Tuple[float, ...]] = {
+    "score": tuple(range(11)),
+    "time_spent": (5, 10, 30, 60, 120, 300, 600),
+    "percentage": (10, 20, 30, 40, 50, 60, 70, 80, 90, 100),
+    "correct": (),
+}
+
+# (scope, key, metric)
+StatKey = Tuple[str, str, str]
+
+
+class RunningStat:
+    """Счетчики одной величины; складываются между воркерами"""
+
+    __slots__ = ("count", "total", "total_sq", "min", "max", "buckets")
+
+    def __init__(self, bucket_count: int):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.buckets = [0] * bucket_count
+
+    def add(self, value: float, bucket: int) -> None:
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if self.buckets:
+            self.buckets[bucket] += 1
+
+    def merge(self, other: "RunningStat") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+
+    def to_dict(self, bounds: Tuple[float, ...]) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0, "mean": None, "stddev": None, "min": None, "max": None}
+        mean = self.total / self.count
+        # Сумма квадратов в float: отрицательная дисперсия - ошибка округления
+        variance = max(self.total_sq / self.count - mean * mean, 0.0)
+        result = {
+            "count": self.count,
+            "mean": round(mean, 4),
+            "stddev": round(math.sqrt(variance), 4),
+            "min": self.min,
+            "max": self.max,
+        }
+        if bounds:
+            # Счетчики по корзинам, не накопительные: корзина - значения в (gt, le]
+            result["histogram"] = [
+                {"gt": lower, "le": upper, "count": count}
+                for lower, upper, count in zip(("-Inf", *bounds), (*bounds, "+Inf"), self.buckets)
+            ]
+        return result
+
+
+def _new_stat(metric: str) -> RunningStat:
+    bounds = BUCKETS[metric]
+    return RunningStat(len(bounds) + 1 if bounds else 0)
+
+
+class AnswerStatsStore:
+    """Накопительные счетчики в памяти процесса и необязательная SQLite база для итогов всех воркеров"""
+
+    def __init__(self, db_path: Optional[str] = None, flush_interval: float = 30.0):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        # Итоги из базы на момент последнего flush (все воркеры)
+        self._base: Dict[StatKey, RunningStat] = {}
+        # Прирост этого воркера: еще не записанный и записываемый сейчас
+        self._delta: Dict[StatKey, RunningStat] = {}
+        self._flushing: Dict[StatKey, RunningStat] = {}
+        # Темы отдельно: обзор не перебирает счетчики вопросов
+        self._topics: set = set()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+        self.flushes = 0
+        self.flush_errors = 0
+
+        if db_path:
+            self._open_db(db_path)
+            self._base = self._disk_load()
+            self._topics.update(key for scope, key, _ in self._base if scope == SCOPE_TOPIC)
+
+    def _open_db(self, db_path: str) -> None:
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answer_stats ("
+            " scope TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " metric TEXT NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " total REAL NOT NULL,"
+            " total_sq REAL NOT NULL,"
+            " min REAL NOT NULL,"
+            " max REAL NOT NULL,"
+            " PRIMARY KEY (scope, key, metric))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answer_stats_buckets ("
+            " scope TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " metric TEXT NOT NULL,"
+            " bucket INTEGER NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " PRIMARY KEY (scope, key, metric, bucket))"
+        )
+
+    async def start(self) -> None:
+        if self._db is not None and self._flusher is None and self.flush_interval > 0:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        if self._db is not None:
+            await self.flush()
+            self._db.close()
+            self._db = None
+
+    # Запись
+
+    def _add(self, scope: str, key: str, metric: str, value: float, bucket: int) -> None:
+        stat_key = (scope, key, metric)
+        stat = self._delta.get(stat_key)
+        if stat is None:
+            stat = self._delta[stat_key] = _new_stat(metric)
+            if scope == SCOPE_TOPIC or (scope == SCOPE_INTERVIEW and key):
+                self._topics.add(key)
+        stat.add(value, bucket)
+
+    def record_answer(self, topic: str, question_id: str, score: int, time_spent: Optional[int]) -> None:
+        """Учесть оцененный ответ (O(1): три набора счетчиков по три величины)"""
+        score_bucket = bisect.bisect_left(BUCKETS["score"], score)
+        correct = 1 if score >= CORRECT_SCORE else 0
+        time_bucket = bisect.bisect_left(BUCKETS["time_spent"], time_spent) if time_spent is not None else 0
+        for scope, key in ((SCOPE_ALL, ""), (SCOPE_TOPIC, topic), (SCOPE_QUESTION, question_id)):
+            self._add(scope, key, "score", score, score_bucket)
+            self._add(scope, key, "correct", correct, 0)
+            if time_spent is not None:
+                self._add(scope, key, "time_spent", time_spent, time_bucket)
+
+    def record_interview(self, topic: str, percentage: float) -> None:
+        """Учесть завершенное интервью (итоговый процент)"""
+        bucket = bisect.bisect_left(BUCKETS["percentage"], percentage)
+        self._add(SCOPE_INTERVIEW, "", "percentage", percentage, bucket)
+        self._add(SCOPE_INTERVIEW, topic, "percentage", percentage, bucket)
+
+    # Чтение
+
+    def _stat(self, stat_key: StatKey) -> Optional[RunningStat]:
+        parts = [part[stat_key] for part in (self._base, self._flushing, self._delta) if stat_key in part]
+        if not parts:
+            return None
+        if len(parts) == 1:
+            return parts[0]
+        stat = _new_stat(stat_key[2])
+        for part in parts:
+            stat.merge(part)
+        return stat
+
+    def metric(self, scope: str, key: str, metric: str) -> Dict[str, Any]:
+        stat = self._stat((scope, key, metric))
+        return (stat or _new_stat(metric)).to_dict(BUCKETS[metric])
+
+    def _answers(self, scope: str, key: str) -> Dict[str, Any]:
+        correct = self._stat((scope, key, "correct"))
+        return {
+            "answers": correct.count if correct is not None else 0,
+            "correct_ratio": round(correct.total / correct.count, 4) if correct is not None and correct.count else None,
+            "score": self.metric(scope, key, "score"),
+            "time_spent": self.metric(scope, key, "time_spent"),
+        }
+
+    def topics(self) -> List[str]:
+        return sorted(self._topics)
+
+    def overview(self) -> Dict[str, Any]:
+        """Все ответы, по темам и завершенные интервью (число тем, а не ответов)"""
+        topics = self.topics()
+        return {
+            **self._answers(SCOPE_ALL, ""),
+            "interviews": self.metric(SCOPE_INTERVIEW, "", "percentage"),
+            "topics": {
+                topic: {
+                    **self._answers(SCOPE_TOPIC, topic),
+                    "interviews": self.metric(SCOPE_INTERVIEW, topic, "percentage"),
+                }
+                for topic in topics
+            },
+        }
+
+    def question(self, question_id: str) -> Dict[str, Any]:
+        return self._answers(SCOPE_QUESTION, question_id)
+
+    # Запись в базу
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка записи статистики ответов: {e}")
+
+    async def flush(self) -> int:
+        """Добавить прирост в базу и перечитать итоги всех воркеров; возвращает число записанных счетчиков"""
+        if self._db is None:
+            return 0
+        async with self._flush_lock:
+            self._flushing, self._delta = self._delta, {}
+            try:
+                base = await asyncio.to_thread(self._disk_flush, self._flushing)
+            except Exception:
+                self.flush_errors += 1
+                # Прирост не теряем: вернется в следующий flush
+                for stat_key, stat in self._flushing.items():
+                    current = self._delta.get(stat_key)
+                    if current is None:
+                        self._delta[stat_key] = stat
+                    else:
+                        current.merge(stat)
+                self._flushing = {}
+                raise
+            written = len(self._flushing)
+            self._base, self._flushing = base, {}
+            self._topics.update(key for scope, key, _ in base if scope == SCOPE_TOPIC)
+            self.flushes += 1
+            return written
+
+    def _disk_flush(self, delta: Dict[StatKey, RunningStat]) -> Dict[StatKey, RunningStat]:
+        with self._db_lock:
+            if delta:
+                self._db.execute("BEGIN")
+                try:
+                    self._db.executemany(
+                        "INSERT INTO answer_stats (scope, key, metric, count, total, total_sq, min, max)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                        " ON CONFLICT (scope, key, metric) DO UPDATE SET"
+                        " count = count + excluded.count,"
+                        " total = total + excluded.total,"
+                        " total_sq = total_sq + excluded.total_sq,"
+                        " min = MIN(min, excluded.min),"
+                        " max = MAX(max, excluded.max)",
+                        [(*stat_key, s.count, s.total, s.total_sq, s.min, s.max) for stat_key, s in delta.items()],
+                    )
+                    self._db.executemany(
+                        "INSERT INTO answer_stats_buckets (scope, key, metric, bucket, count)"
+                        " VALUES (?, ?, ?, ?, ?)"
+                        " ON CONFLICT (scope, key, metric, bucket) DO UPDATE SET count = count + excluded.count",
+                        [
+                            (*stat_key, bucket, count)
+                            for stat_key, s in delta.items()
+                            for bucket, count in enumerate(s.buckets) if count
+                        ],
+                    )
+                    self._db.execute("COMMIT")
+                except Exception:
+                    self._db.execute("ROLLBACK")
+                    raise
+            return self._disk_load_locked()
+
+    def _disk_load(self) -> Dict[StatKey, RunningStat]:
+        with self._db_lock:
+            return self._disk_load_locked()
+
+    def _disk_load_locked(self) -> Dict[StatKey, RunningStat]:
+        result: Dict[StatKey, RunningStat] = {}
+        rows = self._db.execute("SELECT scope, key, metric, count, total, total_sq, min, max FROM answer_stats")
+        for scope, key, metric, count, total, total_sq, low, high in rows:
+            if metric not in BUCKETS:
+                continue
+            stat = result[(scope, key, metric)] = _new_stat(metric)
+            stat.count, stat.total, stat.total_sq, stat.min, stat.max = count, total, total_sq, low, high
+        for scope, key, metric, bucket, count in self._db.execute(
+            "SELECT scope, key, metric, bucket, count FROM answer_stats_buckets"
+        ):
+            stat = result.get((scope, key, metric))
+            if stat is not None and bucket < len(stat.buckets):
+                stat.buckets[bucket] = count
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "disk_enabled": self._db is not None,
+            "counters": len(self._base) + len(self._delta),
+            "topics": len(self._topics),
+            "pending": len(self._delta),
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+        }
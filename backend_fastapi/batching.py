@@ -0,0 +1,182 @@
+"""
+Микро-батчинг оценок ответов перед отправкой в Ollama
+
+Оценки, пришедшие в течение короткого окна (max_wait), собираются в пачку,
+группируются по модели и отправляются подряд с ограниченным параллелизмом:
+модель не выгружается между запросами разных моделей, а Ollama получает
+равномерную загрузку вместо всплесков одиночных запросов.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from evaluation import AnswerEvaluation, evaluate_answer_in_session
+from llm_queue import current_priority
+from ollama_client import OllamaClient, OllamaGenerateResponse
+
+
+class EvaluationJob:
+    """Ожидающая оценка ответа"""
+
+    __slots__ = ("model", "question", "correct_answer", "answer", "context", "session_key", "future", "enqueued_at")
+
+    def __init__(self, model: str, question: str, correct_answer: str, answer: str, future: asyncio.Future,
+                 context: Optional[List[int]] = None, session_key: Optional[str] = None):
+        self.model = model
+        self.question = question
+        self.correct_answer = correct_answer
+        self.answer = answer
+        self.context = context
+        self.session_key = session_key
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class EvaluationBatcher:
+    """Планировщик, собирающий оценки в пачки и выполняющий их через OllamaClient"""
+
+    def __init__(self, client: OllamaClient, max_batch_size: int = 8, max_wait: float = 0.01, max_parallel: int = 4):
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_parallel = max_parallel
+        self._queue: "asyncio.Queue[EvaluationJob]" = asyncio.Queue()
+        self._parallel = asyncio.Semaphore(max_parallel)
+        self._collector: Optional[asyncio.Task] = None
+        # Задачи отправки пачек и их оценки (отмененная до старта задача свои оценки не завершит)
+        self._dispatches: Dict[asyncio.Task, List[EvaluationJob]] = {}
+        # Оценки, еще не дошедшие до очереди клиента (собираются в пачку или ждут max_parallel)
+        self.pending = 0
+
+        self.batches_total = 0
+        self.jobs_total = 0
+        self.batch_wait_total = 0.0
+
+    async def start(self) -> None:
+        if self._collector is None:
+            self._collector = asyncio.create_task(self._collect())
+
+    async def close(self) -> None:
+        """Остановить сбор пачек; невыполненные оценки завершаются ошибкой"""
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+        dispatches = dict(self._dispatches)
+        for task in dispatches:
+            task.cancel()
+        await asyncio.gather(*dispatches, return_exceptions=True)
+        for batch in dispatches.values():
+            self._fail(batch)
+        jobs = []
+        while not self._queue.empty():
+            jobs.append(self._queue.get_nowait())
+        self._fail(jobs)
+        self.pending = 0
+
+    @staticmethod
+    def _fail(jobs: List[EvaluationJob]) -> None:
+        for job in jobs:
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("Планировщик оценок остановлен"))
+
+    async def submit(self, model: str, question: str, correct_answer: str, answer: str) -> Optional[AnswerEvaluation]:
+        """Поставить оценку в очередь и дождаться результата"""
+        evaluation, _ = await self.submit_in_session(model, question, correct_answer, answer)
+        return evaluation
+
+    async def submit_in_session(
+        self, model: str, question: str, correct_answer: str, answer: str,
+        context: Optional[List[int]] = None, session_key: Optional[str] = None,
+    ) -> Tuple[Optional[AnswerEvaluation], OllamaGenerateResponse]:
+        """
+        Как submit, но с context интервью; возвращает и ответ модели (с новым context).
+        Если очередь клиента вместе с ожидающими здесь оценками заполнена - LLMOverloaded
+        """
+        if self._collector is None:
+            raise RuntimeError("Планировщик оценок не запущен")
+        self.client.admission_check(current_priority(), pending=self.pending)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(EvaluationJob(model, question, correct_answer, answer, future, context, session_key))
+        self.pending += 1
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.batches_total or 1
+        return {
+            "queued": self._queue.qsize(),
+            "pending": self.pending,
+            "batches_total": self.batches_total,
+            "jobs_total": self.jobs_total,
+            "batch_size_avg": round(self.jobs_total / batches, 2),
+            "batch_wait_avg": round(self.batch_wait_total / (self.jobs_total or 1), 4),
+            "max_batch_size": self.max_batch_size,
+            "max_wait": self.max_wait,
+        }
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Собранные оценки уже не в очереди и еще не в пачке: ожидающие не должны зависнуть
+                self.pending -= len(batch)
+                self._fail(batch)
+                raise
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches[task] = batch
+            task.add_done_callback(lambda done: self._dispatches.pop(done, None))
+
+    async def _dispatch(self, batch: List[EvaluationJob]) -> None:
+        now = time.perf_counter()
+        self.batches_total += 1
+        self.jobs_total += len(batch)
+        self.batch_wait_total += sum(now - job.enqueued_at for job in batch)
+
+        # Группы по модели идут друг за другом: запросы одной модели
+        # занимают слоты раньше следующей, и модель не перезагружается
+        groups: Dict[str, List[EvaluationJob]] = {}
+        for job in batch:
+            groups.setdefault(job.model, []).append(job)
+        jobs = [job for group in groups.values() for job in group]
+        try:
+            await asyncio.gather(*(self._run(job) for job in jobs))
+        finally:
+            self._fail(jobs)
+
+    async def _run(self, job: EvaluationJob) -> None:
+        try:
+            if job.future.done():
+                return
+            await self._parallel.acquire()
+        finally:
+            self.pending -= 1
+        try:
+            result = await evaluate_answer_in_session(
+                self.client, job.model, job.question, job.correct_answer, job.answer,
+                context=job.context, session_key=job.session_key,
+            )
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        finally:
+            self._parallel.release()
+        if not job.future.done():
+            job.future.set_result(result)
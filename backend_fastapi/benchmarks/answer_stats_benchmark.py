@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк накопительной статистики ответов
+
+Записывает --answers ответов в AnswerStatsStore и сравнивает чтение
+обзора (/api/stats: все ответы и по темам) и статистики вопроса с тем же
+расчетом GROUP BY по таблице ответов (SQLite в памяти, индекс по теме и
+вопросу - как InterviewAnswer). Затем замеряет flush прироста в файл.
+
+    python benchmarks/answer_stats_benchmark.py --answers 1000000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from common import print_table
+
+from answer_stats import AnswerStatsStore
+
+GROUP_BY_TOPICS = (
+    "SELECT topic, COUNT(*), AVG(score), AVG(score * score) - AVG(score) * AVG(score),"
+    " SUM(score >= 7), AVG(time_spent) FROM answers GROUP BY topic"
+)
+SCORE_HISTOGRAM = "SELECT topic, score, COUNT(*) FROM answers GROUP BY topic, score"
+GROUP_BY_QUESTION = (
+    "SELECT COUNT(*), AVG(score), AVG(score * score) - AVG(score) * AVG(score), SUM(score >= 7), AVG(time_spent)"
+    " FROM answers WHERE question_id = ?"
+)
+
+
+def generate(args, rng: random.Random):
+    for _ in range(args.answers):
+        topic = f"topic{rng.randrange(args.topics)}"
+        yield topic, f"{topic}-q{rng.randrange(args.questions)}", rng.randint(0, 10), rng.randint(5, 600)
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def run(args):
+    rng = random.Random(42)
+    rows = list(generate(args, rng))
+
+    path = os.path.join(tempfile.mkdtemp(prefix="answer_stats_"), "stats.db")
+    store = AnswerStatsStore(path, flush_interval=0)
+    started = time.perf_counter()
+    for topic, question_id, score, time_spent in rows:
+        store.record_answer(topic, question_id, score, time_spent)
+    record_us = (time.perf_counter() - started) / len(rows) * 1e6
+
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE answers (topic TEXT, question_id TEXT, score INTEGER, time_spent INTEGER)")
+    db.executemany("INSERT INTO answers VALUES (?, ?, ?, ?)", rows)
+    db.execute("CREATE INDEX answers_topic ON answers (topic)")
+    db.execute("CREATE INDEX answers_question ON answers (question_id)")
+    question_id = rows[0][1]
+
+    def group_by_overview():
+        db.execute(GROUP_BY_TOPICS).fetchall()
+        db.execute(SCORE_HISTOGRAM).fetchall()
+
+    result = [
+        {"query": "overview", "counters_ms": round(timed(store.overview, 200), 3),
+         "group_by_ms": round(timed(group_by_overview, 3), 3)},
+        {"query": "question", "counters_ms": round(timed(lambda: store.question(question_id), 200), 3),
+         "group_by_ms": round(timed(lambda: db.execute(GROUP_BY_QUESTION, (question_id,)).fetchall(), 20), 3)},
+    ]
+
+    counters = len(store._delta)
+    started = time.perf_counter()
+    await store.flush()
+    flush = {"answers": len(rows), "record_us": round(record_us, 3), "counters": counters,
+             "flush_ms": round((time.perf_counter() - started) * 1000, 1)}
+    await store.close()
+    return result, flush
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк накопительной статистики ответов")
+    parser.add_argument("--answers", type=int, default=1000000)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=200, help="Вопросов в каждой теме")
+    args = parser.parse_args()
+
+    print("📊 Статистика ответов: накопительные счетчики против GROUP BY")
+    print(f"   ответов: {args.answers}, тем: {args.topics}, вопросов в теме: {args.questions}")
+    print()
+    result, flush = asyncio.run(run(args))
+    print_table(result)
+    print()
+    print_table([flush])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк микро-батчинга оценок: пропускная способность и задержка
+при разных окнах сбора пачки
+
+Поток оценок для двух моделей отправляется в заглушку Ollama, которая
+тратит время на переключение модели. Строка "direct" - оценки без
+планировщика, как если бы каждый ответ отправлялся сразу.
+
+    python benchmarks/batching_benchmark.py --jobs 200 --rate 100
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from common import latency_summary, print_table
+
+from batching import EvaluationBatcher
+from evaluation import evaluate_answer
+from ollama_client import OllamaClient
+from ollama_stub import StubOllama
+
+MODELS = ["codellama:latest", "llama2:latest"]
+
+
+async def run_scenario(window_ms, args):
+    stub = StubOllama(
+        token_latency=args.token_latency_ms / 1000,
+        load_latency=args.load_latency_ms / 1000,
+        parallel=args.parallel,
+    )
+    base_url = await stub.start()
+    client = OllamaClient(base_url, max_concurrency=args.parallel, coalesce=False)
+    await client.start()
+    batcher = None
+    if window_ms is not None:
+        batcher = EvaluationBatcher(client, max_batch_size=args.batch_size, max_wait=window_ms / 1000, max_parallel=args.parallel)
+        await batcher.start()
+
+    rng = random.Random(42)
+    latencies = []
+
+    async def one(i):
+        model = rng.choice(MODELS)
+        started = time.perf_counter()
+        if batcher is not None:
+            await batcher.submit(model, f"Вопрос {i}", "Эталонный ответ", f"Ответ кандидата {i}")
+        else:
+            await evaluate_answer(client, model, f"Вопрос {i}", "Эталонный ответ", f"Ответ кандидата {i}")
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    tasks = []
+    for i in range(args.jobs):
+        tasks.append(asyncio.create_task(one(i)))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    row = {
+        "mode": "direct" if window_ms is None else f"window {window_ms:g}ms",
+        "throughput_rps": round(args.jobs / elapsed, 1),
+        **latency_summary(latencies),
+        "model_loads": stub.model_loads,
+        "batch_size_avg": batcher.stats()["batch_size_avg"] if batcher else 1,
+    }
+    if batcher is not None:
+        await batcher.close()
+    await client.close()
+    await stub.stop()
+    return row
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк микро-батчинга оценок")
+    parser.add_argument("--jobs", type=int, default=200, help="Число оценок в прогоне")
+    parser.add_argument("--rate", type=float, default=100.0, help="Средняя частота поступления оценок в секунду")
+    parser.add_argument("--windows", default="1,5,10,25,50", help="Окна сбора пачки в мс через запятую")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--parallel", type=int, default=4, help="Параллельные слоты Ollama")
+    parser.add_argument("--token-latency-ms", type=float, default=1.0)
+    parser.add_argument("--load-latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    print("📊 Микро-батчинг оценок ответов")
+    print(f"   оценок: {args.jobs}, поток: {args.rate:g}/с, моделей: {len(MODELS)}, слотов Ollama: {args.parallel}")
+    print()
+
+    rows = [await run_scenario(None, args)]
+    for window in args.windows.split(","):
+        rows.append(await run_scenario(float(window), args))
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
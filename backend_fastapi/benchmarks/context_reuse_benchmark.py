@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк переиспользования context модели в рамках интервью
+
+Несколько интервью идут одновременно, в каждом ответы оцениваются по
+очереди. Сценарии:
+
+    fresh  - каждая оценка с полным системным промптом;
+    reuse  - со второй оценки передается context предыдущей (SessionContextStore).
+
+Заглушка Ollama, как и настоящая, держит KV cache только в parallel
+слотах: если одновременных интервью больше, часть context вытесняется,
+и его приходится считать заново. Поэтому полезно прогнать и
+--sessions меньше --parallel, и больше (тогда хранилище должно
+перестать отдавать context - колонка gated).
+
+    python benchmarks/context_reuse_benchmark.py --sessions 4 --questions 8
+"""
+
+import argparse
+import asyncio
+import time
+
+from common import latency_summary, print_table
+
+from evaluation import evaluate_answer_in_session
+from ollama_client import OllamaClient
+from ollama_stub import StubOllama
+from session_context import SessionContextStore
+
+MODEL = "codellama:latest"
+CORRECT_ANSWER = (
+    "Замыкание - функция вместе с лексическим окружением, в котором она была объявлена. "
+    "Позволяет хранить приватное состояние и используется в фабриках и обработчиках событий."
+)
+
+
+async def run_scenario(name, args):
+    stub = StubOllama(
+        token_latency=args.token_latency_ms / 1000,
+        prompt_latency=args.prompt_latency_ms / 1000,
+        load_latency=0.0,
+        parallel=args.parallel,
+    )
+    url = await stub.start()
+    client = OllamaClient(url, max_concurrency=args.parallel, coalesce=False)
+    await client.start()
+    store = SessionContextStore(max_tokens_per_session=args.max_tokens)
+    latencies = []
+
+    async def interview(session: int):
+        key = f"interview-{session}"
+        for i in range(args.questions):
+            context = store.get(key, MODEL) if name == "reuse" else None
+            started = time.perf_counter()
+            _, response = await evaluate_answer_in_session(
+                client, MODEL, f"Вопрос {i}: что такое замыкание?", CORRECT_ANSWER,
+                f"Кандидат {session}, ответ {i}: функция, которая помнит переменные внешней области",
+                context=context, session_key=key,
+            )
+            latencies.append(time.perf_counter() - started)
+            store.record(key, MODEL, context, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(interview(s) for s in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    await client.close()
+    await stub.stop()
+
+    stats = store.stats()
+    prompt_tokens = (
+        stats["avg_prompt_tokens_fresh"] * stats["fresh_requests"]
+        + stats["avg_prompt_tokens_reused"] * stats["reused_requests"]
+    )
+    return {
+        "scenario": name,
+        "evaluations": len(latencies),
+        "elapsed_s": round(elapsed, 2),
+        **latency_summary(latencies),
+        "avg_prompt_tokens": round(prompt_tokens / len(latencies), 1),
+        "kv_hits": stub.context_hits,
+        "gated": stats["gated"],
+        "context_kb": round(stats["memory_bytes"] / 1024, 1),
+        "overflows": stats["overflows"],
+        "prompt_eval_saved_s": stats["prompt_eval_seconds_saved"],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк переиспользования context модели")
+    parser.add_argument("--sessions", type=int, default=4, help="Одновременных интервью")
+    parser.add_argument("--questions", type=int, default=8, help="Оценок в каждом интервью")
+    parser.add_argument("--parallel", type=int, default=4, help="Слотов (и KV cache) заглушки Ollama")
+    parser.add_argument("--token-latency-ms", type=float, default=1.0)
+    parser.add_argument("--prompt-latency-ms", type=float, default=40.0, help="На 100 токенов промпта")
+    parser.add_argument("--max-tokens", type=int, default=1536, help="Предел context на интервью")
+    args = parser.parse_args()
+
+    print("📊 Переиспользование context модели")
+    print(f"   интервью: {args.sessions}, оценок в каждом: {args.questions}, слотов Ollama: {args.parallel}")
+    print()
+
+    rows = [await run_scenario(name, args) for name in ("fresh", "reuse")]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк оценки по ключевым словам: стоимость одного вызова
+до (разбор эталона на каждый ответ) и после (заранее построенный индекс)
+
+    python benchmarks/keyword_scorer_benchmark.py --number 20000
+"""
+
+import argparse
+import timeit
+
+import common  # noqa: F401  (путь к модулям backend_fastapi)
+
+from keyword_scorer import KeywordIndex
+from main import questions_db
+
+ANSWERS = [
+    "var имеет функциональную область видимости, let и const имеют блочную область видимости, const нельзя переназначить",
+    "Замыкание - это функция, которая запоминает переменные внешней области видимости.",
+    "Event Loop позволяет выполнять асинхронные операции, не блокируя единственный поток JavaScript",
+    "не знаю",
+]
+
+
+def analyze_answer_simple_old(user_answer: str, correct_answer: str) -> int:
+    """Прежняя реализация из main.py: эталон разбирается при каждом вызове"""
+    user_words = set(user_answer.lower().split())
+    correct_words = set(correct_answer.lower().split())
+    common_words = user_words.intersection(correct_words)
+    if len(common_words) >= len(correct_words) * 0.7:
+        return 9
+    elif len(common_words) >= len(correct_words) * 0.5:
+        return 7
+    elif len(common_words) >= len(correct_words) * 0.3:
+        return 5
+    else:
+        return 3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микро-бенчмарк оценки по ключевым словам")
+    parser.add_argument("--number", type=int, default=20000, help="Число вызовов на замер")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--long-references", action="store_true", help="Удлинить эталонные ответы")
+    args = parser.parse_args()
+
+    questions = [q for topic_questions in questions_db.values() for q in topic_questions]
+    if args.long_references:
+        # Эталоны длиной в развернутый ответ: стоимость старой версии растет вместе с ними
+        extra = " ".join(q["correct_answer"] for q in questions)
+        questions = [{**q, "correct_answer": f"{q['correct_answer']} {extra}"} for q in questions]
+    pairs = [(q, answer) for q in questions for answer in ANSWERS]
+
+    build_time = min(timeit.repeat(lambda: KeywordIndex.from_questions(questions), number=100, repeat=args.repeat)) / 100
+    index = KeywordIndex.from_questions(questions)
+
+    def run_old():
+        for question, answer in pairs:
+            analyze_answer_simple_old(answer, question["correct_answer"])
+
+    def run_new():
+        for question, answer in pairs:
+            index.score(question, answer)
+
+    calls = args.number // len(pairs) or 1
+    old = min(timeit.repeat(run_old, number=calls, repeat=args.repeat)) / (calls * len(pairs))
+    new = min(timeit.repeat(run_new, number=calls, repeat=args.repeat)) / (calls * len(pairs))
+
+    print("📊 Оценка по ключевым словам, стоимость одного вызова")
+    print(f"   построение индекса ({len(questions)} вопросов): {build_time * 1e6:.1f} мкс (один раз)")
+    print(f"   было  (split эталона на каждый ответ): {old * 1e6:.2f} мкс")
+    print(f"   стало (индекс, стемминг, стоп-слова):   {new * 1e6:.2f} мкс")
+    print()
+    print("   Оценки (было -> стало):")
+    for question, answer in pairs:
+        print(f"   {question['id']}: {analyze_answer_simple_old(answer, question['correct_answer'])} -> "
+              f"{index.score(question, answer)}  {answer[:50]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест API интервью с заглушкой Ollama
+
+Виртуальные пользователи проходят полный сценарий: start -> (question ->
+answer)* -> end. Оценки генерирует детерминированная заглушка Ollama
+(ollama_stub.py) с заданной задержкой на токен, поэтому прогоны
+воспроизводимы и не требуют модели.
+
+Режимы:
+    asgi     - main.app в этом же процессе через httpx.ASGITransport
+               (без сети, видна стоимость самого приложения);
+    uvicorn  - заглушка и `uvicorn main:app` запускаются отдельными
+               процессами, запросы идут по HTTP через aiohttp (httpx
+               на реальном сокете сам становится узким местом).
+
+Отчет: RPS и p50/p95/p99 по каждому endpoint. С --thresholds результаты
+сравниваются с порогами (load_thresholds.json, рассчитаны на параметры
+по умолчанию), при регрессии код выхода 1. Время до первого SSE события
+(answer_stream_first_event) осмысленно только в режиме uvicorn:
+ASGITransport отдает тело ответа целиком. С --poll-reports кандидат после
+end опрашивает задание итогового отчета (report_ready - от end до отчета).
+
+    python benchmarks/load_test.py --mode asgi --users 200 --concurrency 50
+    python benchmarks/load_test.py --bank-size 2000 --think-time-ms 300 --no-prefetch
+    python benchmarks/load_test.py --users 400 --concurrency 200 --queue-max 16
+    python benchmarks/load_test.py --stream-ratio 0.5 --poll-reports
+    python benchmarks/load_test.py --mode uvicorn --workers 1 --stream-ratio 0.5 --thresholds benchmarks/load_thresholds.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from common import BACKEND_DIR, latency_summary, print_table
+
+import aiohttp
+import httpx
+
+from ollama_stub import StubOllama
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ANSWERS = [
+    "Замыкание - функция, которая запоминает переменные внешней области видимости",
+    "var имеет функциональную область видимости, let и const - блочную, const нельзя переназначить",
+    "Promise - объект для асинхронных операций с состояниями pending, fulfilled и rejected",
+    "Не знаю",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def write_question_bank(topic: str, size: int) -> str:
+    """Синтетический банк вопросов: у каждого вопроса своя подсказка, кеш подсказок холодный"""
+    levels = ("junior", "middle", "senior")
+    questions = [{
+        "id": f"load-q{i}",
+        "text": f"Вопрос {i}: объясните, как работает механизм номер {i} в JavaScript",
+        "topic": topic,
+        "difficulty": levels[i % len(levels)],
+        "correct_answer": f"Механизм {i} использует замыкания, промисы и event loop",
+    } for i in range(size)]
+    fd, path = tempfile.mkstemp(prefix="load_test_bank_", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({topic: questions}, f, ensure_ascii=False)
+    return path
+
+
+def app_environment(ollama_url: str, args) -> Dict[str, str]:
+    """Переменные окружения приложения под тест (читаются config.py при импорте)"""
+    return {
+        "QUESTION_BANK_PATH": args.bank_path or "",
+        "QUESTION_HINTS_ENABLED": "0" if args.no_hints else "1",
+        "QUESTION_PREFETCH_ENABLED": "0" if args.no_prefetch else "1",
+        "QUESTION_HINT_TIMEOUT": str(args.hint_timeout),
+        "OLLAMA_BASE_URL": ollama_url,
+        "PERSISTENCE_BACKEND": "memory",
+        "FEEDBACK_CACHE_DB_PATH": "",
+        "EMBEDDINGS_CACHE_PATH": "",
+        "SEMANTIC_SCORING_ENABLED": "1" if args.semantic else "0",
+        "EVALUATION_BATCHING_ENABLED": "0" if args.no_batching else "1",
+        "OLLAMA_CONTEXT_REUSE": "0" if args.no_context_reuse else "1",
+        "OLLAMA_QUEUE_MAX_INTERACTIVE": str(args.queue_max),
+        "REPORTS_ENABLED": "0" if args.no_reports else "1",
+    }
+
+
+class Recorder:
+    """Задержки и ошибки по endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def add(self, endpoint: str, started: float, ok: bool) -> None:
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for endpoint, values in self.latencies.items():
+            report[endpoint] = {
+                "requests": len(values),
+                "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+                "error_rate": round(self.errors[endpoint] / len(values), 4),
+                **latency_summary(values),
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        report["total"] = {
+            "requests": total,
+            "rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "error_rate": round(sum(self.errors.values()) / total, 4) if total else 0.0,
+            **latency_summary([x for v in self.latencies.values() for x in v]),
+        }
+        return report
+
+
+class HttpxClient:
+    """Клиент поверх httpx (используется с ASGITransport)"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+
+    async def request(self, method: str, path: str, **kwargs) -> Tuple[int, Any]:
+        response = await self.client.request(method, path, **kwargs)
+        # Без сети запрос может пройти, ни разу не отдав управление event loop,
+        # и фоновые задачи приложения (прогрев, батчинг) не получат времени
+        await asyncio.sleep(0)
+        return response.status_code, response.json()
+
+    @asynccontextmanager
+    async def stream(self, path: str, payload: dict) -> AsyncIterator[Tuple[int, AsyncIterator[str]]]:
+        async with self.client.stream("POST", path, json=payload) as response:
+            yield response.status_code, response.aiter_lines()
+
+
+class AiohttpClient:
+    """Клиент поверх aiohttp (реальный HTTP)"""
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+
+    async def request(self, method: str, path: str, **kwargs) -> Tuple[int, Any]:
+        async with self.session.request(method, path, **kwargs) as response:
+            return response.status, await response.json()
+
+    @asynccontextmanager
+    async def stream(self, path: str, payload: dict) -> AsyncIterator[Tuple[int, AsyncIterator[str]]]:
+        async def lines():
+            async for line in response.content:
+                yield line.decode("utf-8").rstrip("\r\n")
+
+        async with self.session.post(path, json=payload) as response:
+            yield response.status, lines()
+
+
+async def read_stream(client, payload: dict, recorder: Recorder) -> Tuple[int, Any]:
+    """Прочитать SSE ответ целиком; время до первого события пишется отдельно"""
+    started = time.perf_counter()
+    first_event = True
+    body = []
+    async with client.stream("/api/interview/answer/stream", payload) as (status, lines):
+        async for line in lines:
+            if status != 200:
+                body.append(line)
+            elif first_event and line.startswith("event:"):
+                recorder.add("answer_stream_first_event", started, True)
+                first_event = False
+    if status == 503:
+        return status, json.loads("".join(body))
+    recorder.add("answer_stream", started, status == 200)
+    return status, None
+
+
+async def send_answer(client, payload: dict, stream: bool, args, recorder: Recorder) -> None:
+    """
+    Отправить ответ; при 503 (очередь Ollama заполнена) повторить через
+    retry_after. Отказы пишутся отдельно (answer_rejected), ошибкой
+    считается только последний, после которого повторов не осталось
+    """
+    for attempt in range(args.max_retries + 1):
+        started = time.perf_counter()
+        if stream:
+            status, body = await read_stream(client, payload, recorder)
+        else:
+            status, body = await client.request("POST", "/api/interview/answer", json=payload)
+            if status != 503:
+                recorder.add("answer", started, status == 200)
+        if status != 503:
+            return
+        recorder.add("answer_rejected", started, attempt < args.max_retries)
+        if attempt == args.max_retries:
+            return
+        await asyncio.sleep(body.get("retry_after", 1) * args.retry_scale)
+
+
+async def user_flow(client, user: int, args, recorder: Recorder) -> None:
+    """Один кандидат: начать интервью, ответить на все вопросы, завершить"""
+    rng = random.Random(args.seed * 100003 + user)
+
+    started = time.perf_counter()
+    status, body = await client.request("POST", "/api/interview/start", json={
+        "topic": args.topic, "difficulty": "junior", "question_count": args.questions,
+    })
+    recorder.add("start", started, status == 200)
+    if status != 200:
+        return
+    interview_id = body["id"]
+
+    for _ in range(args.questions):
+        started = time.perf_counter()
+        status, body = await client.request("GET", "/api/interview/question", params={"interview_id": interview_id})
+        recorder.add("question", started, status == 200)
+        if status != 200:
+            break
+        question_id = body["question"]["id"]
+
+        if args.think_time_ms:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think_time_ms) / 1000)
+
+        # Часть ответов повторяется между кандидатами - как в жизни, это дает попадания в кеш оценок
+        answer = rng.choice(ANSWERS)
+        if rng.random() >= args.repeat_ratio:
+            answer = f"{answer} (кандидат {user})"
+        payload = {"interview_id": interview_id, "question_id": question_id, "answer": answer, "time_spent": 30}
+
+        await send_answer(client, payload, rng.random() < args.stream_ratio, args, recorder)
+
+    started = time.perf_counter()
+    status, body = await client.request("POST", "/api/interview/end", params={"interview_id": interview_id})
+    recorder.add("end", started, status == 200)
+    if status == 200 and args.poll_reports and body.get("report_job_id"):
+        await wait_report(client, body["report_job_id"], started, recorder)
+
+
+async def wait_report(client, job_id: str, started: float, recorder: Recorder, poll_interval: float = 0.05) -> None:
+    """Опрашивать задание итогового отчета до done/failed"""
+    while True:
+        status, body = await client.request("GET", "/api/interview/report", params={"job_id": job_id})
+        if status != 200 or body["status"] in ("done", "failed"):
+            recorder.add("report_ready", started, status == 200 and body["status"] == "done")
+            return
+        await asyncio.sleep(poll_interval)
+
+
+async def wait_models_warm(client, timeout: float = 60.0) -> None:
+    """Дождаться прогрева моделей: измеряем установившийся режим, а не старт"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, body = await client.request("GET", "/api/ollama/stats")
+        warmup = body.get("warmup") if status == 200 else None
+        states = [m["state"] for node in (warmup or {}).get("nodes", {}).values() for m in node.values()]
+        if all(state in ("warm", "missing") for state in states):
+            return
+        await asyncio.sleep(0.1)
+    print("⚠️ Модели не прогрелись, часть оценок пойдет без LLM")
+
+
+async def drive(client, args) -> Dict[str, Dict[str, float]]:
+    """Прогнать args.users сценариев, не более args.concurrency одновременно"""
+    recorder = Recorder()
+    limiter = asyncio.Semaphore(args.concurrency)
+
+    async def one(user):
+        async with limiter:
+            await user_flow(client, user, args, recorder)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(user) for user in range(args.users)))
+    return recorder.report(time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def asgi_target(args):
+    """main.app в этом процессе; заглушка Ollama в том же event loop"""
+    stub = StubOllama(token_latency=args.token_latency_ms / 1000, parallel=args.parallel, load_latency=0.0)
+    ollama_url = await stub.start()
+    os.environ.update(app_environment(ollama_url, args))
+
+    import main
+
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120.0) as client:
+                yield HttpxClient(client)
+    finally:
+        await stub.stop()
+
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Процесс завершился с кодом {process.returncode}: {' '.join(process.args)}")
+            try:
+                async with session.get(url) as response:
+                    await response.read()
+                return
+            except aiohttp.ClientConnectionError:
+                await asyncio.sleep(0.2)
+    raise TimeoutError(f"{url} не ответил за {timeout} с")
+
+
+@asynccontextmanager
+async def uvicorn_target(args):
+    """Заглушка и uvicorn отдельными процессами - клиент не делит с ними event loop"""
+    stub_port, app_port = free_port(), free_port()
+    stub_url, app_url = f"http://127.0.0.1:{stub_port}", f"http://127.0.0.1:{app_port}"
+    processes = []
+    try:
+        processes.append(subprocess.Popen([
+            sys.executable, os.path.join(BENCHMARKS_DIR, "ollama_stub.py"),
+            "--port", str(stub_port),
+            "--token-latency-ms", str(args.token_latency_ms),
+            "--load-latency-ms", "0",
+            "--parallel", str(args.parallel),
+        ]))
+        await wait_ready(f"{stub_url}/api/tags", processes[-1])
+
+        processes.append(subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--port", str(app_port), "--workers", str(args.workers),
+                "--log-level", "warning", "--no-access-log",
+            ],
+            cwd=BACKEND_DIR,
+            env={**os.environ, **app_environment(stub_url, args)},
+        ))
+        await wait_ready(f"{app_url}/", processes[-1])
+
+        connector = aiohttp.TCPConnector(limit=0)
+        timeout = aiohttp.ClientTimeout(total=120.0)
+        async with aiohttp.ClientSession(app_url, connector=connector, timeout=timeout) as session:
+            yield AiohttpClient(session)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def check_thresholds(report: Dict[str, Dict[str, float]], thresholds: Dict[str, Dict[str, float]]) -> List[str]:
+    """
+    Сравнить отчет с порогами вида {"endpoint": {"p95_ms": 50, "min_rps": 10, "max_error_rate": 0}}
+
+    Возвращает список нарушений (пустой - регрессии нет)
+    """
+    violations = []
+    for endpoint, limits in thresholds.items():
+        stats = report.get(endpoint)
+        if stats is None:
+            continue
+        for name, limit in limits.items():
+            if name == "min_rps":
+                if stats["rps"] < limit:
+                    violations.append(f"{endpoint}: rps {stats['rps']} < {limit}")
+            elif name == "max_error_rate":
+                if stats["error_rate"] > limit:
+                    violations.append(f"{endpoint}: error_rate {stats['error_rate']} > {limit}")
+            elif stats.get(name, 0.0) > limit:
+                violations.append(f"{endpoint}: {name} {stats[name]} > {limit}")
+    return violations
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    target = asgi_target(args) if args.mode == "asgi" else uvicorn_target(args)
+    async with target as client:
+        await wait_models_warm(client)
+        if args.warmup:
+            warmup = argparse.Namespace(**{**vars(args), "users": args.warmup})
+            await drive(client, warmup)
+        return await drive(client, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест API интервью")
+    parser.add_argument("--mode", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--users", type=int, default=200, help="Сколько интервью пройти")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных кандидатов")
+    parser.add_argument("--warmup", type=int, default=10, help="Интервью для прогрева (в отчет не входят)")
+    parser.add_argument("--topic", default="javascript-basics")
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--stream-ratio", type=float, default=0.0, help="Доля ответов через /answer/stream")
+    parser.add_argument("--repeat-ratio", type=float, default=0.5, help="Доля ответов, повторяющихся между кандидатами")
+    parser.add_argument("--think-time-ms", type=float, default=0.0)
+    parser.add_argument("--token-latency-ms", type=float, default=2.0)
+    parser.add_argument("--parallel", type=int, default=4, help="Параллельных слотов заглушки Ollama")
+    parser.add_argument("--workers", type=int, default=1, help="Воркеры uvicorn (режим uvicorn)")
+    parser.add_argument("--semantic", action="store_true", help="Включить семантическую оценку")
+    parser.add_argument("--no-batching", action="store_true", help="Выключить микро-батчинг оценок")
+    parser.add_argument("--no-context-reuse", action="store_true", help="Не продолжать context модели в интервью")
+    parser.add_argument("--no-hints", action="store_true", help="Выключить подсказки к вопросам")
+    parser.add_argument("--no-prefetch", action="store_true", help="Генерировать подсказку только при запросе вопроса")
+    parser.add_argument("--hint-timeout", type=float, default=0.0, help="Сколько get_question ждет неготовую подсказку, с")
+    parser.add_argument("--bank-size", type=int, default=0, help="Синтетический банк из N вопросов темы --topic")
+    parser.add_argument("--queue-max", type=int, default=100, help="Лимит очереди оценок Ollama (0 - без ограничения)")
+    parser.add_argument("--no-reports", action="store_true", help="Выключить итоговые отчеты по интервью")
+    parser.add_argument("--poll-reports", action="store_true", help="Дожидаться итогового отчета после end")
+    parser.add_argument("--max-retries", type=int, default=5, help="Повторы ответа после 503")
+    parser.add_argument("--retry-scale", type=float, default=1.0, help="Множитель паузы Retry-After")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--thresholds", help="JSON с порогами; при нарушении код выхода 1")
+    parser.add_argument("--output", help="Сохранить отчет в JSON")
+    args = parser.parse_args()
+
+    args.bank_path = write_question_bank(args.topic, args.bank_size) if args.bank_size else None
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if args.bank_path:
+            os.unlink(args.bank_path)
+
+    print(f"📈 Режим {args.mode}: {args.users} интервью, {args.concurrency} одновременно")
+    print_table([{"endpoint": endpoint, **stats} for endpoint, stats in report.items()])
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"mode": args.mode, "args": vars(args), "report": report}, f, ensure_ascii=False, indent=2)
+
+    if args.thresholds:
+        with open(args.thresholds, encoding="utf-8") as f:
+            thresholds = json.load(f).get(args.mode, {})
+        violations = check_thresholds(report, thresholds)
+        if violations:
+            print("\n❌ Регрессия:")
+            for violation in violations:
+                print(f"  - {violation}")
+            sys.exit(1)
+        print("\n✅ Пороги соблюдены")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Детерминированная заглушка Ollama API для бенчмарков
+
+Эмулирует задержки настоящего сервера: обработку промпта, генерацию
+каждого токена, загрузку модели при переключении и ограниченное число
+параллельных слотов (как OLLAMA_NUM_PARALLEL). Ответы зависят только от
+промпта, поэтому результаты прогонов воспроизводимы.
+
+Запуск отдельным процессом:
+    python benchmarks/ollama_stub.py --port 11500 --token-latency-ms 5
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from aiohttp import web
+
+EMBEDDING_DIM = 64
+# Модели, которые заглушка показывает в /api/tags
+INSTALLED_MODELS = ("codellama:latest", "llama2:latest", "nomic-embed-text:latest")
+
+
+def _stable_hash(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+def _tokenize(text: str) -> List[str]:
+    return text.lower().split()
+
+
+def fake_embedding(text: str) -> List[float]:
+    """Мешок хешированных слов: похожие тексты дают близкие векторы"""
+    vector = [0.0] * EMBEDDING_DIM
+    for word in _tokenize(text):
+        h = _stable_hash(word.strip(".,:;!?()\"'"))
+        vector[h % EMBEDDING_DIM] += 1.0 if (h >> 8) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def fake_evaluation(prompt: str) -> str:
+    """Ответ в формате, который ожидает evaluation.parse_evaluation"""
+    score = _stable_hash(prompt) % 11
+    return (
+        f"Оценка: {score}\n"
+        "Комментарий: Ответ частично раскрывает тему, но не хватает деталей и примеров.\n"
+        "Рекомендации:\n"
+        "- Приведите пример кода\n"
+        "- Опишите граничные случаи"
+    )
+
+
+class StubOllama:
+    """
+    aiohttp приложение, изображающее Ollama
+
+    Задержки в секундах: token_latency - на один сгенерированный токен,
+    prompt_latency - на каждые 100 токенов промпта, load_latency - загрузка
+    модели, если предыдущий запрос был к другой модели.
+
+    Как и в Ollama, каждый из parallel слотов помнит последний обработанный
+    context (KV cache): запрос с context из этого кеша платит только за
+    новую часть промпта, иначе переданный context считается заново.
+    """
+
+    def __init__(
+        self,
+        token_latency: float = 0.005,
+        prompt_latency: float = 0.02,
+        load_latency: float = 0.3,
+        parallel: int = 4,
+        installed_models=INSTALLED_MODELS,
+    ):
+        self.installed_models = tuple(installed_models)
+        self.token_latency = token_latency
+        self.prompt_latency = prompt_latency
+        self.load_latency = load_latency
+        self.parallel = parallel
+        self.loaded_model: Optional[str] = None
+        self.model_loads = 0
+        self.requests = 0
+        self.context_hits = 0
+        self._kv_cache: "OrderedDict[int, None]" = OrderedDict()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.router.add_get("/api/tags", self.tags)
+        self.app.router.add_post("/api/generate", self.generate)
+        self.app.router.add_post("/api/embeddings", self.embeddings)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Запустить сервер в текущем event loop, вернуть base_url"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        actual_port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{actual_port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.parallel)
+        return self._slots
+
+    async def _load(self, model: str) -> float:
+        if self.loaded_model == model:
+            return 0.0
+        self.model_loads += 1
+        self.loaded_model = model
+        await asyncio.sleep(self.load_latency)
+        return self.load_latency
+
+    def _cached_prefix(self, context: List[int]) -> int:
+        """Сколько токенов context уже лежит в KV cache одного из слотов"""
+        if context and hash(tuple(context)) in self._kv_cache:
+            self.context_hits += 1
+            return len(context)
+        return 0
+
+    def _remember(self, context: List[int]) -> None:
+        key = hash(tuple(context))
+        self._kv_cache[key] = None
+        self._kv_cache.move_to_end(key)
+        while len(self._kv_cache) > self.parallel:
+            self._kv_cache.popitem(last=False)
+
+    def _prompt_time(self, prompt_tokens: int) -> float:
+        return self.prompt_latency * prompt_tokens / 100
+
+    def _final_record(self, body: dict, text: str, started: float, load: float, prompt_tokens: int, eval_tokens: int, context: List[int]) -> dict:
+        total = time.perf_counter() - started
+        eval_time = eval_tokens * self.token_latency
+        return {
+            "model": body["model"],
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "response": text,
+            "done": True,
+            "context": context,
+            "total_duration": int(total * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(self._prompt_time(prompt_tokens) * 1e9),
+            "eval_count": eval_tokens,
+            "eval_duration": int(eval_time * 1e9),
+        }
+
+    async def tags(self, request: web.Request) -> web.Response:
+        models = [{
+            "name": name,
+            "modified_at": datetime.now(timezone.utc).isoformat(),
+            "size": 0,
+            "digest": "stub",
+        } for name in self.installed_models]
+        return web.json_response({"models": models})
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        async with self._get_slots():
+            await self._load(body["model"])
+            await asyncio.sleep(self._prompt_time(len(_tokenize(body["prompt"]))))
+        return web.json_response({"embedding": fake_embedding(body["prompt"])})
+
+    async def generate(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests += 1
+        started = time.perf_counter()
+        prompt = (body.get("system") or "") + body["prompt"]
+        previous = body.get("context") or []
+        prompt_ids = [_stable_hash(word) % 32000 for word in _tokenize(prompt)]
+        prompt_tokens = max(1, len(previous) - self._cached_prefix(previous) + len(prompt_ids))
+        text = fake_evaluation(body["prompt"])
+        tokens = [word + " " for word in text.split(" ")]
+        # Новый context: весь диалог, включая сгенерированный ответ
+        context = previous + prompt_ids + [_stable_hash(word) % 32000 for word in _tokenize(text)]
+
+        async with self._get_slots():
+            load = await self._load(body["model"])
+            await asyncio.sleep(self._prompt_time(prompt_tokens))
+            self._remember(context)
+
+            if not body.get("stream", True):
+                await asyncio.sleep(self.token_latency * len(tokens))
+                return web.json_response(self._final_record(body, text, started, load, prompt_tokens, len(tokens), context))
+
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            for token in tokens:
+                await asyncio.sleep(self.token_latency)
+                chunk = {"model": body["model"], "created_at": datetime.now(timezone.utc).isoformat(), "response": token, "done": False}
+                await response.write((json.dumps(chunk, ensure_ascii=False) + "\n").encode("utf-8"))
+            final = self._final_record(body, "", started, load, prompt_tokens, len(tokens), context)
+            await response.write((json.dumps(final) + "\n").encode("utf-8"))
+            await response.write_eof()
+            return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка Ollama API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--token-latency-ms", type=float, default=5.0)
+    parser.add_argument("--prompt-latency-ms", type=float, default=20.0)
+    parser.add_argument("--load-latency-ms", type=float, default=300.0)
+    parser.add_argument("--parallel", type=int, default=4)
+    args = parser.parse_args()
+
+    stub = StubOllama(
+        token_latency=args.token_latency_ms / 1000,
+        prompt_latency=args.prompt_latency_ms / 1000,
+        load_latency=args.load_latency_ms / 1000,
+        parallel=args.parallel,
+    )
+    print(f"🤖 Заглушка Ollama: http://{args.host}:{args.port}")
+    web.run_app(stub.app, host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
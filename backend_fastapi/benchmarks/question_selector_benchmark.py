@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк адаптивного выбора вопросов
+
+Для банков разного размера выбирает следующий вопрос каждого уровня
+для сессий в середине интервью (интервью ограничено одним тегом).
+Сравнивается с выбором перебором списка темы (как без пулов:
+отфильтровать по уровню и тегам, выкинуть заданные).
+
+    python benchmarks/question_selector_benchmark.py --sizes 100,1000,10000
+"""
+
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime
+
+from common import print_table
+
+from models import InterviewSession
+from question_bank import DIFFICULTY_LEVELS, QuestionBank, difficulty_level
+from question_selector import QuestionSelector
+
+TOPIC = "javascript"
+# Много тегов: вопросов с одним тегом - около 5% темы
+TAGS = tuple(f"tag{i}" for i in range(40))
+
+
+def build_bank(size: int, rng: random.Random) -> QuestionBank:
+    questions = [{
+        "id": f"q{i}",
+        "text": f"Вопрос {i}",
+        "topic": TOPIC,
+        "difficulty": rng.choice(DIFFICULTY_LEVELS),
+        "correct_answer": "Эталонный ответ",
+        "tags": rng.sample(TAGS, 2),
+    } for i in range(size)]
+    return QuestionBank({TOPIC: questions})
+
+
+def new_session(questions: int, tags) -> InterviewSession:
+    return InterviewSession(
+        id=str(uuid.uuid4()), topic=TOPIC, difficulty="middle", current_question=1,
+        total_questions=questions, start_time=datetime.now(), tags=list(tags),
+    )
+
+
+def scan_pick(bank: QuestionBank, session: InterviewSession, level: int, asked: set):
+    """Выбор перебором: первый незаданный вопрос нужного уровня и тегов"""
+    for question_id in bank.ids_for(session.topic):
+        question = bank.get(question_id)
+        if (
+            question_id not in asked
+            and difficulty_level(question["difficulty"]) == level
+            and (not session.tags or set(session.tags) & set(question["tags"]))
+        ):
+            return question
+    return None
+
+
+def run(size: int, args, rng: random.Random):
+    bank = build_bank(size, rng)
+    selector = QuestionSelector(bank)
+    sessions = []
+    for _ in range(args.interviews):
+        session = new_session(args.questions, (rng.choice(TAGS),))
+        # Сессия в середине интервью: половина вопросов уже задана
+        selector.first_question(session)
+        for _ in range(args.questions // 2 - 1):
+            session.current_question += 1
+            selector.advance(session)
+        sessions.append(session)
+
+    started = time.perf_counter()
+    for session in sessions:
+        for level in range(len(DIFFICULTY_LEVELS)):
+            selector.pick(session, level)
+    pools_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for session in sessions:
+        asked = set(session.asked_question_ids)
+        for level in range(len(DIFFICULTY_LEVELS)):
+            scan_pick(bank, session, level, asked)
+    scan_time = time.perf_counter() - started
+
+    picks = len(sessions) * len(DIFFICULTY_LEVELS)
+    return {
+        "questions_in_bank": size,
+        "pools_us_per_pick": round(pools_time / picks * 1e6, 2),
+        "scan_us_per_pick": round(scan_time / picks * 1e6, 2),
+        "pools": len(bank.snapshot.pools),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк адаптивного выбора вопросов")
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--interviews", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print("📊 Адаптивный выбор вопросов")
+    print(f"   сессий: {args.interviews}, задано вопросов: {args.questions // 2}, фильтр по тегу")
+    print()
+    print_table([run(int(size), args, rng) for size in args.sizes.split(",")])
+
+
+if __name__ == "__main__":
+    main()
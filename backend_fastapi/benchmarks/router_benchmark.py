@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк роутера Ollama: распределение нагрузки и переключение при отказе
+
+Поток оценок идет через OllamaRouter в несколько заглушек Ollama, одна из
+которых генерирует в slow-factor раз медленнее остальных. Сценарии:
+
+    single    - один узел (как OllamaClient без роутера);
+    router    - все узлы, наименее загруженный узел с учетом скорости;
+    failover  - то же, но на середине прогона один узел останавливается.
+
+    python benchmarks/router_benchmark.py --jobs 300 --rate 150 --nodes 3
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from common import latency_summary, print_table
+
+from evaluation import build_request
+from ollama_router import OllamaRouter
+from ollama_stub import StubOllama
+
+MODEL = "codellama:latest"
+
+
+async def run_scenario(name, args):
+    node_count = 1 if name == "single" else args.nodes
+    stubs = [
+        StubOllama(
+            token_latency=args.token_latency_ms / 1000 * (args.slow_factor if i == node_count - 1 and i else 1),
+            load_latency=0.0,
+            parallel=args.parallel,
+        )
+        for i in range(node_count)
+    ]
+    urls = [await stub.start() for stub in stubs]
+    router = OllamaRouter(
+        urls, failure_threshold=2, reset_timeout=60.0, health_interval=0.5,
+        max_concurrency=args.parallel, coalesce=False,
+    )
+    await router.start()
+
+    rng = random.Random(42)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            await router.generate(build_request(MODEL, f"Вопрос {i}", "Эталонный ответ", f"Ответ кандидата {i}"))
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    tasks = []
+    for i in range(args.jobs):
+        if name == "failover" and i == args.jobs // 2:
+            await stubs[0].stop()
+        tasks.append(asyncio.create_task(one(i)))
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    stats = router.nodes_stats()
+    row = {
+        "scenario": name,
+        "throughput_rps": round(args.jobs / elapsed, 1),
+        **latency_summary(latencies),
+        "errors": errors,
+        "failovers": stats["failovers"],
+        "requests_per_node": "/".join(str(n["requests"]) for n in stats["nodes"].values()),
+    }
+    await router.close()
+    for stub in stubs:
+        await stub.stop()
+    return row
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк роутера Ollama")
+    parser.add_argument("--jobs", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=150.0, help="Средняя частота запросов в секунду")
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--parallel", type=int, default=4, help="Параллельные слоты каждого узла")
+    parser.add_argument("--token-latency-ms", type=float, default=1.0)
+    parser.add_argument("--slow-factor", type=float, default=3.0, help="Во сколько раз медленнее последний узел")
+    args = parser.parse_args()
+
+    print("📊 Роутер Ollama")
+    print(f"   запросов: {args.jobs}, поток: {args.rate:g}/с, узлов: {args.nodes}, слотов на узел: {args.parallel}")
+    print()
+
+    rows = [await run_scenario(name, args) for name in ("single", "router", "failover")]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
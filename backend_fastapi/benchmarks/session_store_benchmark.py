@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк памяти хранилища сессий
+
+Создает --sessions интервью в середине прохождения (заданы --asked
+вопросов) и сравнивает память (tracemalloc) и время чтения/записи:
+
+    pydantic dict  - прежний вариант: словарь InterviewSession;
+    memory store   - MemoryInterviewStore с компактными SessionRecord.
+
+Затем проверяет очистку: все интервью завершаются, и после истечения
+finished_ttl один проход sweep удаляет их.
+
+    python benchmarks/session_store_benchmark.py --sessions 100000
+"""
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from common import print_table
+
+from models import InterviewSession
+from persistence import MemoryInterviewStore
+
+TOPICS = ("javascript-basics", "python", "sql", "react")
+LEVELS = ("junior", "middle", "senior")
+
+
+def build_session(i: int, asked: int) -> InterviewSession:
+    # Новые строки на каждую сессию, как после разбора JSON запроса
+    topic = "".join(TOPICS[i % len(TOPICS)])
+    return InterviewSession(
+        id=str(uuid.uuid4()),
+        topic=topic,
+        difficulty="".join(LEVELS[i % len(LEVELS)]),
+        current_question=asked + 1,
+        total_questions=10,
+        score=asked * 7,
+        start_time=datetime.now(),
+        tags=[f"tag{i % 40}"],
+        current_question_id=f"{topic}-q{(i + asked) % 500}",
+        asked_question_ids=[f"{topic}-q{(i + k) % 500}" for k in range(asked + 1)],
+    )
+
+
+async def fill_measured(store, args) -> float:
+    """Заполнить хранилище; сколько памяти (МБ) занимают сессии"""
+    gc.collect()
+    tracemalloc.start()
+    for i in range(args.sessions):
+        await store.create(build_session(i, args.asked))
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / (1024 * 1024)
+
+
+async def time_per_call(store, ids, save: bool) -> float:
+    started = time.perf_counter()
+    for interview_id in ids:
+        session = await store.get(interview_id)
+        if save:
+            session.score += 1
+            await store.save(session)
+    return (time.perf_counter() - started) / len(ids) * 1e6
+
+
+class DictStore:
+    """Прежнее хранилище: InterviewSession в словаре"""
+
+    def __init__(self):
+        self.sessions = {}
+
+    async def create(self, session):
+        self.sessions[session.id] = session
+
+    async def get(self, interview_id):
+        return self.sessions.get(interview_id)
+
+    async def save(self, session):
+        self.sessions[session.id] = session
+
+
+async def run(args):
+    rows = []
+    for name, factory in (("pydantic dict", DictStore), ("memory store", MemoryInterviewStore)):
+        store = factory()
+        mb = await fill_measured(store, args)
+        ids = list(store.sessions)[:args.calls]
+        rows.append({
+            "store": name,
+            "sessions": len(store.sessions),
+            "memory_mb": round(mb, 1),
+            "bytes_per_session": int(mb * 1024 * 1024 / args.sessions),
+            "get_us": round(await time_per_call(store, ids, save=False), 2),
+            "get_save_us": round(await time_per_call(store, ids, save=True), 2),
+        })
+        del store
+    return rows
+
+
+async def check_sweep(args) -> dict:
+    store = MemoryInterviewStore(finished_ttl=0.5, sweep_interval=0)
+    for i in range(args.sessions):
+        await store.create(build_session(i, args.asked))
+    for interview_id in list(store.sessions):
+        session = await store.get(interview_id)
+        session.is_active = False
+        await store.save(session)
+    await asyncio.sleep(0.6)
+    started = time.perf_counter()
+    removed = await store.sweep()
+    return {"finished": args.sessions, "removed": removed, "left": len(store.sessions),
+            "sweep_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк памяти хранилища сессий")
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--asked", type=int, default=5, help="Заданных вопросов в каждой сессии")
+    parser.add_argument("--calls", type=int, default=20000, help="Сессий для замера get/save")
+    args = parser.parse_args()
+
+    print("📊 Хранилище сессий в памяти")
+    print(f"   сессий: {args.sessions}, заданных вопросов: {args.asked}")
+    print()
+    rows = asyncio.run(run(args))
+    print_table(rows)
+    print()
+    print_table([asyncio.run(check_sweep(args))])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк холодного старта воркера
+
+Каждый замер - отдельный процесс python (как новый воркер uvicorn):
+время импорта main по модулям (python -X importtime), затем время
+import main, lifespan (до приема запросов) и первой генерации /openapi.json
+в трех режимах: eager - aiohttp и NumPy импортируются вместе с main (как
+до ленивых импортов), lazy - текущий код, lazy + готовая схема -
+OPENAPI_SCHEMA_PATH с файлом export_openapi.py.
+
+    python benchmarks/startup_benchmark.py --runs 7
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from common import BACKEND_DIR, print_table
+
+# Сторонние пакеты, которые стоит видеть в разбивке, даже если их импортирует не main напрямую
+THIRD_PARTY = ("fastapi", "starlette", "pydantic", "aiohttp", "numpy", "orjson", "prisma", "psycopg2", "pyarrow")
+
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+if sys.argv[1] == "eager":
+    import aiohttp, numpy
+import main
+imported = time.perf_counter()
+
+async def run():
+    async with main.lifespan(main.app):
+        ready = time.perf_counter()
+        main.app.openapi()
+        schema = time.perf_counter()
+    return ready, schema
+
+ready, schema = asyncio.run(run())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "openapi_ms": (schema - ready) * 1000,
+    "modules": sorted(name for name in ("aiohttp", "numpy", "prisma") if name in sys.modules),
+}))
+"""
+
+
+def child_environment(schema_path: Optional[str] = None) -> Dict[str, str]:
+    """Окружение воркера: без внешних сервисов и фоновых запросов к Ollama на старте"""
+    env = dict(os.environ)
+    env.update({
+        "PERSISTENCE_BACKEND": "memory",
+        "OLLAMA_BASE_URL": "http://127.0.0.1:9",
+        "OLLAMA_WARMUP_ENABLED": "0",
+        "FEEDBACK_CACHE_DB_PATH": "",
+        "ANSWER_STATS_DB_PATH": "",
+        "EMBEDDINGS_CACHE_PATH": "",
+        "OPENAPI_SCHEMA_PATH": schema_path or "",
+    })
+    return env
+
+
+def project_modules() -> set:
+    return {name[:-3] for name in os.listdir(BACKEND_DIR) if name.endswith(".py")}
+
+
+def import_times(runs: int) -> List[Dict[str, object]]:
+    """Медиана собственного и накопленного времени импорта модулей проекта и тяжелых пакетов"""
+    wanted = project_modules() | set(THIRD_PARTY)
+    samples: Dict[str, List[tuple]] = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=BACKEND_DIR, env=child_environment(), capture_output=True, text=True, check=True,
+        )
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            name = name.strip()
+            if name in wanted and self_us.strip().isdigit():
+                samples.setdefault(name, []).append((int(self_us), int(cumulative_us)))
+    rows = [
+        {
+            "module": name,
+            "self_ms": round(statistics.median(s for s, _ in values) / 1000, 1),
+            "cumulative_ms": round(statistics.median(c for _, c in values) / 1000, 1),
+        }
+        for name, values in samples.items()
+    ]
+    return sorted(rows, key=lambda row: row["cumulative_ms"], reverse=True)
+
+
+def cold_start(mode: str, runs: int, schema_path: Optional[str]) -> Dict[str, object]:
+    samples = []
+    modules = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD, "eager" if mode == "eager" else "lazy"],
+            cwd=BACKEND_DIR, env=child_environment(schema_path), capture_output=True, text=True, check=True,
+        )
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample["process_ms"] = (time.perf_counter() - started) * 1000
+        samples.append(sample)
+        modules = sample["modules"]
+    row = {"mode": mode}
+    for key in ("import_ms", "lifespan_ms", "openapi_ms", "process_ms"):
+        row[key] = round(statistics.median(sample[key] for sample in samples), 1)
+    row["loaded"] = ",".join(modules) or "-"
+    return row
+
+
+def export_schema(path: str) -> None:
+    subprocess.run(
+        [sys.executable, "export_openapi.py", "--output", path],
+        cwd=BACKEND_DIR, env=child_environment(), capture_output=True, check=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк холодного старта воркера")
+    parser.add_argument("--runs", type=int, default=5, help="Процессов на каждый замер (берется медиана)")
+    parser.add_argument("--top", type=int, default=20, help="Сколько модулей показать в разбивке импорта")
+    args = parser.parse_args()
+
+    print("🚀 Холодный старт воркера")
+    print(f"   процессов на замер: {args.runs}, python {sys.version.split()[0]}")
+    print()
+    print("Импорт main по модулям (медиана, мс):")
+    print_table(import_times(args.runs)[:args.top])
+    print()
+
+    schema_path = os.path.join(tempfile.mkdtemp(prefix="openapi_"), "openapi_schema.json")
+    export_schema(schema_path)
+    print("Старт воркера (медиана, мс; loaded - тяжелые пакеты, загруженные к концу замера):")
+    print_table([
+        cold_start("eager", args.runs, None),
+        cold_start("lazy", args.runs, None),
+        cold_start("lazy + готовая схема", args.runs, schema_path),
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк разбора потока генерации Ollama (токенов в секунду на ядро)
+
+Поток NDJSON, как его отдает /api/generate, режется на куски случайной
+длины (границы не совпадают со строками, как при чтении из сети) и
+разбирается в одном потоке. Время - процессорное, то есть это
+пропускная способность одного ядра без учета сети. Варианты:
+
+    pydantic per line  - прежний путь: строка, json.loads, OllamaGenerateResponse;
+    decoder + json     - NDJSONDecoder и StreamToken со стандартным json;
+    decoder + orjson   - то же с orjson (если установлен).
+
+    python benchmarks/stream_parsing_benchmark.py --tokens 200000
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+from common import print_table
+
+import ollama_client
+from ollama_client import NDJSONDecoder, OllamaGenerateResponse, StreamToken
+
+MODEL = "codellama:latest"
+
+
+def build_stream(tokens: int) -> bytes:
+    words = ["Ответ ", "частично ", "раскрывает ", "тему, ", "не ", "хватает ", "примеров ", "\"кода\"\n"]
+    created_at = datetime.now(timezone.utc).isoformat()
+    lines = [
+        json.dumps({"model": MODEL, "created_at": created_at, "response": words[i % len(words)], "done": False},
+                   ensure_ascii=False)
+        for i in range(tokens)
+    ]
+    lines.append(json.dumps({
+        "model": MODEL, "created_at": created_at, "response": "", "done": True,
+        "context": list(range(512)), "total_duration": 1, "load_duration": 1,
+        "prompt_eval_count": 100, "prompt_eval_duration": 1, "eval_count": tokens, "eval_duration": 1,
+    }))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def split_chunks(data: bytes, rng: random.Random):
+    chunks = []
+    position = 0
+    while position < len(data):
+        size = rng.randint(64, 4096)
+        chunks.append(data[position:position + size])
+        position += size
+    return chunks
+
+
+def parse_per_line(chunks):
+    """Прежний путь: строки (как readline у aiohttp) и pydantic на каждую"""
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line:
+                yield OllamaGenerateResponse(**json.loads(line.decode("utf-8")))
+
+
+def parse_with_decoder(chunks):
+    decoder = NDJSONDecoder()
+    for chunk in chunks:
+        for record in decoder.feed(chunk):
+            if record.get("done"):
+                yield OllamaGenerateResponse(**record)
+            else:
+                yield StreamToken(record.get("model", ""), record.get("created_at", ""), record.get("response", ""))
+    for record in decoder.flush():
+        yield OllamaGenerateResponse(**record)
+
+
+def measure(name, parse, chunks, tokens, repeat):
+    best = float("inf")
+    text = ""
+    for _ in range(repeat):
+        started = time.process_time()
+        parts = [chunk.response for chunk in parse(chunks)]
+        best = min(best, time.process_time() - started)
+        text = "".join(parts)
+    return {"parser": name, "tokens_per_s_per_core": int(tokens / best), "ms": round(best * 1000, 1)}, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора потока генерации Ollama")
+    parser.add_argument("--tokens", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chunks = split_chunks(build_stream(args.tokens), random.Random(42))
+    print("📊 Разбор потока Ollama")
+    print(f"   токенов: {args.tokens}, кусков: {len(chunks)}")
+    print()
+
+    fast_loads = ollama_client.json_loads
+    variants = [("pydantic per line", parse_per_line, None), ("decoder + json", parse_with_decoder, json.loads)]
+    if ollama_client.orjson is not None:
+        variants.append(("decoder + orjson", parse_with_decoder, fast_loads))
+    else:
+        print("   orjson не установлен: pip install orjson")
+
+    rows = []
+    texts = set()
+    for name, parse, loads in variants:
+        if loads is not None:
+            ollama_client.json_loads = loads
+        row, text = measure(name, parse, chunks, args.tokens, args.repeat)
+        rows.append(row)
+        texts.add(text)
+    ollama_client.json_loads = fast_loads
+
+    baseline = rows[0]["tokens_per_s_per_core"]
+    for row in rows:
+        row["speedup"] = f"{row['tokens_per_s_per_core'] / baseline:.1f}x"
+    print_table(rows)
+    if len(texts) != 1:
+        raise SystemExit("❌ Разные варианты разбора вернули разный текст")
+
+
+if __name__ == "__main__":
+    main()
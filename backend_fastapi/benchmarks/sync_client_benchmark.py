@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк синхронного клиента Ollama
+
+Сравнивает два способа вызывать Ollama из синхронного кода:
+
+    asyncio.run  - новый event loop и новая HTTP сессия на каждый вызов
+                   (так работал прежний OllamaClientSync);
+    sync client  - OllamaClientSync: один фоновый loop и пул соединений.
+
+Вызовы идут из --threads потоков (как у воркеров с пулом потоков),
+заглушка Ollama работает отдельным процессом.
+
+    python benchmarks/sync_client_benchmark.py --calls 400 --threads 1,8
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from common import BACKEND_DIR, latency_summary, print_table
+
+from evaluation import build_request
+from ollama_client import OllamaClient, OllamaClientSync
+
+MODEL = "codellama:latest"
+
+
+def asyncio_run_call(base_url: str, request):
+    async def call():
+        async with OllamaClient(base_url) as client:
+            return await client.generate(request)
+    return asyncio.run(call())
+
+
+def run_scenario(name: str, base_url: str, threads: int, args):
+    sync_client = OllamaClientSync(base_url, max_concurrency=args.parallel, coalesce=False)
+    latencies = []
+
+    def one(i: int):
+        request = build_request(MODEL, f"Вопрос {i}", "Эталонный ответ", f"Ответ кандидата {i}")
+        started = time.perf_counter()
+        if name == "asyncio.run":
+            asyncio_run_call(base_url, request)
+        else:
+            sync_client.generate(request)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(one, range(args.calls)))
+    elapsed = time.perf_counter() - started
+    sync_client.close()
+    return {
+        "client": name,
+        "threads": threads,
+        "calls_per_s": round(args.calls / elapsed, 1),
+        **latency_summary(latencies),
+    }
+
+
+def wait_ready(base_url: str, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{base_url}/api/tags", timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Заглушка Ollama не запустилась")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк синхронного клиента Ollama")
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--threads", default="1,8", help="Число потоков через запятую")
+    parser.add_argument("--parallel", type=int, default=8, help="Параллельные слоты заглушки")
+    parser.add_argument("--port", type=int, default=11501)
+    args = parser.parse_args()
+
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "ollama_stub.py"),
+        "--port", str(args.port), "--parallel", str(args.parallel),
+        "--token-latency-ms", "0", "--prompt-latency-ms", "0", "--load-latency-ms", "0",
+    ])
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_ready(base_url)
+        print("📊 Синхронный клиент Ollama")
+        print(f"   вызовов: {args.calls}, заглушка без задержек генерации")
+        print()
+        rows = [
+            run_scenario(name, base_url, int(threads), args)
+            for threads in args.threads.split(",")
+            for name in ("asyncio.run", "sync client")
+        ]
+        print_table(rows)
+    finally:
+        stub.terminate()
+        stub.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Настройки приложения (читаются из переменных окружения)
+"""
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# JSON файл с банком вопросов {"тема": [...]} (пусто - встроенные вопросы из main.py)
+QUESTION_BANK_PATH = os.getenv("QUESTION_BANK_PATH") or None
+
+# Хранилище интервью: "memory" (один воркер) или "prisma" (PostgreSQL)
+PERSISTENCE_BACKEND = os.getenv("PERSISTENCE_BACKEND", "memory").lower()
+DATABASE_URL = os.getenv("DATABASE_URL") or None
+DATABASE_POOL_SIZE = _env_int("DATABASE_POOL_SIZE", 10)
+DATABASE_POOL_TIMEOUT = _env_int("DATABASE_POOL_TIMEOUT", 10)
+# Кеш сессий воркера (секунды); 0 - всегда читать из базы
+SESSION_CACHE_SIZE = _env_int("SESSION_CACHE_SIZE", 1024)
+SESSION_CACHE_TTL = _env_float("SESSION_CACHE_TTL", 5.0)
+# Ответы пишутся в базу пачками: раз в ANSWER_FLUSH_INTERVAL_MS или по достижении размера пачки
+ANSWER_FLUSH_INTERVAL_MS = _env_float("ANSWER_FLUSH_INTERVAL_MS", 500.0)
+ANSWER_FLUSH_BATCH_SIZE = _env_int("ANSWER_FLUSH_BATCH_SIZE", 200)
+# Хранилище в памяти: сессии сверх лимита вытесняются, брошенные (IDLE_TTL) и
+# завершенные (FINISHED_TTL, секунды после последнего обращения) удаляются фоновой очисткой
+SESSION_MAX_SESSIONS = _env_int("SESSION_MAX_SESSIONS", 100000)
+SESSION_IDLE_TTL = _env_float("SESSION_IDLE_TTL", 4 * 3600.0)
+SESSION_FINISHED_TTL = _env_float("SESSION_FINISHED_TTL", 600.0)
+SESSION_SWEEP_INTERVAL = _env_float("SESSION_SWEEP_INTERVAL", 60.0)
+
+# Ollama
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "codellama:latest")
+# Несколько серверов Ollama через запятую: запросы распределяются роутером (ollama_router.py)
+OLLAMA_BASE_URLS = [u.strip() for u in os.getenv("OLLAMA_BASE_URLS", "").split(",") if u.strip()]
+# Ошибок подряд до вывода узла из ротации и пауза (секунды) перед пробным запросом
+OLLAMA_ROUTER_FAILURE_THRESHOLD = _env_int("OLLAMA_ROUTER_FAILURE_THRESHOLD", 3)
+OLLAMA_ROUTER_RESET_TIMEOUT = _env_float("OLLAMA_ROUTER_RESET_TIMEOUT", 30.0)
+OLLAMA_ROUTER_HEALTH_INTERVAL = _env_float("OLLAMA_ROUTER_HEALTH_INTERVAL", 10.0)
+
+# Сколько генераций одновременно отправляем в Ollama (остальные ждут в очереди)
+OLLAMA_MAX_CONCURRENCY = _env_int("OLLAMA_MAX_CONCURRENCY", 4)
+# Лимиты очереди по приоритетам (на узел): сверх них запрос сразу получает 503 с Retry-After; 0 - без ограничения
+OLLAMA_QUEUE_MAX_INTERACTIVE = _env_int("OLLAMA_QUEUE_MAX_INTERACTIVE", 100)
+OLLAMA_QUEUE_MAX_REPORT = _env_int("OLLAMA_QUEUE_MAX_REPORT", 50)
+OLLAMA_QUEUE_MAX_BACKGROUND = _env_int("OLLAMA_QUEUE_MAX_BACKGROUND", 20)
+# Пул TCP соединений к Ollama
+OLLAMA_MAX_CONNECTIONS = _env_int("OLLAMA_MAX_CONNECTIONS", 32)
+OLLAMA_MAX_CONNECTIONS_PER_HOST = _env_int("OLLAMA_MAX_CONNECTIONS_PER_HOST", 8)
+OLLAMA_KEEPALIVE_TIMEOUT = _env_float("OLLAMA_KEEPALIVE_TIMEOUT", 60.0)
+OLLAMA_REQUEST_TIMEOUT = _env_float("OLLAMA_REQUEST_TIMEOUT", 300.0)
+# Объединять одинаковые одновременные запросы генерации в один (single-flight)
+OLLAMA_COALESCE = _env_bool("OLLAMA_COALESCE", True)
+
+# Прогрев моделей: загрузка при старте и пинги с keep_alive, чтобы Ollama не выгружала модель
+OLLAMA_WARMUP_ENABLED = _env_bool("OLLAMA_WARMUP_ENABLED", True)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_WARM_PING_INTERVAL = _env_float("OLLAMA_WARM_PING_INTERVAL", 240.0)
+# load_duration (мс), начиная с которого загрузка считается холодной (модель была выгружена)
+OLLAMA_COLD_LOAD_THRESHOLD_MS = _env_float("OLLAMA_COLD_LOAD_THRESHOLD_MS", 1000.0)
+# Дополнительные модели для прогрева через запятую (OLLAMA_MODEL прогревается всегда)
+OLLAMA_PRELOAD_MODELS = [m.strip() for m in os.getenv("OLLAMA_PRELOAD_MODELS", "").split(",") if m.strip()]
+
+# Продолжать context модели между оценками одного интервью (системный промпт не пересчитывается)
+OLLAMA_CONTEXT_REUSE = _env_bool("OLLAMA_CONTEXT_REUSE", True)
+SESSION_CONTEXT_MAX_SESSIONS = _env_int("SESSION_CONTEXT_MAX_SESSIONS", 1000)
+# Длиннее - context сбрасывается: вместе с новым промптом он должен помещаться в num_ctx модели
+SESSION_CONTEXT_MAX_TOKENS = _env_int("SESSION_CONTEXT_MAX_TOKENS", 1536)
+SESSION_CONTEXT_MAX_TOTAL_TOKENS = _env_int("SESSION_CONTEXT_MAX_TOTAL_TOKENS", 1000000)
+
+# Адаптивный выбор вопросов: сложность следует за средней оценкой кандидата
+ADAPTIVE_DIFFICULTY_ENABLED = _env_bool("ADAPTIVE_DIFFICULTY_ENABLED", True)
+# Средняя оценка, начиная с которой вопросы становятся сложнее, и ниже которой - проще
+ADAPTIVE_RAISE_AT = _env_float("ADAPTIVE_RAISE_AT", 8.0)
+ADAPTIVE_LOWER_BELOW = _env_float("ADAPTIVE_LOWER_BELOW", 5.0)
+
+# Подсказки к вопросам: генерируются моделью заранее, пока кандидат отвечает на предыдущий вопрос
+QUESTION_HINTS_ENABLED = _env_bool("QUESTION_HINTS_ENABLED", True)
+# Сколько get_question ждет подсказку, которую не успели подготовить заранее
+# (0 - не ждет: подсказка генерируется в фоне и достанется следующим интервью с этим вопросом)
+QUESTION_HINT_TIMEOUT = _env_float("QUESTION_HINT_TIMEOUT", 0.0)
+QUESTION_HINT_CACHE_MAX_ENTRIES = _env_int("QUESTION_HINT_CACHE_MAX_ENTRIES", 10000)
+# Готовить подсказку следующего вопроса заранее (false - только когда вопрос запрошен)
+QUESTION_PREFETCH_ENABLED = _env_bool("QUESTION_PREFETCH_ENABLED", True)
+# Одновременные фоновые генерации подсказок (не занимают больше слотов Ollama)
+QUESTION_PREFETCH_MAX_PARALLEL = _env_int("QUESTION_PREFETCH_MAX_PARALLEL", 1)
+
+# Оценивать ответы через Ollama (при ошибке используется простой анализ)
+OLLAMA_FEEDBACK_ENABLED = _env_bool("OLLAMA_FEEDBACK_ENABLED", True)
+
+# Итоговые отчеты по интервью: строятся в фоне после /api/interview/end
+REPORTS_ENABLED = _env_bool("REPORTS_ENABLED", True)
+# Обработчики заданий отчетов в процессе (независимо от числа воркеров uvicorn)
+REPORT_WORKERS = _env_int("REPORT_WORKERS", 2)
+# Заданий в очереди сверх этого - отчет сразу со статусом failed
+REPORT_MAX_PENDING = _env_int("REPORT_MAX_PENDING", 1000)
+# Сколько секунд хранить статус завершенного задания
+REPORT_JOB_TTL = _env_float("REPORT_JOB_TTL", 3600.0)
+# Сводка модели по всем ответам (false - только оценки по вопросам)
+REPORT_SUMMARY_ENABLED = _env_bool("REPORT_SUMMARY_ENABLED", True)
+
+# Микро-батчинг оценок: ждем до MAX_WAIT_MS, собирая до MAX_SIZE оценок в пачку
+EVALUATION_BATCHING_ENABLED = _env_bool("EVALUATION_BATCHING_ENABLED", True)
+EVALUATION_BATCH_MAX_SIZE = _env_int("EVALUATION_BATCH_MAX_SIZE", 8)
+EVALUATION_BATCH_MAX_WAIT_MS = _env_float("EVALUATION_BATCH_MAX_WAIT_MS", 10.0)
+EVALUATION_BATCH_MAX_PARALLEL = _env_int("EVALUATION_BATCH_MAX_PARALLEL", OLLAMA_MAX_CONCURRENCY)
+
+# Семантическая оценка по эмбеддингам (если LLM-оценка недоступна)
+SEMANTIC_SCORING_ENABLED = _env_bool("SEMANTIC_SCORING_ENABLED", True)
+OLLAMA_EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
+# Файл .npz с векторами эталонных ответов (пусто - считаются при каждом старте)
+EMBEDDINGS_CACHE_PATH = os.getenv("EMBEDDINGS_CACHE_PATH") or None
+
+# Кеш оценок LLM
+FEEDBACK_CACHE_MAX_ENTRIES = _env_int("FEEDBACK_CACHE_MAX_ENTRIES", 10000)
+FEEDBACK_CACHE_TTL = _env_float("FEEDBACK_CACHE_TTL", 86400.0)
+# Путь к SQLite файлу для дискового уровня кеша (пусто - только память)
+FEEDBACK_CACHE_DB_PATH = os.getenv("FEEDBACK_CACHE_DB_PATH") or None
+
+# Накопительная статистика ответов (/api/stats): SQLite файл, общий для воркеров (пусто - только память)
+ANSWER_STATS_DB_PATH = os.getenv("ANSWER_STATS_DB_PATH") or None
+# Как часто (секунды) добавлять прирост в файл и перечитывать итоги всех воркеров
+ANSWER_STATS_FLUSH_INTERVAL = _env_float("ANSWER_STATS_FLUSH_INTERVAL", 30.0)
+
+# Выгрузка результатов для аналитики (scripts/export_results.py, POST /api/admin/export)
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+# auto - parquet, если установлен pyarrow, иначе csv; также parquet, arrow, csv
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "auto").lower()
+EXPORT_BATCH_SIZE = _env_int("EXPORT_BATCH_SIZE", 10000)
+# Ответы моложе этого (секунды) не выгружаются: они могут еще лежать в буфере записи
+EXPORT_LAG_SECONDS = _env_float("EXPORT_LAG_SECONDS", 60.0)
+
+# Токен для /api/admin/* (заголовок X-Admin-Token); пусто - админские endpoints отключены (403)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+
+# Готовая схема OpenAPI (python export_openapi.py): /openapi.json и /docs отдают ее вместо
+# генерации по маршрутам в каждом воркере (пусто или файл устарел - генерировать)
+OPENAPI_SCHEMA_PATH = os.getenv("OPENAPI_SCHEMA_PATH") or None
+
+# Метрики Prometheus (/metrics) и middleware с временем обработки запросов
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
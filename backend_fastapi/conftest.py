@@ -0,0 +1,8 @@
+"""
+Настройки pytest: тесты в tests/ импортируют модули backend_fastapi напрямую
+
+test_api.py - ручная проверка работающего сервера (нужны requests и запущенный
+uvicorn), поэтому pytest его не собирает.
+"""
+
+collect_ignore = ["test_api.py"]
@@ -5,7 +5,7 @@
 без необходимости его запуска.
 """
 
-from main import app, interviews, questions_db
+from main import app, questions_db
 from fastapi.testclient import TestClient
 import json
 
@@ -124,7 +124,8 @@ def show_api_structure():
         ("POST", "/api/interview/start", "Начать новое интервью"),
         ("GET", "/api/interview/question", "Получить текущий вопрос"),
         ("POST", "/api/interview/answer", "Отправить ответ на вопрос"),
-        ("POST", "/api/interview/end", "Завершить интервью")
+        ("POST", "/api/interview/end", "Завершить интервью"),
+        ("GET", "/api/interview/report", "Статус итогового отчета")
     ]
     
     for method, path, description in endpoints:
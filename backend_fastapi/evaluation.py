@@ -0,0 +1,122 @@
+"""
+Оценка ответов кандидата с помощью LLM (Ollama)
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from ollama_client import OllamaClient, OllamaGenerateRequest, OllamaGenerateResponse
+
+# Меняется при любом изменении промпта: по версии отличаются закешированные оценки
+PROMPT_TEMPLATE_VERSION = "v1"
+
+SYSTEM_PROMPT = (
+    "Ты опытный технический интервьюер. Оцени ответ кандидата на вопрос по шкале от 0 до 10, "
+    "сравнивая его с эталонным ответом. Отвечай строго в формате:\n"
+    "Оценка: <число от 0 до 10>\n"
+    "Комментарий: <2-3 предложения о сильных и слабых сторонах ответа>\n"
+    "Рекомендации:\n"
+    "- <рекомендация>\n"
+    "- <рекомендация>"
+)
+
+PROMPT_TEMPLATE = (
+    "Вопрос: {question}\n\n"
+    "Эталонный ответ: {correct_answer}\n\n"
+    "Ответ кандидата: {answer}"
+)
+
+# Для следующих ответов того же интервью: инструкции и формат уже есть в переданном context
+FOLLOWUP_PROMPT_TEMPLATE = (
+    "Следующий ответ. Оцени его по тем же правилам и в том же формате.\n\n"
+    + PROMPT_TEMPLATE
+)
+
+_SCORE_RE = re.compile(r"оценка\s*:\s*(\d{1,2})", re.IGNORECASE)
+_COMMENT_RE = re.compile(r"комментарий\s*:\s*(.+?)(?:\n\s*рекомендации\s*:|\Z)", re.IGNORECASE | re.DOTALL)
+_SUGGESTIONS_RE = re.compile(r"рекомендации\s*:\s*(.+)\Z", re.IGNORECASE | re.DOTALL)
+
+
+class AnswerEvaluation(BaseModel):
+    score: int
+    comment: str
+    suggestions: List[str]
+
+
+def build_prompt(question: str, correct_answer: str, answer: str) -> str:
+    """Промпт для оценки ответа"""
+    return PROMPT_TEMPLATE.format(question=question, correct_answer=correct_answer, answer=answer)
+
+
+def build_request(model: str, question: str, correct_answer: str, answer: str, stream: bool = False,
+                  context: Optional[List[int]] = None) -> OllamaGenerateRequest:
+    """
+    Запрос к Ollama на оценку ответа
+
+    С context (из предыдущей оценки того же интервью) системный промпт не
+    повторяется: Ollama продолжает с уже обработанного префикса, и заново
+    считается только новый вопрос с ответом
+    """
+    if context:
+        return OllamaGenerateRequest(
+            model=model,
+            prompt=FOLLOWUP_PROMPT_TEMPLATE.format(question=question, correct_answer=correct_answer, answer=answer),
+            context=list(context),
+            stream=stream,
+            options={"temperature": 0},
+        )
+    return OllamaGenerateRequest(
+        model=model,
+        prompt=build_prompt(question, correct_answer, answer),
+        system=SYSTEM_PROMPT,
+        stream=stream,
+        options={"temperature": 0},
+    )
+
+
+def parse_evaluation(text: str) -> Optional[AnswerEvaluation]:
+    """
+    Разобрать ответ модели
+
+    Возвращает None, если модель не выставила оценку
+    """
+    score_match = _SCORE_RE.search(text)
+    if not score_match:
+        return None
+    score = max(0, min(10, int(score_match.group(1))))
+
+    comment_match = _COMMENT_RE.search(text)
+    comment = comment_match.group(1).strip() if comment_match else text[score_match.end():].strip()
+
+    suggestions: List[str] = []
+    suggestions_match = _SUGGESTIONS_RE.search(text)
+    if suggestions_match:
+        for line in suggestions_match.group(1).splitlines():
+            line = line.strip().lstrip("-*•").strip()
+            if line:
+                suggestions.append(line)
+
+    return AnswerEvaluation(score=score, comment=comment, suggestions=suggestions)
+
+
+async def evaluate_answer(client: OllamaClient, model: str, question: str, correct_answer: str, answer: str) -> Optional[AnswerEvaluation]:
+    """Оценить ответ одним запросом к модели"""
+    evaluation, _ = await evaluate_answer_in_session(client, model, question, correct_answer, answer)
+    return evaluation
+
+
+async def evaluate_answer_in_session(
+    client: OllamaClient,
+    model: str,
+    question: str,
+    correct_answer: str,
+    answer: str,
+    context: Optional[List[int]] = None,
+    session_key: Optional[str] = None,
+) -> Tuple[Optional[AnswerEvaluation], OllamaGenerateResponse]:
+    """Оценить ответ в рамках интервью: продолжить context и вернуть ответ модели (с новым context)"""
+    request = build_request(model, question, correct_answer, answer, context=context)
+    response = await client.generate(request, session_key=session_key)
+    return parse_evaluation(response.response), response
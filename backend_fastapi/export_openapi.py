@@ -1,34 +1,72 @@
 """
 Скрипт для экспорта OpenAPI схемы в JSON файл
+
+Файл используется для генерации типов фронтенда и как готовая схема
+сервера (OPENAPI_SCHEMA_PATH). В файл записывается отпечаток маршрутов и
+моделей (main.openapi_fingerprint): сервер отдает схему из файла, только
+если отпечаток совпадает. --check проверяет, что файл совпадает со схемой
+текущего кода - запускается в CI, файл пересобирается при каждом изменении API.
 """
 
+import argparse
 import json
-from main import app
+import sys
+
+from fastapi import FastAPI
+
+from main import OPENAPI_FINGERPRINT_FIELD, app, openapi_fingerprint
 
-def export_openapi_schema():
+def generate_openapi_schema() -> dict:
+    """Схема по маршрутам и моделям (без готовой схемы из OPENAPI_SCHEMA_PATH) с отпечатком"""
+    app.openapi_schema = None
+    schema = dict(FastAPI.openapi(app))
+    schema[OPENAPI_FINGERPRINT_FIELD] = openapi_fingerprint()
+    return schema
+
+def export_openapi_schema(output: str = "openapi_schema.json"):
     """Экспортировать OpenAPI схему в JSON файл"""
-    
+
     # Получаем OpenAPI схему
-    openapi_schema = app.openapi()
-    
+    openapi_schema = generate_openapi_schema()
+
     # Сохраняем в файл
-    with open("openapi_schema.json", "w", encoding="utf-8") as f:
+    with open(output, "w", encoding="utf-8") as f:
         json.dump(openapi_schema, f, indent=2, ensure_ascii=False)
-    
-    print("✅ OpenAPI схема экспортирована в файл: openapi_schema.json")
+
+    print(f"✅ OpenAPI схема экспортирована в файл: {output}")
     print(f"📊 Схема содержит {len(openapi_schema['paths'])} endpoints")
-    
+
     # Показываем список endpoints
     print("\n📋 Доступные endpoints:")
     for path, methods in openapi_schema['paths'].items():
         for method in methods.keys():
             print(f"  {method.upper():6} {path}")
-    
+
     # Показываем модели данных
     print(f"\n📝 Модели данных ({len(openapi_schema['components']['schemas'])}):")
     for model_name in openapi_schema['components']['schemas'].keys():
         print(f"  - {model_name}")
 
-if __name__ == "__main__":
-    export_openapi_schema()
+def check_openapi_schema(output: str = "openapi_schema.json") -> bool:
+    """Файл схемы совпадает со схемой текущего кода"""
+    try:
+        with open(output, encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ Не удалось прочитать {output}: {e}")
+        return False
+    # Через JSON: в сгенерированной схеме могут быть кортежи
+    if saved != json.loads(json.dumps(generate_openapi_schema())):
+        print(f"❌ {output} устарел: запустите python export_openapi.py")
+        return False
+    print(f"✅ {output} актуален")
+    return True
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Экспорт OpenAPI схемы")
+    parser.add_argument("--output", default="openapi_schema.json")
+    parser.add_argument("--check", action="store_true", help="Только проверить, что файл актуален")
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(0 if check_openapi_schema(args.output) else 1)
+    export_openapi_schema(args.output)
@@ -0,0 +1,205 @@
+"""
+Кеш оценок ответов, полученных от LLM
+
+Ключ - (id вопроса, модель, версия промпта, хеш нормализованного ответа),
+поэтому одинаковые по смыслу ответы ("Замыкание - это..." и "замыкание это...")
+попадают в одну запись. Два уровня: LRU в памяти процесса и необязательная
+SQLite база на диске, общая для воркеров и переживающая перезапуск.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from evaluation import AnswerEvaluation
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
+
+def normalize_answer(answer: str) -> str:
+    """Привести ответ к виду, не зависящему от регистра, пунктуации и пробелов"""
+    return " ".join(_PUNCTUATION_RE.sub(" ", answer.lower()).split())
+
+
+class FeedbackCache:
+    """Двухуровневый (память + SQLite) кеш оценок с TTL и вытеснением LRU"""
+
+    # Как часто (в записях) чистить просроченные и лишние строки на диске
+    DISK_PRUNE_EVERY = 256
+
+    def __init__(
+        self,
+        template_version: str,
+        max_entries: int = 10000,
+        ttl: float = 86400.0,
+        db_path: Optional[str] = None,
+        max_disk_entries: int = 200000,
+    ):
+        self.template_version = template_version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+
+        # key -> (expires_at, question_id, model, evaluation)
+        self._memory: "OrderedDict[str, Tuple[float, str, str, AnswerEvaluation]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._disk_writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path: str) -> None:
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS feedback_cache ("
+            " key TEXT PRIMARY KEY,"
+            " question_id TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS feedback_cache_question ON feedback_cache (question_id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS feedback_cache_model ON feedback_cache (model)")
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def make_key(self, question_id: str, model: str, answer: str) -> str:
+        answer_hash = hashlib.sha256(normalize_answer(answer).encode("utf-8")).hexdigest()
+        raw = "\x1f".join((question_id, model, self.template_version, answer_hash))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, question_id: str, model: str, answer: str) -> Optional[AnswerEvaluation]:
+        """Найти оценку: сначала в памяти, затем на диске"""
+        key = self.make_key(question_id, model, answer)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[3]
+            del self._memory[key]
+            self.expirations += 1
+
+        if self._db is not None:
+            evaluation = await asyncio.to_thread(self._disk_get, key, now)
+            if evaluation is not None:
+                self.disk_hits += 1
+                self._memory_set(key, question_id, model, evaluation, now)
+                return evaluation
+
+        self.misses += 1
+        return None
+
+    async def set(self, question_id: str, model: str, answer: str, evaluation: AnswerEvaluation) -> None:
+        """Сохранить оценку на обоих уровнях"""
+        key = self.make_key(question_id, model, answer)
+        now = time.time()
+        self._memory_set(key, question_id, model, evaluation, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, question_id, model, evaluation, now)
+
+    async def invalidate(self, question_id: Optional[str] = None, model: Optional[str] = None) -> int:
+        """
+        Удалить записи по вопросу и/или модели (без фильтров - все)
+
+        Возвращает число удаленных записей в памяти и на диске
+        """
+        stale = [
+            key for key, (_, entry_question, entry_model, _) in self._memory.items()
+            if (question_id is None or entry_question == question_id)
+            and (model is None or entry_model == model)
+        ]
+        for key in stale:
+            del self._memory[key]
+        removed = len(stale)
+        if self._db is not None:
+            removed += await asyncio.to_thread(self._disk_invalidate, question_id, model)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "disk_enabled": self._db is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _memory_set(self, key: str, question_id: str, model: str, evaluation: AnswerEvaluation, now: float) -> None:
+        self._memory[key] = (now + self.ttl, question_id, model, evaluation)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[AnswerEvaluation]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value FROM feedback_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return AnswerEvaluation.model_validate_json(row[0])
+        except ValueError:
+            logger.warning(f"Поврежденная запись кеша оценок: {key}")
+            return None
+
+    def _disk_set(self, key: str, question_id: str, model: str, evaluation: AnswerEvaluation, now: float) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO feedback_cache (key, question_id, model, value, created_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, question_id, model, evaluation.model_dump_json(), now, now + self.ttl),
+            )
+            self._disk_writes += 1
+            if self._disk_writes % self.DISK_PRUNE_EVERY == 0:
+                self._db.execute("DELETE FROM feedback_cache WHERE expires_at <= ?", (now,))
+                self._db.execute(
+                    "DELETE FROM feedback_cache WHERE key IN ("
+                    " SELECT key FROM feedback_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+
+    def _disk_invalidate(self, question_id: Optional[str], model: Optional[str]) -> int:
+        conditions = []
+        params = []
+        if question_id is not None:
+            conditions.append("question_id = ?")
+            params.append(question_id)
+        if model is not None:
+            conditions.append("model = ?")
+            params.append(model)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._db_lock:
+            return self._db.execute(f"DELETE FROM feedback_cache{where}", params).rowcount
@@ -0,0 +1,361 @@
+"""
+Итоговые отчеты по интервью в фоне
+
+end_interview считает только процент и ставит задание отчета в очередь:
+сбор ответов кандидата (InterviewAnswer) с оценками по каждому вопросу и
+сводка модели по всем ответам выполняются пулом из workers фоновых задач.
+Размер пула задается отдельно от числа воркеров uvicorn (REPORT_WORKERS),
+а запросы к Ollama идут с приоритетом REPORT (llm_queue): после оценок
+ответов, но раньше подсказок и прогрева.
+
+id задания совпадает с id интервью (у интервью один отчет). Статус можно
+опрашивать (snapshot) или получать потоком (subscribe): события status,
+token (фрагменты сводки) и report. Задания хранятся в памяти процесса,
+завершенные удаляются через job_ttl секунд; готовый отчет сохраняется в
+хранилище интервью (в PostgreSQL - Interview.feedback).
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from llm_queue import LLMOverloaded, Priority, llm_priority
+from models import InterviewSession
+from ollama_client import OllamaClient, OllamaGenerateRequest
+from persistence import CORRECT_SCORE
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+REPORT_SYSTEM_PROMPT = (
+    "Ты опытный технический интервьюер. По ответам кандидата ты пишешь краткий "
+    "итоговый отзыв: объективно, по делу, без повторения вопросов."
+)
+
+REPORT_PROMPT_TEMPLATE = """Тема интервью: {topic}, уровень: {difficulty}
+Итог: {score} из {max_score}
+
+Ответы кандидата:
+{answers}
+
+Напиши итоговый отзыв (3-5 предложений): сильные стороны, пробелы в знаниях и что стоит изучить."""
+
+REPORT_MAX_TOKENS = 400
+# Длинный ответ кандидата в промпте обрезается: сводке достаточно начала и оценки
+REPORT_ANSWER_MAX_LENGTH = 500
+
+
+def build_report_request(model: str, session: InterviewSession, answers: List[dict]) -> OllamaGenerateRequest:
+    lines = []
+    for number, answer in enumerate(answers, 1):
+        lines.append(
+            f"{number}. Вопрос: {answer['question']}\n"
+            f"   Ответ: {answer['user_answer'][:REPORT_ANSWER_MAX_LENGTH]}\n"
+            f"   Оценка: {answer['score']}/10. {answer['feedback'] or ''}".rstrip()
+        )
+    return OllamaGenerateRequest(
+        model=model,
+        prompt=REPORT_PROMPT_TEMPLATE.format(
+            topic=session.topic,
+            difficulty=session.difficulty,
+            score=session.score,
+            max_score=session.total_questions * 10,
+            answers="\n".join(lines),
+        ),
+        system=REPORT_SYSTEM_PROMPT,
+        stream=True,
+        options={"temperature": 0.3, "num_predict": REPORT_MAX_TOKENS},
+    )
+
+
+def score_summary(session: InterviewSession) -> Dict[str, Any]:
+    """Итоговая оценка интервью (синхронная часть end_interview)"""
+    max_possible_score = session.total_questions * 10
+    percentage = (session.score / max_possible_score) * 100 if max_possible_score > 0 else 0
+    return {
+        "final_score": session.score,
+        "max_possible_score": max_possible_score,
+        "percentage": round(percentage, 2),
+        "questions_answered": session.current_question - 1,
+        "total_questions": session.total_questions,
+    }
+
+
+class ReportJob:
+    __slots__ = (
+        "id", "session", "status", "created_at", "queued", "started", "finished",
+        "report", "error", "listeners",
+    )
+
+    def __init__(self, session: InterviewSession):
+        self.id = session.id
+        self.session = session
+        self.status = STATUS_QUEUED
+        self.created_at = datetime.now()
+        # time.monotonic() постановки в очередь, начала и конца выполнения
+        self.queued = time.monotonic()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.report: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        # Очереди событий подписчиков потока статуса
+        self.listeners: List[asyncio.Queue] = []
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (STATUS_DONE, STATUS_FAILED)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "interview_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "report": self.report,
+            "error": self.error,
+        }
+
+    def publish(self, event: str, data: Dict[str, Any]) -> None:
+        for listener in self.listeners:
+            listener.put_nowait((event, data))
+
+
+def finished_snapshot(interview_id: str, report: Dict[str, Any]) -> Dict[str, Any]:
+    """Статус задания по отчету, сохраненному в хранилище (задание выполнял другой воркер)"""
+    return {
+        "job_id": interview_id,
+        "interview_id": interview_id,
+        "status": STATUS_DONE,
+        "created_at": None,
+        "report": report,
+        "error": None,
+    }
+
+
+class InterviewReportPipeline:
+    """
+    Очередь заданий итоговых отчетов и пул из workers обработчиков
+
+    store - хранилище интервью (answers, save_report), question_lookup -
+    вопрос по id. client - OllamaClient или OllamaRouter; без client (или
+    с summary_enabled=False) отчет собирается без сводки модели.
+    answers_delay - сколько секунд после постановки в очередь ждать перед
+    сбором ответов: последние ответы, принятые другими воркерами, доходят
+    до базы с задержкой записи пачки (ANSWER_FLUSH_INTERVAL_MS).
+    """
+
+    # Сколько раз повторить сводку, если очередь Ollama заполнена
+    MAX_OVERLOAD_RETRIES = 3
+
+    def __init__(
+        self,
+        store,
+        question_lookup: Callable[[str], Optional[dict]],
+        client: Optional[OllamaClient] = None,
+        model: Optional[str] = None,
+        workers: int = 2,
+        max_pending: int = 1000,
+        job_ttl: float = 3600.0,
+        summary_enabled: bool = True,
+        answers_delay: float = 0.0,
+    ):
+        self.store = store
+        self.question_lookup = question_lookup
+        self.client = client
+        self.model = model
+        self.workers = workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self.summary_enabled = summary_enabled and client is not None
+        self.answers_delay = answers_delay
+        self._queue: "asyncio.Queue[ReportJob]" = asyncio.Queue()
+        # Порядок - по времени постановки в очередь
+        self._jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+        self._workers: List[asyncio.Task] = []
+
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.summaries = 0
+        self.summary_failed = 0
+        self.overload_retries = 0
+        self.queue_wait_total = 0.0
+        self.run_total = 0.0
+
+    async def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in self._jobs.values():
+            if not job.is_finished:
+                self._finish(job, STATUS_FAILED, error="Сервер остановлен до готовности отчета")
+
+    def submit(self, session: InterviewSession) -> ReportJob:
+        """Поставить отчет по завершенному интервью в очередь (повторный вызов возвращает то же задание)"""
+        self._expire()
+        job = self._jobs.get(session.id)
+        if job is not None and job.status != STATUS_FAILED:
+            return job
+        job = ReportJob(session)
+        self._jobs[job.id] = job
+        self._jobs.move_to_end(job.id)
+        if self._queue.qsize() >= self.max_pending:
+            self.rejected += 1
+            self._finish(job, STATUS_FAILED, error="Очередь отчетов заполнена")
+            return job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        return self._jobs.get(job_id)
+
+    async def subscribe(self, job: ReportJob) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """События задания: текущий статус, затем изменения и фрагменты сводки до report"""
+        listener: asyncio.Queue = asyncio.Queue()
+        job.listeners.append(listener)
+        try:
+            yield "status", {"status": job.status}
+            if job.is_finished:
+                yield "report", job.snapshot()
+                return
+            while True:
+                event, data = await listener.get()
+                yield event, data
+                if event == "report":
+                    return
+        finally:
+            job.listeners.remove(listener)
+
+    def _expire(self) -> None:
+        """Удалить завершенные задания старше job_ttl (невыполненные пропускаются)"""
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.is_finished and job.finished + self.job_ttl <= now
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _finish(self, job: ReportJob, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished = time.monotonic()
+        job.session = None
+        job.publish("report", job.snapshot())
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ReportJob) -> None:
+        # Задания идут по порядку постановки: ожидание не задерживает следующие дольше их собственного
+        delay = job.queued + self.answers_delay - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        job.status = STATUS_RUNNING
+        job.started = time.monotonic()
+        self.queue_wait_total += job.started - job.queued
+        job.publish("status", {"status": job.status})
+        try:
+            report = await self._build(job)
+            await self.store.save_report(job.id, report)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Не удалось построить отчет по интервью {job.id}: {e}")
+            self.failed += 1
+            self._finish(job, STATUS_FAILED, error=str(e))
+            return
+        job.report = report
+        self.completed += 1
+        self._finish(job, STATUS_DONE)
+        self.run_total += job.finished - job.started
+
+    async def _build(self, job: ReportJob) -> Dict[str, Any]:
+        session = job.session
+        answers = []
+        for row in await self.store.answers(session.id):
+            question = self.question_lookup(row["question_id"])
+            answers.append({
+                "question_id": row["question_id"],
+                "question": question["text"] if question is not None else row["question_id"],
+                "user_answer": row["user_answer"],
+                "score": row["score"],
+                "feedback": row["feedback"],
+                "time_spent": row["time_spent"],
+            })
+        scores = [answer["score"] for answer in answers if answer["score"] is not None]
+        report = {
+            "interview_id": session.id,
+            "topic": session.topic,
+            "difficulty": session.difficulty,
+            **score_summary(session),
+            "correct_answers": sum(1 for score in scores if score >= CORRECT_SCORE),
+            "average_score": round(sum(scores) / len(scores), 2) if scores else 0.0,
+            "total_time_spent": sum(answer["time_spent"] or 0 for answer in answers),
+            "answers": answers,
+            "summary": None,
+        }
+        if self.summary_enabled and answers:
+            report["summary"] = await self._summarize(job, session, answers)
+        return report
+
+    async def _summarize(self, job: ReportJob, session: InterviewSession, answers: List[dict]) -> Optional[str]:
+        """Сводка модели по всем ответам; фрагменты уходят подписчикам. None - модель недоступна"""
+        request = build_report_request(self.model, session, answers)
+        for attempt in range(self.MAX_OVERLOAD_RETRIES + 1):
+            chunks = []
+            try:
+                with llm_priority(Priority.REPORT):
+                    async for chunk in self.client.generate_stream(request, session_key=session.id):
+                        if chunk.response:
+                            chunks.append(chunk.response)
+                            job.publish("token", {"text": chunk.response})
+            except LLMOverloaded as e:
+                # Отчет не срочный: ждем, пока очередь Ollama освободится
+                if attempt == self.MAX_OVERLOAD_RETRIES:
+                    break
+                self.overload_retries += 1
+                await asyncio.sleep(e.retry_after)
+                continue
+            except Exception as e:
+                logger.warning(f"Сводка по интервью {session.id} не сгенерирована: {e}")
+                break
+            self.summaries += 1
+            return "".join(chunks).strip() or None
+        self.summary_failed += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        running = sum(1 for job in self._jobs.values() if job.status == STATUS_RUNNING)
+        started = self.completed + self.failed
+        return {
+            "workers": self.workers,
+            "jobs": len(self._jobs),
+            "queued": self._queue.qsize(),
+            "running": running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "summaries": self.summaries,
+            "summary_failed": self.summary_failed,
+            "overload_retries": self.overload_retries,
+            "queue_wait_avg": round(self.queue_wait_total / started, 4) if started else 0.0,
+            "run_avg": round(self.run_total / self.completed, 4) if self.completed else 0.0,
+        }
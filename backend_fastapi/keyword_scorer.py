@@ -0,0 +1,164 @@
+"""
+Оценка ответов по ключевым словам с заранее построенным индексом
+
+Эталонные ответы нормализуются один раз при загрузке вопросов: пунктуация
+и стоп-слова (RU/EN) отбрасываются, слова приводятся к основе простым
+стеммером, каждой основе назначается вес по редкости в базе вопросов (IDF).
+На каждый ответ остается только разобрать текст кандидата.
+"""
+
+import math
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Optional
+
+_PUNCTUATION = ".,;:!?()[]{}<>\"'`«»—–-/\\|*+=&%$#@^~"
+
+STOPWORDS_RU = frozenset("""
+а без более бы был была были было быть в вам вас ведь во вот все всего всех вы где да даже для до его ее ей ему если
+есть еще же за здесь и из или им их к как какая какой когда кто ли между мне может мы на над надо него нее ней нет ни
+них но ну о об однако он она они оно от очень по под после потом при про раз с сам свою себе себя со так также такой
+там те тем то тогда того тоже только том тот ту тут у уже чем через что чтобы эта эти это этого этой этом этот эту я
+который которая которое которые которого которой котором
+""".split())
+
+STOPWORDS_EN = frozenset("""
+a an and are as at be been being but by can could do does for from had has have if in into is it its of on or so such
+that the their them then there these they this those to was were what when where which while who will with would you
+""".split())
+
+STOPWORDS = STOPWORDS_RU | STOPWORDS_EN
+
+# Окончания отсекаются от самого длинного к самому короткому
+_RU_ENDINGS = sorted(set("""
+иями ями ами ией иях иям ием ого его ому ему ыми ими ая яя ое ее ые ие ый ий ой ей ом ем ам ям ах ях ую юю ов ев ия ья
+ию ью ым ых их ет ют ит ат ят ешь ишь им а я о е ы и у ю ь й
+""".split()), key=len, reverse=True)
+_RU_REFLEXIVE = ("ся", "сь")
+_EN_ENDINGS = ("ing", "ed", "s")
+_MIN_STEM = 3
+
+# Пороги доли веса совпавших ключевых слов -> оценка
+THRESHOLDS = ((0.7, 9), (0.5, 7), (0.3, 5))
+MIN_SCORE = 3
+
+
+# Словарь кандидатов ограничен, поэтому основы кешируются: повторное слово - один поиск в словаре
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Основа слова: отсечение типичных окончаний русского и английского"""
+    if word.isascii():
+        if word.endswith("ies") and len(word) - 3 >= _MIN_STEM:
+            return word[:-3] + "y"
+        for ending in _EN_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM and not word.endswith("ss"):
+                return word[:-len(ending)]
+        return word
+
+    for ending in _RU_REFLEXIVE:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            word = word[:-len(ending)]
+            break
+    for ending in _RU_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """Множество основ значимых слов текста"""
+    # split + strip заметно быстрее регулярного выражения на кириллице
+    words = {word.strip(_PUNCTUATION) for word in text.lower().replace("ё", "е").split()}
+    words -= STOPWORDS
+    words.discard("")
+    return frozenset(map(stem, words))
+
+
+def score_by_ratio(ratio: float) -> int:
+    for threshold, score in THRESHOLDS:
+        if ratio >= threshold:
+            return score
+    return MIN_SCORE
+
+
+class KeywordEntry:
+    """Подготовленный эталонный ответ: основы слов с весами"""
+
+    __slots__ = ("weights", "total_weight")
+
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = weights
+        self.total_weight = sum(weights.values())
+
+    def score(self, answer_terms: FrozenSet[str]) -> int:
+        if not self.total_weight:
+            return MIN_SCORE
+        weights = self.weights
+        matched = sum(weights[term] for term in answer_terms & weights.keys())
+        return score_by_ratio(matched / self.total_weight)
+
+
+class KeywordIndex:
+    """Индекс эталонных ответов по id вопроса"""
+
+    def __init__(self):
+        self._terms: Dict[str, FrozenSet[str]] = {}
+        self._document_frequency: Dict[str, int] = {}
+        self._entries: Dict[str, KeywordEntry] = {}
+
+    @classmethod
+    def from_questions(cls, questions: Iterable[dict]) -> "KeywordIndex":
+        """
+        Построить индекс по вопросам вида {"id": ..., "correct_answer": ...}
+
+        Если у вопроса есть готовые основы "keywords" (посчитаны при импорте), они используются как есть
+        """
+        index = cls()
+        for question in questions:
+            keywords = question.get("keywords")
+            if keywords:
+                index._add_terms(question["id"], terms=frozenset(keywords))
+            else:
+                index._add_terms(question["id"], question["correct_answer"])
+        index.rebuild_weights()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add_terms(self, question_id: str, correct_answer: str = "", terms: Optional[FrozenSet[str]] = None) -> None:
+        old_terms = self._terms.get(question_id, frozenset())
+        for term in old_terms:
+            self._document_frequency[term] -= 1
+        if terms is None:
+            terms = tokenize(correct_answer)
+        for term in terms:
+            self._document_frequency[term] = self._document_frequency.get(term, 0) + 1
+        self._terms[question_id] = terms
+
+    def _weights(self, terms: FrozenSet[str]) -> Dict[str, float]:
+        # Слова, встречающиеся в эталонах многих вопросов, менее показательны
+        total = len(self._terms) or 1
+        return {term: 1.0 + math.log(total / self._document_frequency.get(term, 1)) for term in terms}
+
+    def rebuild_weights(self) -> None:
+        """Пересчитать веса всех записей (после массового добавления вопросов)"""
+        self._entries = {
+            question_id: KeywordEntry(self._weights(terms))
+            for question_id, terms in self._terms.items()
+        }
+
+    def add(self, question_id: str, correct_answer: str) -> None:
+        """Добавить или обновить эталон одного вопроса (веса остальных не пересчитываются)"""
+        self._add_terms(question_id, correct_answer)
+        self._entries[question_id] = KeywordEntry(self._weights(self._terms[question_id]))
+
+    def get(self, question_id: str) -> Optional[KeywordEntry]:
+        return self._entries.get(question_id)
+
+    def score(self, question: dict, answer: str) -> int:
+        """Оценка ответа; вопрос, которого нет в индексе, добавляется"""
+        entry = self._entries.get(question["id"])
+        if entry is None:
+            self.add(question["id"], question["correct_answer"])
+            entry = self._entries[question["id"]]
+        return entry.score(tokenize(answer))
@@ -0,0 +1,247 @@
+"""
+Очередь запросов к Ollama с приоритетами и контролем допуска
+
+Слоты генерации OllamaClient (max_concurrency) раздаются не по порядку
+прихода, а по приоритету: сначала оценки ответов кандидатов, затем
+итоговые отчеты по интервью, в последнюю очередь фоновая работа
+(подсказки, прогрев моделей, векторы эталонов). Внутри приоритета -
+по порядку прихода.
+
+Очередь каждого приоритета ограничена: запрос сверх лимита сразу
+получает LLMOverloaded с оценкой, через сколько секунд стоит повторить
+(по среднему времени занятия слота и очереди впереди), вместо того чтобы
+висеть открытым соединением, пока клиент не отвалится по таймауту.
+
+Приоритет задается не параметром каждого вызова, а контекстом:
+
+    with llm_priority(Priority.BACKGROUND):
+        await client.generate(request)
+
+Задачи asyncio наследуют контекст при создании, поэтому приоритет
+доходит до клиента и через coalescing, и через роутер. Если к
+объединенному запросу присоединяется вызов с более высоким приоритетом,
+место запроса в очереди (QueueTicket) поднимается через promote.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    REPORT = 1
+    BACKGROUND = 2
+
+
+PRIORITY_NAMES = {
+    Priority.INTERACTIVE: "interactive",
+    Priority.REPORT: "report",
+    Priority.BACKGROUND: "background",
+}
+
+_current_priority: ContextVar[Priority] = ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+
+@contextmanager
+def llm_priority(priority: Priority):
+    """Запросы к Ollama внутри блока (и из созданных в нем задач) идут с приоритетом priority"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class LLMOverloaded(Exception):
+    """Очередь приоритета заполнена: запрос отклонен, повторить через retry_after секунд"""
+
+    def __init__(self, priority: Priority, retry_after: int):
+        super().__init__(f"Очередь Ollama ({PRIORITY_NAMES[priority]}) заполнена, повторите через {retry_after} с")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class PriorityStats:
+    __slots__ = ("waiting", "admitted", "rejected", "queue_wait_total", "queue_wait_max")
+
+    def __init__(self):
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+
+class QueueTicket:
+    """Место запроса в очереди: приоритет и запись в куче ожидающих (пока ждет)"""
+
+    __slots__ = ("priority", "entry")
+
+    def __init__(self, priority: Priority):
+        self.priority = priority
+        self.entry: Optional[list] = None
+
+
+class LLMJobQueue:
+    """
+    Семафор на max_concurrency слотов с очередью по приоритетам
+
+    max_waiting - лимит очереди для каждого приоритета (по порядку Priority),
+    0 - без ограничения. Без max_waiting очередь не ограничена.
+    """
+
+    # Сглаживание среднего времени занятия слота (для Retry-After)
+    HOLD_EWMA_ALPHA = 0.2
+    MIN_RETRY_AFTER = 1
+    MAX_RETRY_AFTER = 60
+
+    def __init__(self, max_concurrency: int, max_waiting: Optional[Sequence[int]] = None):
+        self.max_concurrency = max_concurrency
+        self.max_waiting = tuple(max_waiting) if max_waiting is not None else (0,) * len(Priority)
+        self.priorities = [PriorityStats() for _ in Priority]
+        self.hold_avg = 1.0
+        self._free = max_concurrency
+        # (приоритет, порядковый номер, future) - future отмененного ожидания остается в куче до выталкивания
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(stats.waiting for stats in self.priorities)
+
+    def retry_after(self, priority: Priority, pending: int = 0) -> int:
+        """Через сколько секунд в очереди priority, вероятно, освободится место"""
+        ahead = sum(stats.waiting for stats in self.priorities[:priority + 1]) + pending
+        seconds = (ahead / self.max_concurrency + 1) * self.hold_avg
+        return min(max(math.ceil(seconds), self.MIN_RETRY_AFTER), self.MAX_RETRY_AFTER)
+
+    def check(self, priority: Priority, pending: int = 0) -> None:
+        """
+        Проверить, что запрос priority будет принят. pending - запросы,
+        которые еще не дошли до очереди (например, собираются в пачку)
+        """
+        check_admission([self], priority, pending)
+
+    async def acquire(self, priority: Priority, ticket: Optional[QueueTicket] = None) -> float:
+        """
+        Занять слот; возвращает время ожидания в очереди. Сверх лимита - LLMOverloaded
+
+        ticket - место запроса, которое можно поднять через promote; приоритет
+        берется из него (promote мог поднять его еще до acquire)
+        """
+        if ticket is None:
+            ticket = QueueTicket(priority)
+        priority = ticket.priority
+        stats = self.priorities[priority]
+        if self._free > 0:
+            self._free -= 1
+            stats.admitted += 1
+            return 0.0
+
+        limit = self.max_waiting[priority]
+        if limit and stats.waiting >= limit:
+            stats.rejected += 1
+            raise LLMOverloaded(priority, self.retry_after(priority))
+
+        queued_at = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        ticket.entry = [priority, next(self._sequence), future]
+        heapq.heappush(self._waiters, ticket.entry)
+        stats.waiting += 1
+        try:
+            await future
+        except BaseException:
+            # Слот мог быть передан в момент отмены: возвращаем его следующему
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+            raise
+        finally:
+            ticket.entry = None
+            # promote мог перенести ожидание в другой приоритет
+            stats = self.priorities[ticket.priority]
+            stats.waiting -= 1
+
+        waited = time.perf_counter() - queued_at
+        stats.admitted += 1
+        stats.queue_wait_total += waited
+        if waited > stats.queue_wait_max:
+            stats.queue_wait_max = waited
+        return waited
+
+    def promote(self, ticket: QueueTicket, priority: Priority) -> None:
+        """
+        Поднять приоритет запроса до priority. Ожидающий запрос встает в
+        конец очереди нового приоритета; старая запись остается в куче и
+        пропускается при выталкивании, как отмененная (future уже выполнен)
+        """
+        if priority >= ticket.priority:
+            return
+        entry = ticket.entry
+        if entry is not None:
+            self.priorities[ticket.priority].waiting -= 1
+            self.priorities[priority].waiting += 1
+            ticket.entry = [priority, next(self._sequence), entry[2]]
+            heapq.heappush(self._waiters, ticket.entry)
+        ticket.priority = priority
+
+    def release(self, held: Optional[float] = None) -> None:
+        """Освободить слот (held - сколько он был занят) и отдать его самому приоритетному ожидающему"""
+        if held is not None:
+            self.hold_avg += self.HOLD_EWMA_ALPHA * (held - self.hold_avg)
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._free += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hold_avg": round(self.hold_avg, 4), "priorities": queue_stats([self])}
+
+
+def queue_stats(queues: Sequence[LLMJobQueue]) -> Dict[str, Dict[str, Any]]:
+    """Счетчики по приоритетам, суммарно по очередям (узлам роутера)"""
+    result = {}
+    for priority in Priority:
+        stats = [queue.priorities[priority] for queue in queues]
+        admitted = sum(s.admitted for s in stats)
+        result[PRIORITY_NAMES[priority]] = {
+            "waiting": sum(s.waiting for s in stats),
+            "admitted": admitted,
+            "rejected": sum(s.rejected for s in stats),
+            "queue_wait_avg": round(sum(s.queue_wait_total for s in stats) / (admitted or 1), 4),
+            "queue_wait_max": round(max((s.queue_wait_max for s in stats), default=0.0), 4),
+            "max_waiting": sum(queue.max_waiting[priority] for queue in queues),
+        }
+    return result
+
+
+def check_admission(queues: Sequence[LLMJobQueue], priority: Priority, pending: int = 0) -> None:
+    """
+    Допуск запроса priority к любой из очередей (узлы роутера): отказ,
+    только если суммарная очередь приоритета (вместе с pending) заполнена
+    """
+    if not queues:
+        return
+    limit = sum(queue.max_waiting[priority] for queue in queues)
+    if not all(queue.max_waiting[priority] for queue in queues):
+        return
+    waiting = sum(queue.priorities[priority].waiting for queue in queues) + pending
+    if waiting >= limit:
+        # Отказ учитывается один раз (в сумме по узлам)
+        queues[0].priorities[priority].rejected += 1
+        share = pending // len(queues)
+        raise LLMOverloaded(priority, min(queue.retry_after(priority, share) for queue in queues))
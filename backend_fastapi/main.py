@@ -1,17 +1,553 @@
-from fastapi import FastAPI, HTTPException
+import fastapi
+import pydantic
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.dependencies.utils import get_flat_dependant
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.routing import APIRoute
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional, Union, get_args
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import hmac
+import importlib
+import inspect
+import json
+import logging
 import uuid
 from datetime import datetime
+from enum import Enum
+
+import config
+from answer_stats import AnswerStatsStore
+from batching import EvaluationBatcher
+from evaluation import AnswerEvaluation, evaluate_answer_in_session, parse_evaluation
+from evaluation import PROMPT_TEMPLATE_VERSION
+from evaluation import build_request as build_evaluation_request
+from feedback_cache import FeedbackCache
+from interview_reports import InterviewReportPipeline, finished_snapshot, score_summary
+from models import AnswerRequest, Feedback, InterviewSession, InterviewStartRequest, Question
+from keyword_scorer import KeywordIndex
+from keyword_scorer import tokenize as tokenize_answer
+from llm_queue import LLMOverloaded, Priority, llm_priority, queue_stats
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import MetricsMiddleware, MetricsRegistry, OllamaMetrics
+from model_warmer import STATE_WARM, ModelWarmer
+from ollama_client import OllamaClient
+from ollama_router import BREAKER_OPEN, OllamaRouter
+from persistence import MemoryInterviewStore, PrismaInterviewStore
+from question_bank import QuestionBank, load_questions_file
+from question_prefetch import QuestionMaterialPrefetcher
+from question_selector import QuestionSelector
+from results_export import FORMATS as EXPORT_FORMATS
+from results_export import export_results
+from session_context import SessionContextStore
+
+if TYPE_CHECKING:
+    # semantic_scorer тянет NumPy: импортируется в фоне при старте (start_semantic_scorer)
+    from semantic_scorer import SemanticScorer
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Общие ресурсы приложения: один клиент Ollama с пулом соединений на весь процесс,
+    кеш и планировщик оценок, векторы эталонных ответов
+    """
+    client_settings = dict(
+        max_concurrency=config.OLLAMA_MAX_CONCURRENCY,
+        max_connections=config.OLLAMA_MAX_CONNECTIONS,
+        max_connections_per_host=config.OLLAMA_MAX_CONNECTIONS_PER_HOST,
+        keepalive_timeout=config.OLLAMA_KEEPALIVE_TIMEOUT,
+        request_timeout=config.OLLAMA_REQUEST_TIMEOUT,
+        coalesce=config.OLLAMA_COALESCE,
+        metrics=ollama_metrics if config.METRICS_ENABLED else None,
+        max_queue=(config.OLLAMA_QUEUE_MAX_INTERACTIVE, config.OLLAMA_QUEUE_MAX_REPORT, config.OLLAMA_QUEUE_MAX_BACKGROUND),
+    )
+    if len(config.OLLAMA_BASE_URLS) > 1:
+        ollama = OllamaRouter(
+            config.OLLAMA_BASE_URLS,
+            failure_threshold=config.OLLAMA_ROUTER_FAILURE_THRESHOLD,
+            reset_timeout=config.OLLAMA_ROUTER_RESET_TIMEOUT,
+            health_interval=config.OLLAMA_ROUTER_HEALTH_INTERVAL,
+            **client_settings,
+        )
+    else:
+        ollama = OllamaClient(
+            config.OLLAMA_BASE_URLS[0] if config.OLLAMA_BASE_URLS else config.OLLAMA_BASE_URL,
+            **client_settings,
+        )
+    await ollama.start()
+    app.state.ollama = ollama
+    app.state.interview_store = None
+    if config.PERSISTENCE_BACKEND == "prisma":
+        store = PrismaInterviewStore(
+            config.DATABASE_URL,
+            pool_size=config.DATABASE_POOL_SIZE,
+            pool_timeout=config.DATABASE_POOL_TIMEOUT,
+            cache_size=config.SESSION_CACHE_SIZE,
+            cache_ttl=config.SESSION_CACHE_TTL,
+            flush_interval=config.ANSWER_FLUSH_INTERVAL_MS / 1000,
+            flush_batch_size=config.ANSWER_FLUSH_BATCH_SIZE,
+        )
+        await store.start()
+        app.state.interview_store = store
+        # Ответы ссылаются на таблицу Question, поэтому банк берем из базы
+        questions_by_topic = await store.load_questions()
+        if questions_by_topic:
+            await question_bank.reload(questions_by_topic)
+        else:
+            logger.warning("В таблице questions нет вопросов: запустите scripts/init_db.py")
+    else:
+        # Фоновая очистка просроченных сессий в памяти
+        await memory_store.start()
+    app.state.feedback_cache = FeedbackCache(
+        PROMPT_TEMPLATE_VERSION,
+        max_entries=config.FEEDBACK_CACHE_MAX_ENTRIES,
+        ttl=config.FEEDBACK_CACHE_TTL,
+        db_path=config.FEEDBACK_CACHE_DB_PATH,
+    )
+    app.state.answer_stats = AnswerStatsStore(
+        db_path=config.ANSWER_STATS_DB_PATH,
+        flush_interval=config.ANSWER_STATS_FLUSH_INTERVAL,
+    )
+    await app.state.answer_stats.start()
+    app.state.evaluation_batcher = None
+    if config.EVALUATION_BATCHING_ENABLED:
+        app.state.evaluation_batcher = EvaluationBatcher(
+            ollama,
+            max_batch_size=config.EVALUATION_BATCH_MAX_SIZE,
+            max_wait=config.EVALUATION_BATCH_MAX_WAIT_MS / 1000,
+            max_parallel=config.EVALUATION_BATCH_MAX_PARALLEL,
+        )
+        await app.state.evaluation_batcher.start()
+    app.state.session_contexts = None
+    if config.OLLAMA_CONTEXT_REUSE:
+        app.state.session_contexts = SessionContextStore(
+            max_sessions=config.SESSION_CONTEXT_MAX_SESSIONS,
+            max_tokens_per_session=config.SESSION_CONTEXT_MAX_TOKENS,
+            max_total_tokens=config.SESSION_CONTEXT_MAX_TOTAL_TOKENS,
+        )
+    app.state.model_warmer = None
+    if config.OLLAMA_WARMUP_ENABLED:
+        app.state.model_warmer = ModelWarmer(
+            ollama,
+            models=[config.OLLAMA_MODEL, *config.OLLAMA_PRELOAD_MODELS],
+            embedding_models=[config.OLLAMA_EMBEDDING_MODEL] if config.SEMANTIC_SCORING_ENABLED else [],
+            keep_alive=config.OLLAMA_KEEP_ALIVE,
+            ping_interval=config.OLLAMA_WARM_PING_INTERVAL,
+            load_threshold=config.OLLAMA_COLD_LOAD_THRESHOLD_MS / 1000,
+        )
+        await app.state.model_warmer.start()
+        if isinstance(ollama, OllamaRouter):
+            ollama.warmer = app.state.model_warmer
+    app.state.question_prefetcher = None
+    if config.QUESTION_HINTS_ENABLED:
+        app.state.question_prefetcher = QuestionMaterialPrefetcher(
+            ollama,
+            config.OLLAMA_MODEL,
+            max_entries=config.QUESTION_HINT_CACHE_MAX_ENTRIES,
+            max_parallel=config.QUESTION_PREFETCH_MAX_PARALLEL,
+            inline_timeout=config.QUESTION_HINT_TIMEOUT,
+        )
+    app.state.report_pipeline = None
+    if config.REPORTS_ENABLED:
+        app.state.report_pipeline = InterviewReportPipeline(
+            app.state.interview_store or memory_store,
+            question_bank.get,
+            client=ollama if config.OLLAMA_FEEDBACK_ENABLED else None,
+            model=config.OLLAMA_MODEL,
+            workers=config.REPORT_WORKERS,
+            max_pending=config.REPORT_MAX_PENDING,
+            job_ttl=config.REPORT_JOB_TTL,
+            summary_enabled=config.REPORT_SUMMARY_ENABLED,
+            # В PostgreSQL ответы других воркеров видны после записи их пачек
+            answers_delay=2 * config.ANSWER_FLUSH_INTERVAL_MS / 1000 if app.state.interview_store is not None else 0.0,
+        )
+        await app.state.report_pipeline.start()
+    app.state.semantic_scorer = None
+    indexing = None
+    if config.SEMANTIC_SCORING_ENABLED:
+        # Импорт NumPy и векторы эталонов - в фоне: старт не ждет ни их, ни Ollama
+        indexing = asyncio.create_task(start_semantic_scorer(app, ollama))
+    try:
+        yield
+    finally:
+        if indexing is not None:
+            indexing.cancel()
+        app.state.semantic_scorer = None
+        if app.state.report_pipeline is not None:
+            await app.state.report_pipeline.close()
+            app.state.report_pipeline = None
+        if app.state.question_prefetcher is not None:
+            await app.state.question_prefetcher.close()
+            app.state.question_prefetcher = None
+        if app.state.model_warmer is not None:
+            await app.state.model_warmer.close()
+            app.state.model_warmer = None
+        if app.state.evaluation_batcher is not None:
+            await app.state.evaluation_batcher.close()
+            app.state.evaluation_batcher = None
+        app.state.session_contexts = None
+        app.state.feedback_cache.close()
+        app.state.feedback_cache = None
+        await app.state.answer_stats.close()
+        app.state.answer_stats = None
+        app.state.ollama = None
+        await ollama.close()
+        if app.state.interview_store is not None:
+            await app.state.interview_store.close()
+            app.state.interview_store = None
+        await memory_store.close()
+
+async def start_semantic_scorer(app: FastAPI, ollama):
+    """Импортировать semantic_scorer в потоке (не блокируя цикл событий) и проиндексировать эталоны"""
+    try:
+        module = await asyncio.to_thread(importlib.import_module, "semantic_scorer")
+    except ImportError as e:
+        logger.warning(f"Семантическая оценка недоступна: {e}")
+        return
+    app.state.semantic_scorer = module.SemanticScorer(ollama, config.OLLAMA_EMBEDDING_MODEL)
+    await index_reference_answers(app.state.semantic_scorer)
+
+async def index_reference_answers(scorer: "SemanticScorer"):
+    """Посчитать (или загрузить с диска) векторы эталонных ответов всех вопросов"""
+    with llm_priority(Priority.BACKGROUND):
+        await _index_reference_answers(scorer)
+
+async def _index_reference_answers(scorer: "SemanticScorer"):
+    if config.EMBEDDINGS_CACHE_PATH:
+        loaded = scorer.load(config.EMBEDDINGS_CACHE_PATH)
+        if loaded:
+            logger.info(f"Загружено векторов эталонных ответов: {loaded}")
+    try:
+        computed = await scorer.index_questions(list(question_bank.snapshot.by_id.values()))
+    except Exception as e:
+        logger.warning(f"Не удалось посчитать векторы эталонных ответов: {e}")
+        return
+    if computed:
+        logger.info(f"Посчитано векторов эталонных ответов: {computed}")
+        if config.EMBEDDINGS_CACHE_PATH:
+            scorer.save(config.EMBEDDINGS_CACHE_PATH)
+
+# Фоновые задачи, запущенные из обработчиков (ссылки держим, чтобы задачи не собрал GC)
+background_tasks = set()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
 
 # Создание FastAPI приложения
 app = FastAPI(
     title="AI Interviewer API",
     description="Простой API для проведения технических интервью по JavaScript",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Поле готовой схемы с отпечатком маршрутов и моделей, по которым она собрана
+OPENAPI_FINGERPRINT_FIELD = "x-source-fingerprint"
+
+def _describe_models(annotation, described: dict) -> None:
+    """Сигнатуры pydantic-моделей и перечислений из аннотации (вложенные - рекурсивно)"""
+    if isinstance(annotation, type) and annotation not in described:
+        if issubclass(annotation, BaseModel):
+            fields = [(name, repr(field)) for name, field in annotation.model_fields.items()]
+            described[annotation] = (annotation.__module__, annotation.__qualname__, annotation.__doc__,
+                                     repr(annotation.model_config), fields)
+            for field in annotation.model_fields.values():
+                _describe_models(field.annotation, described)
+        elif issubclass(annotation, Enum):
+            described[annotation] = (annotation.__module__, annotation.__qualname__,
+                                     [member.value for member in annotation])
+    for arg in get_args(annotation):
+        _describe_models(arg, described)
+
+def openapi_fingerprint() -> str:
+    """
+    Отпечаток всего, из чего FastAPI строит схему: маршруты (пути, методы,
+    описания, сигнатуры обработчиков и зависимостей), поля моделей, версии
+    FastAPI и pydantic. Считается без генерации схемы
+    """
+    parts = [fastapi.__version__, pydantic.VERSION, app.title, app.description, app.version]
+    described: dict = {}
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or not route.include_in_schema:
+            continue
+        calls = [route.endpoint] + [dependant.call for dependant in get_flat_dependant(route.dependant).dependencies]
+        parts.append((
+            route.path, sorted(route.methods), route.name, route.operation_id, route.summary, route.description,
+            route.response_description, route.status_code, route.tags, route.deprecated, repr(route.responses),
+            [(call.__module__, call.__qualname__, str(inspect.signature(call))) for call in calls if call is not None],
+        ))
+        _describe_models(route.response_model, described)
+        for call in calls:
+            if call is not None:
+                for parameter in inspect.signature(call).parameters.values():
+                    _describe_models(parameter.annotation, described)
+    parts.extend(sorted(repr(model) for model in described.values()))
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+def prebuilt_openapi() -> dict:
+    """
+    Схема из OPENAPI_SCHEMA_PATH вместо генерации по маршрутам и моделям;
+    если отпечаток в файле не совпадает с текущими маршрутами и моделями
+    (файл устарел), схема генерируется
+    """
+    if app.openapi_schema is None:
+        try:
+            with open(config.OPENAPI_SCHEMA_PATH, encoding="utf-8") as f:
+                schema = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать схему OpenAPI {config.OPENAPI_SCHEMA_PATH}: {e}")
+            return FastAPI.openapi(app)
+        if schema.pop(OPENAPI_FINGERPRINT_FIELD, None) != openapi_fingerprint():
+            logger.warning(f"Схема OpenAPI {config.OPENAPI_SCHEMA_PATH} устарела (python export_openapi.py)")
+            return FastAPI.openapi(app)
+        app.openapi_schema = schema
+    return app.openapi_schema
+
+if config.OPENAPI_SCHEMA_PATH:
+    app.openapi = prebuilt_openapi
+
+def get_ollama(request: Request) -> Optional[Union[OllamaClient, OllamaRouter]]:
+    """Клиент Ollama приложения (None, если lifespan не запускался, например в TestClient без with)"""
+    return getattr(request.app.state, "ollama", None)
+
+def get_interview_store(request: Request):
+    """Хранилище сессий: PostgreSQL, если включено в lifespan, иначе память процесса"""
+    return getattr(request.app.state, "interview_store", None) or memory_store
+
+def get_feedback_cache(request: Request) -> Optional[FeedbackCache]:
+    """Кеш оценок LLM (None, если lifespan не запускался)"""
+    return getattr(request.app.state, "feedback_cache", None)
+
+def get_answer_stats(request: Request) -> Optional[AnswerStatsStore]:
+    """Накопительная статистика ответов (None, если lifespan не запускался)"""
+    return getattr(request.app.state, "answer_stats", None)
+
+def get_evaluation_batcher(request: Request) -> Optional[EvaluationBatcher]:
+    """Планировщик пачек оценок (None, если батчинг выключен или lifespan не запускался)"""
+    return getattr(request.app.state, "evaluation_batcher", None)
+
+def get_semantic_scorer(request: Request) -> Optional["SemanticScorer"]:
+    """Семантическая оценка по эмбеддингам (None, если выключена или lifespan не запускался)"""
+    return getattr(request.app.state, "semantic_scorer", None)
+
+def get_session_contexts(request: Request) -> Optional[SessionContextStore]:
+    """Context модели по интервью (None, если переиспользование выключено или lifespan не запускался)"""
+    return getattr(request.app.state, "session_contexts", None)
+
+def get_question_prefetcher(request: Request) -> Optional[QuestionMaterialPrefetcher]:
+    """Подсказки к вопросам и их упреждающая генерация (None, если выключены или lifespan не запускался)"""
+    return getattr(request.app.state, "question_prefetcher", None)
+
+def get_model_warmer(request: Request) -> Optional[ModelWarmer]:
+    """Менеджер прогрева моделей (None, если выключен или lifespan не запускался)"""
+    return getattr(request.app.state, "model_warmer", None)
+
+def get_report_pipeline(request: Request) -> Optional[InterviewReportPipeline]:
+    """Очередь итоговых отчетов (None, если отчеты выключены или lifespan не запускался)"""
+    return getattr(request.app.state, "report_pipeline", None)
+
+def model_ready(request: Request, model: str) -> bool:
+    """
+    Прогрета ли модель. Холодной модели трафик не отправляем (оценка идет
+    без LLM), а запускаем ее прогрев в фоне
+    """
+    warmer = get_model_warmer(request)
+    if warmer is None or warmer.is_warm(model):
+        return True
+    warmer.ensure_warm(model)
+    return False
+
+def llm_queues(ollama: Union[OllamaClient, OllamaRouter]):
+    """Очереди запросов всех узлов Ollama"""
+    return [client.queue for client in ollama.clients] if isinstance(ollama, OllamaRouter) else [ollama.queue]
+
+def check_llm_admission(http_request: Request) -> None:
+    """Отказать сразу (LLMOverloaded -> 503), если очередь оценок заполнена"""
+    ollama = get_ollama(http_request)
+    if ollama is None:
+        return
+    batcher = get_evaluation_batcher(http_request)
+    ollama.admission_check(Priority.INTERACTIVE, pending=batcher.pending if batcher is not None else 0)
+
+def release_session_resources(interview_id: str) -> None:
+    """Освободить ресурсы завершенной или удаленной из хранилища сессии"""
+    contexts = getattr(app.state, "session_contexts", None)
+    if contexts is not None:
+        contexts.drop(interview_id)
+    prefetcher = getattr(app.state, "question_prefetcher", None)
+    if prefetcher is not None:
+        prefetcher.drop(interview_id)
+    ollama = getattr(app.state, "ollama", None)
+    if isinstance(ollama, OllamaRouter):
+        ollama.unpin(interview_id)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Проверка доступа к /api/admin/*: без ADMIN_TOKEN админские endpoints закрыты"""
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Админские endpoints отключены: задайте ADMIN_TOKEN")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Доступ запрещен")
+
+# Метрики процесса; счетчики компонентов из app.state читаются при сборе
+metrics_registry = MetricsRegistry()
+ollama_metrics = OllamaMetrics(metrics_registry)
+
+def _component_stats(name: str) -> Optional[dict]:
+    component = getattr(app.state, name, None)
+    return component.stats() if component is not None else None
+
+def _collect_cache_hit_ratio():
+    feedback = _component_stats("feedback_cache")
+    if feedback is not None:
+        yield ("feedback",), feedback["hit_ratio"]
+    store = _component_stats("interview_store")
+    if store is not None and "cache_hit_ratio" in store:
+        yield ("session",), store["cache_hit_ratio"]
+
+metrics_registry.gauge_function(
+    "cache_hit_ratio", "Доля попаданий в кеш (feedback - оценки LLM, session - сессии воркера)",
+    _collect_cache_hit_ratio, ("cache",)
+)
+
+def _collect_ollama_queue():
+    ollama = getattr(app.state, "ollama", None)
+    if ollama is not None:
+        yield ("waiting",), ollama.stats.waiting
+        yield ("in_flight",), ollama.stats.in_flight
+    batcher = _component_stats("evaluation_batcher")
+    if batcher is not None:
+        yield ("batch_queued",), batcher["queued"]
+
+metrics_registry.gauge_function(
+    "ollama_queue_depth", "Запросы к Ollama в очереди и в работе", _collect_ollama_queue, ("state",)
+)
+
+def _collect_ollama_coalesced():
+    ollama = getattr(app.state, "ollama", None)
+    if ollama is not None:
+        yield ("generate",), ollama.stats.coalesced_generate
+        yield ("stream",), ollama.stats.coalesced_stream
+
+metrics_registry.gauge_function(
+    "ollama_coalesced_requests", "Запросы, дождавшиеся чужой такой же генерации", _collect_ollama_coalesced, ("kind",)
+)
+
+def _collect_llm_queue():
+    ollama = getattr(app.state, "ollama", None)
+    if ollama is not None:
+        for priority, stats in queue_stats(llm_queues(ollama)).items():
+            for key in ("waiting", "admitted", "rejected"):
+                yield (priority, key), stats[key]
+
+metrics_registry.gauge_function(
+    "ollama_llm_queue", "Очередь Ollama по приоритетам: ожидают, допущены, отклонены",
+    _collect_llm_queue, ("priority", "value")
+)
+
+def _collect_interview_sessions():
+    if getattr(app.state, "interview_store", None) is None:
+        store = memory_store.stats()
+        for key in ("sessions", "active_sessions", "expired", "evicted"):
+            yield (key,), store[key]
+
+metrics_registry.gauge_function(
+    "interview_sessions", "Сессии в памяти процесса: всего, активные, удаленные по TTL, вытесненные по лимиту",
+    _collect_interview_sessions, ("value",)
+)
+
+def _collect_session_context():
+    contexts = _component_stats("session_contexts")
+    if contexts is not None:
+        for key in ("sessions", "tokens", "prompt_tokens_saved", "prompt_eval_seconds_saved"):
+            yield (key,), contexts[key]
+
+metrics_registry.gauge_function(
+    "ollama_session_context", "Context модели по интервью: сессии, токены в памяти, сэкономленный prompt eval",
+    _collect_session_context, ("value",)
+)
+
+def _collect_question_prefetch():
+    prefetch = _component_stats("question_prefetcher")
+    if prefetch is not None:
+        for key in ("ready", "missed", "waited", "inline", "timeouts", "discarded", "skipped"):
+            yield (key,), prefetch[key]
+
+metrics_registry.gauge_function(
+    "question_hint_requests", "Выдача подсказок: готовые заранее, выданные без подсказки, дождались, сгенерированы по запросу, отброшенные",
+    _collect_question_prefetch, ("outcome",)
+)
+
+def _collect_answer_stats():
+    answer_stats = getattr(app.state, "answer_stats", None)
+    if answer_stats is not None:
+        for topic, stats in answer_stats.overview()["topics"].items():
+            yield (topic, "answers"), stats["answers"]
+            if stats["answers"]:
+                yield (topic, "score_mean"), stats["score"]["mean"]
+                yield (topic, "correct_ratio"), stats["correct_ratio"]
+
+metrics_registry.gauge_function(
+    "answer_stats", "Ответы по темам: число, средняя оценка, доля верных",
+    _collect_answer_stats, ("topic", "value")
+)
+
+def _collect_interview_reports():
+    reports = _component_stats("report_pipeline")
+    if reports is not None:
+        for key in ("queued", "running", "completed", "failed", "rejected"):
+            yield (key,), reports[key]
+
+metrics_registry.gauge_function(
+    "interview_reports", "Задания итоговых отчетов: в очереди, выполняются, готовы, с ошибкой, отклонены",
+    _collect_interview_reports, ("value",)
+)
+
+def _collect_model_warm():
+    warmer = getattr(app.state, "model_warmer", None)
+    if warmer is not None:
+        for state in warmer.states():
+            yield (state.node, state.name), 1 if state.state == STATE_WARM else 0
+
+metrics_registry.gauge_function(
+    "ollama_model_warm", "Модель прогрета и получает трафик (1) или холодная (0)",
+    _collect_model_warm, ("node", "model")
+)
+
+def _collect_model_evictions():
+    warmer = getattr(app.state, "model_warmer", None)
+    if warmer is not None:
+        for state in warmer.states():
+            yield (state.node, state.name), state.evictions
+
+metrics_registry.gauge_function(
+    "ollama_model_evictions", "Сколько раз прогретая модель оказывалась выгруженной",
+    _collect_model_evictions, ("node", "model")
 )
 
+def _collect_router_nodes():
+    ollama = getattr(app.state, "ollama", None)
+    if isinstance(ollama, OllamaRouter):
+        for node in ollama.nodes:
+            yield (node.base_url, "available"), 1 if node.breaker.state != BREAKER_OPEN else 0
+            yield (node.base_url, "load"), node.load
+            yield (node.base_url, "tokens_per_second"), node.tokens_per_second
+
+metrics_registry.gauge_function(
+    "ollama_router_node", "Состояние узлов роутера: доступность, загрузка, токены/с",
+    _collect_router_nodes, ("node", "value")
+)
+
+if config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics_registry)
+
 # Настройка CORS
 app.add_middleware(
     CORSMiddleware,
@@ -26,43 +562,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Модели данных (Pydantic)
-class InterviewStartRequest(BaseModel):
-    topic: str
-    difficulty: str = "middle"
-    question_count: int = 10
-
-class InterviewSession(BaseModel):
-    id: str
-    topic: str
-    difficulty: str
-    current_question: int
-    total_questions: int
-    score: int = 0
-    start_time: datetime
-    is_active: bool = True
-
-class Question(BaseModel):
-    id: str
-    text: str
-    topic: str
-    difficulty: str
-    question_number: int
-
-class AnswerRequest(BaseModel):
-    interview_id: str
-    question_id: str
-    answer: str
-    time_spent: int
-
-class Feedback(BaseModel):
-    score: int
-    comment: str
-    suggestions: List[str]
-    correct_answer: str
-
-# Хранилище данных (в памяти для простоты)
-interviews = {}
+@app.exception_handler(LLMOverloaded)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloaded):
+    """Очередь Ollama переполнена: быстрый отказ вместо долгого ожидания слота"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Сервис оценки перегружен, повторите запрос позже", "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# Хранилище сессий в памяти процесса (если не включен PERSISTENCE_BACKEND=prisma)
+memory_store = MemoryInterviewStore(
+    max_sessions=config.SESSION_MAX_SESSIONS,
+    idle_ttl=config.SESSION_IDLE_TTL,
+    finished_ttl=config.SESSION_FINISHED_TTL,
+    sweep_interval=config.SESSION_SWEEP_INTERVAL,
+    on_evict=release_session_resources,
+)
 questions_db = {
     "javascript-basics": [
         {
@@ -89,6 +605,49 @@ questions_db = {
     ]
 }
 
+# Банк вопросов с индексами (id, тема, сложность, ключевые слова эталонов)
+question_bank = QuestionBank(
+    load_questions_file(config.QUESTION_BANK_PATH) if config.QUESTION_BANK_PATH else questions_db
+)
+
+# Адаптивный выбор вопросов по пулам банка (None - вопросы по порядку темы)
+question_selector = (
+    QuestionSelector(question_bank, config.ADAPTIVE_RAISE_AT, config.ADAPTIVE_LOWER_BELOW)
+    if config.ADAPTIVE_DIFFICULTY_ENABLED else None
+)
+
+def current_question_data(session: InterviewSession) -> Optional[dict]:
+    """Текущий вопрос сессии: выбранный адаптивно или по порядку темы"""
+    if session.current_question_id is not None:
+        question = question_bank.get(session.current_question_id)
+        if question is not None:
+            return question
+    return question_bank.question_at(session.topic, session.current_question - 1)
+
+def prefetch_next_questions(session: InterviewSession) -> Optional[dict]:
+    """Кандидаты на следующий вопрос для каждого исхода оценки (выбираются до оценки ответа)"""
+    if question_selector is None or session.current_question_id is None:
+        return None
+    return question_selector.candidates(session)
+
+def predict_next_question(session: InterviewSession) -> Optional[dict]:
+    """Вероятный следующий вопрос: при адаптивном выборе - если средняя оценка не изменит уровень"""
+    if session.current_question >= session.total_questions:
+        return None
+    if question_selector is not None and session.current_question_id is not None:
+        question_id = question_selector.candidates(session).get(question_selector.target_level(session))
+        return question_bank.get(question_id) if question_id is not None else None
+    return question_bank.question_at(session.topic, session.current_question)
+
+def speculate_question_material(http_request: Request, session: InterviewSession, question: Optional[dict]) -> None:
+    """Начать в фоне готовить подсказку к вопросу, который сессия получит дальше"""
+    prefetcher = get_question_prefetcher(http_request)
+    if (
+        prefetcher is not None and config.QUESTION_PREFETCH_ENABLED and question is not None
+        and model_ready(http_request, config.OLLAMA_MODEL)
+    ):
+        prefetcher.speculate(session.id, question)
+
 # API Endpoints
 
 @app.get("/")
@@ -101,53 +660,71 @@ async def root():
             "start_interview": "POST /api/interview/start",
             "get_question": "GET /api/interview/question",
             "submit_answer": "POST /api/interview/answer", 
-            "end_interview": "POST /api/interview/end"
+            "submit_answer_stream": "POST /api/interview/answer/stream",
+            "end_interview": "POST /api/interview/end",
+            "interview_report": "GET /api/interview/report",
+            "interview_report_stream": "GET /api/interview/report/stream",
+            "answer_stats": "GET /api/stats"
         }
     }
 
 @app.post("/api/interview/start", response_model=InterviewSession)
-async def start_interview(request: InterviewStartRequest):
+async def start_interview(request: InterviewStartRequest, http_request: Request):
     """
     Начать новое интервью
     
     - **topic**: Тема интервью (например, "javascript-basics")
     - **difficulty**: Уровень сложности ("junior", "middle", "senior")
     - **question_count**: Количество вопросов
+    - **tags**: Задавать только вопросы с этими тегами (необязательно)
+    
+    При адаптивном выборе сложность следующих вопросов зависит от оценок
+    кандидата, вопросы не повторяются
     """
     interview_id = str(uuid.uuid4())
     
     # Проверяем, есть ли вопросы для данной темы
-    if request.topic not in questions_db:
+    if not question_bank.has_topic(request.topic):
         raise HTTPException(status_code=404, detail=f"Вопросы для темы '{request.topic}' не найдены")
     
+    available = (
+        question_selector.available_count(request.topic, request.tags)
+        if question_selector is not None else question_bank.topic_size(request.topic)
+    )
+    if available == 0:
+        raise HTTPException(status_code=404, detail=f"Вопросы с тегами {request.tags} в теме '{request.topic}' не найдены")
+    
     # Создаем новую сессию интервью
     session = InterviewSession(
         id=interview_id,
         topic=request.topic,
         difficulty=request.difficulty,
         current_question=1,
-        total_questions=min(request.question_count, len(questions_db[request.topic])),
-        start_time=datetime.now()
+        total_questions=min(request.question_count, available),
+        start_time=datetime.now(),
+        tags=request.tags
     )
+    if question_selector is not None:
+        question_selector.first_question(session)
+    speculate_question_material(http_request, session, current_question_data(session))
     
     # Сохраняем сессию
-    interviews[interview_id] = session
+    await get_interview_store(http_request).create(session)
     
     return session
 
 @app.get("/api/interview/question")
-async def get_question(interview_id: str):
+async def get_question(interview_id: str, http_request: Request):
     """
     Получить текущий вопрос для интервью
     
     - **interview_id**: ID сессии интервью
     """
     # Проверяем существование сессии
-    if interview_id not in interviews:
+    session = await get_interview_store(http_request).get(interview_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Сессия интервью не найдена")
     
-    session = interviews[interview_id]
-    
     # Проверяем, не завершено ли интервью
     if not session.is_active:
         raise HTTPException(status_code=400, detail="Интервью уже завершено")
@@ -157,20 +734,25 @@ async def get_question(interview_id: str):
         raise HTTPException(status_code=400, detail="Все вопросы пройдены")
     
     # Получаем вопрос
-    topic_questions = questions_db[session.topic]
-    question_index = session.current_question - 1
+    question_data = current_question_data(session)
     
-    if question_index >= len(topic_questions):
+    if question_data is None:
         raise HTTPException(status_code=400, detail="Вопросы закончились")
     
-    question_data = topic_questions[question_index]
+    hint = None
+    prefetcher = get_question_prefetcher(http_request)
+    if prefetcher is not None and model_ready(http_request, config.OLLAMA_MODEL):
+        hint = await prefetcher.material_for(session.id, question_data)
+        # Пока кандидат отвечает, готовим подсказку к следующему вопросу
+        speculate_question_material(http_request, session, predict_next_question(session))
     
     question = Question(
         id=question_data["id"],
         text=question_data["text"],
         topic=question_data["topic"],
         difficulty=question_data["difficulty"],
-        question_number=session.current_question
+        question_number=session.current_question,
+        hint=hint
     )
     
     return {
@@ -182,8 +764,102 @@ async def get_question(interview_id: str):
         }
     }
 
+async def get_answer_context(request: AnswerRequest, http_request: Request):
+    """Найти активную сессию и вопрос, на который отвечает кандидат"""
+    # Проверяем существование сессии
+    session = await get_interview_store(http_request).get(request.interview_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Сессия интервью не найдена")
+    
+    # Проверяем, не завершено ли интервью
+    if not session.is_active:
+        raise HTTPException(status_code=400, detail="Интервью уже завершено")
+    
+    # Находим вопрос в базе
+    current_question = question_bank.get_in_topic(session.topic, request.question_id)
+    
+    if not current_question:
+        raise HTTPException(status_code=404, detail="Вопрос не найден")
+    
+    return session, current_question
+
+async def llm_evaluate(http_request: Request, question: dict, answer: str,
+                       interview_id: Optional[str] = None) -> Optional[AnswerEvaluation]:
+    """
+    Оценка ответа моделью с учетом кеша
+    
+    interview_id - продолжить context предыдущих оценок этого интервью.
+    Возвращает None, если модель недоступна или не выставила оценку
+    """
+    ollama = get_ollama(http_request)
+    if ollama is None or not config.OLLAMA_FEEDBACK_ENABLED:
+        return None
+    
+    cache = get_feedback_cache(http_request)
+    if cache is not None:
+        cached = await cache.get(question["id"], config.OLLAMA_MODEL, answer)
+        if cached is not None:
+            return cached
+    
+    if not model_ready(http_request, config.OLLAMA_MODEL):
+        return None
+    
+    batcher = get_evaluation_batcher(http_request)
+    contexts = get_session_contexts(http_request) if interview_id is not None else None
+    context = contexts.get(interview_id, config.OLLAMA_MODEL) if contexts is not None else None
+    try:
+        if batcher is not None:
+            evaluation, response = await batcher.submit_in_session(
+                config.OLLAMA_MODEL, question["text"], question["correct_answer"], answer,
+                context=context, session_key=interview_id
+            )
+        else:
+            evaluation, response = await evaluate_answer_in_session(
+                ollama, config.OLLAMA_MODEL, question["text"], question["correct_answer"], answer,
+                context=context, session_key=interview_id
+            )
+    except LLMOverloaded:
+        # Перегрузку не маскируем простым анализом: клиент получит 503 и повторит ответ
+        raise
+    except Exception as e:
+        logger.warning(f"Оценка через Ollama недоступна, используем простой анализ: {e}")
+        if contexts is not None:
+            contexts.drop(interview_id)
+        return None
+    
+    if contexts is not None:
+        contexts.record(interview_id, config.OLLAMA_MODEL, context, response)
+    
+    # Оценка с context зависит от предыдущих ответов кандидата: в общий кеш ее не кладем
+    if evaluation is not None and cache is not None and not context:
+        await cache.set(question["id"], config.OLLAMA_MODEL, answer, evaluation)
+    return evaluation
+
+async def record_answer(http_request: Request, session: InterviewSession, request: AnswerRequest, feedback: Feedback,
+                        upcoming: Optional[dict] = None):
+    """Учесть оценку за ответ в сессии, выбрать следующий вопрос и сохранить ответ"""
+    def apply(current: InterviewSession) -> None:
+        # Изменяем актуальное состояние: пока шла оценка, интервью мог изменить другой запрос
+        current.score += feedback.score
+        current.current_question += 1
+        if question_selector is not None and current.current_question_id is not None:
+            question_selector.advance(current, upcoming)
+    
+    store = get_interview_store(http_request)
+    # None - сессию успели удалить (TTL хранилища в памяти): ответ уже некуда записать
+    session = await store.update(session.id, apply) or session
+    if question_selector is not None and session.current_question_id is not None:
+        # Следующий вопрос известен точно: если предсказание не сбылось, слот заменяется
+        if session.current_question <= session.total_questions:
+            speculate_question_material(http_request, session, current_question_data(session))
+    await store.add_answer(session, request.question_id, request.answer, feedback, request.time_spent)
+    
+    answer_stats = get_answer_stats(http_request)
+    if answer_stats is not None:
+        answer_stats.record_answer(session.topic, request.question_id, feedback.score, request.time_spent)
+
 @app.post("/api/interview/answer", response_model=Feedback)
-async def submit_answer(request: AnswerRequest):
+async def submit_answer(request: AnswerRequest, http_request: Request):
     """
     Отправить ответ на вопрос и получить фидбэк
     
@@ -192,91 +868,368 @@ async def submit_answer(request: AnswerRequest):
     - **answer**: Ответ пользователя
     - **time_spent**: Время, потраченное на ответ (в секундах)
     """
-    # Проверяем существование сессии
-    if request.interview_id not in interviews:
-        raise HTTPException(status_code=404, detail="Сессия интервью не найдена")
+    session, current_question = await get_answer_context(request, http_request)
+    upcoming = prefetch_next_questions(session)
     
-    session = interviews[request.interview_id]
+    evaluation = await llm_evaluate(http_request, current_question, request.answer, request.interview_id)
+    if evaluation is not None:
+        feedback = build_feedback(evaluation, request.answer, current_question["correct_answer"])
+    else:
+        feedback = await fallback_feedback(http_request, current_question, request.answer)
     
-    # Проверяем, не завершено ли интервью
-    if not session.is_active:
-        raise HTTPException(status_code=400, detail="Интервью уже завершено")
+    # Обновляем сессию
+    await record_answer(http_request, session, request, feedback, upcoming)
     
-    # Находим вопрос в базе
-    topic_questions = questions_db[session.topic]
-    current_question = None
+    return feedback
+
+def sse_event(event: str, data: dict) -> str:
+    """Сформировать событие Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/interview/answer/stream")
+async def submit_answer_stream(request: AnswerRequest, http_request: Request):
+    """
+    Отправить ответ и получить фидбэк потоком (Server-Sent Events)
     
-    for q in topic_questions:
-        if q["id"] == request.question_id:
-            current_question = q
-            break
+    Пока модель генерирует отзыв, приходят события `token` с очередным
+    фрагментом текста. Последним приходит событие `feedback` с итоговой
+    оценкой (та же структура, что у POST /api/interview/answer).
+    При сбое генерации фидбэк строится простым анализом ответа, при
+    переполненной очереди Ollama - 503 до начала потока.
+    """
+    session, current_question = await get_answer_context(request, http_request)
+    ollama = get_ollama(http_request)
+    cache = get_feedback_cache(http_request)
+    contexts = get_session_contexts(http_request)
+    upcoming = prefetch_next_questions(session)
     
-    if not current_question:
-        raise HTTPException(status_code=404, detail="Вопрос не найден")
+    cached = None
+    if ollama is not None and config.OLLAMA_FEEDBACK_ENABLED and cache is not None:
+        cached = await cache.get(current_question["id"], config.OLLAMA_MODEL, request.answer)
+    if cached is None and ollama is not None and config.OLLAMA_FEEDBACK_ENABLED:
+        # После начала потока статус уже не поменять: отказываем заранее
+        check_llm_admission(http_request)
     
-    # Простой анализ ответа (в реальном проекте здесь будет AI)
-    score = analyze_answer_simple(request.answer, current_question["correct_answer"])
+    # Оценка и запись ответа идут в отдельной задаче: если клиент закроет поток,
+    # ответ все равно будет учтен, и интервью перейдет к следующему вопросу
+    events: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
     
-    # Обновляем сессию
-    session.score += score
-    session.current_question += 1
+    async def evaluate_and_record():
+        try:
+            evaluation = cached
+            if (
+                evaluation is None and ollama is not None and config.OLLAMA_FEEDBACK_ENABLED
+                and model_ready(http_request, config.OLLAMA_MODEL)
+            ):
+                context = contexts.get(request.interview_id, config.OLLAMA_MODEL) if contexts is not None else None
+                ollama_request = build_evaluation_request(
+                    config.OLLAMA_MODEL,
+                    current_question["text"], current_question["correct_answer"], request.answer,
+                    stream=True, context=context
+                )
+                chunks = []
+                try:
+                    async for chunk in ollama.generate_stream(ollama_request, session_key=request.interview_id):
+                        if chunk.response:
+                            chunks.append(chunk.response)
+                            events.put_nowait(sse_event("token", {"text": chunk.response}))
+                        if chunk.done and contexts is not None:
+                            contexts.record(request.interview_id, config.OLLAMA_MODEL, context, chunk)
+                    evaluation = parse_evaluation("".join(chunks))
+                except Exception as e:
+                    logger.warning(f"Потоковая оценка через Ollama прервана, используем простой анализ: {e}")
+                    if contexts is not None:
+                        contexts.drop(request.interview_id)
+                if evaluation is not None and cache is not None and not context:
+                    await cache.set(current_question["id"], config.OLLAMA_MODEL, request.answer, evaluation)
+            
+            if evaluation is not None:
+                feedback = build_feedback(evaluation, request.answer, current_question["correct_answer"])
+            else:
+                feedback = await fallback_feedback(http_request, current_question, request.answer)
+            await record_answer(http_request, session, request, feedback, upcoming)
+            events.put_nowait(sse_event("feedback", feedback.model_dump()))
+        except Exception as e:
+            logger.error(f"Не удалось записать ответ интервью {request.interview_id}: {e}")
+            raise
+        finally:
+            events.put_nowait(None)
     
-    # Генерируем фидбэк
-    feedback = generate_feedback(score, request.answer, current_question["correct_answer"])
+    recording = run_in_background(evaluate_and_record())
     
-    return feedback
+    async def event_stream():
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+        # Ошибку записи ответа отдаем клиенту, как и раньше (поток обрывается)
+        await recording
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/api/interview/end")
-async def end_interview(interview_id: str):
+async def end_interview(interview_id: str, http_request: Request):
     """
     Завершить интервью
     
     - **interview_id**: ID сессии интервью
     """
     # Проверяем существование сессии
-    if interview_id not in interviews:
-        raise HTTPException(status_code=404, detail="Сессия интервью не найдена")
+    store = get_interview_store(http_request)
+    was_active = False
     
-    session = interviews[interview_id]
+    def finish(current: InterviewSession) -> None:
+        nonlocal was_active
+        was_active = current.is_active
+        current.is_active = False
     
     # Завершаем интервью
-    session.is_active = False
+    session = await store.update(interview_id, finish)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Сессия интервью не найдена")
+    summary = score_summary(session)
+    
+    answer_stats = get_answer_stats(http_request)
+    if answer_stats is not None and was_active:
+        answer_stats.record_interview(session.topic, summary["percentage"])
+    
+    # Context модели и закрепление за узлом Ollama больше не понадобятся
+    release_session_resources(interview_id)
     
-    # Вычисляем итоговую оценку
-    total_score = session.score
-    max_possible_score = session.total_questions * 10
-    percentage = (total_score / max_possible_score) * 100 if max_possible_score > 0 else 0
+    # Итоговый отчет строится в фоне: здесь только оценка и id задания
+    pipeline = get_report_pipeline(http_request)
+    report_job = pipeline.submit(session) if pipeline is not None else None
     
     return {
         "message": "Интервью завершено",
-        "final_score": total_score,
-        "max_possible_score": max_possible_score,
-        "percentage": round(percentage, 2),
-        "questions_answered": session.current_question - 1,
-        "total_questions": session.total_questions
+        **summary,
+        "report_job_id": report_job.id if report_job is not None else None,
+        "report_status": report_job.status if report_job is not None else None
     }
 
-# Вспомогательные функции
+async def find_report_job(http_request: Request, job_id: str):
+    """Задание отчета этого воркера или (задание выполнял другой воркер) сохраненный отчет"""
+    pipeline = get_report_pipeline(http_request)
+    if pipeline is None:
+        raise HTTPException(status_code=503, detail="Итоговые отчеты выключены")
+    job = pipeline.get(job_id)
+    if job is not None:
+        return pipeline, job, None
+    report = await get_interview_store(http_request).load_report(job_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Задание отчета не найдено")
+    return pipeline, None, finished_snapshot(job_id, report)
 
-def analyze_answer_simple(user_answer: str, correct_answer: str) -> int:
+@app.get("/api/interview/report")
+async def get_interview_report(job_id: str, http_request: Request):
+    """
+    Статус задания итогового отчета (опрос)
+    
+    - **job_id**: `report_job_id` из ответа `/api/interview/end`
+    
+    Статусы: `queued`, `running`, `done` (в поле `report` - отчет), `failed`
+    """
+    _, job, stored = await find_report_job(http_request, job_id)
+    return job.snapshot() if job is not None else stored
+
+@app.get("/api/interview/report/stream")
+async def stream_interview_report(job_id: str, http_request: Request):
     """
-    Простой анализ ответа (заглушка для AI)
-    В реальном проекте здесь будет интеграция с Ollama или OpenAI
+    Статус задания итогового отчета потоком (Server-Sent Events)
+    
+    События: `status` (текущий статус и его изменения), `token` (фрагменты
+    сводки модели по мере генерации) и последним `report` - то же, что
+    возвращает `GET /api/interview/report`.
     """
-    user_words = set(user_answer.lower().split())
-    correct_words = set(correct_answer.lower().split())
+    pipeline, job, stored = await find_report_job(http_request, job_id)
     
-    # Простое сравнение по ключевым словам
-    common_words = user_words.intersection(correct_words)
+    async def event_stream():
+        if job is None:
+            yield sse_event("report", stored)
+            return
+        async for event, data in pipeline.subscribe(job):
+            yield sse_event(event, data)
     
-    if len(common_words) >= len(correct_words) * 0.7:
-        return 9  # Отличный ответ
-    elif len(common_words) >= len(correct_words) * 0.5:
-        return 7  # Хороший ответ
-    elif len(common_words) >= len(correct_words) * 0.3:
-        return 5  # Средний ответ
-    else:
-        return 3  # Слабый ответ
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/stats")
+async def answer_statistics(request: Request, question_id: Optional[str] = None):
+    """
+    Статистика ответов: оценки, доля верных, time_spent, итоги интервью
+    
+    Без параметров - по всем ответам и по темам. С **question_id** - по одному
+    вопросу (средняя оценка рядом с заявленной сложностью - для калибровки).
+    Считается из накопительных счетчиков, без запросов к базе.
+    """
+    answer_stats = get_answer_stats(request)
+    if answer_stats is None:
+        raise HTTPException(status_code=503, detail="Статистика ответов не инициализирована")
+    
+    if question_id is None:
+        return answer_stats.overview()
+    question = question_bank.get(question_id)
+    return {
+        "question_id": question_id,
+        "difficulty": question["difficulty"] if question is not None else None,
+        **answer_stats.question(question_id),
+    }
+
+@app.get("/api/ollama/stats")
+async def ollama_stats(request: Request):
+    """
+    Нагрузка на Ollama: очередь на семафоре, запросы в работе, задержки
+    """
+    ollama = get_ollama(request)
+    if ollama is None:
+        raise HTTPException(status_code=503, detail="Клиент Ollama не инициализирован")
+    
+    batcher = get_evaluation_batcher(request)
+    warmer = get_model_warmer(request)
+    contexts = get_session_contexts(request)
+    prefetcher = get_question_prefetcher(request)
+    reports = get_report_pipeline(request)
+    return {
+        "base_url": ollama.base_url,
+        "max_concurrency": ollama.max_concurrency,
+        **ollama.stats.snapshot(),
+        "batching": batcher.stats() if batcher is not None else None,
+        "warmup": warmer.stats() if warmer is not None else None,
+        "session_context": contexts.stats() if contexts is not None else None,
+        "question_prefetch": prefetcher.stats() if prefetcher is not None else None,
+        "reports": reports.stats() if reports is not None else None,
+        "queue": queue_stats(llm_queues(ollama)),
+        "router": ollama.nodes_stats() if isinstance(ollama, OllamaRouter) else None
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Метрики в формате Prometheus"""
+    return PlainTextResponse(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/api/admin/feedback-cache", dependencies=[Depends(require_admin)])
+async def feedback_cache_stats(request: Request):
+    """Статистика кеша оценок LLM: размер, попадания/промахи, вытеснения"""
+    cache = get_feedback_cache(request)
+    if cache is None:
+        raise HTTPException(status_code=503, detail="Кеш оценок не инициализирован")
+    
+    return cache.stats()
+
+@app.delete("/api/admin/feedback-cache", dependencies=[Depends(require_admin)])
+async def invalidate_feedback_cache(request: Request, question_id: Optional[str] = None, model: Optional[str] = None):
+    """
+    Сбросить кеш оценок
+    
+    - **question_id**: только для этого вопроса
+    - **model**: только для этой модели
+    
+    Без параметров очищается весь кеш.
+    """
+    cache = get_feedback_cache(request)
+    if cache is None:
+        raise HTTPException(status_code=503, detail="Кеш оценок не инициализирован")
+    
+    removed = await cache.invalidate(question_id=question_id, model=model)
+    return {"removed": removed}
+
+@app.post("/api/admin/questions/reload", dependencies=[Depends(require_admin)])
+async def reload_questions(request: Request):
+    """
+    Перечитать банк вопросов из QUESTION_BANK_PATH без остановки сервера
+    
+    Индексы собираются в фоновом потоке, текущие запросы продолжают
+    работать со старой версией банка до подмены.
+    """
+    if not config.QUESTION_BANK_PATH:
+        raise HTTPException(status_code=400, detail="QUESTION_BANK_PATH не задан")
+    
+    try:
+        questions_by_topic = await asyncio.to_thread(load_questions_file, config.QUESTION_BANK_PATH)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Не удалось прочитать банк вопросов: {e}")
+    
+    total = await question_bank.reload(questions_by_topic)
+    
+    scorer = get_semantic_scorer(request)
+    if scorer is not None:
+        run_in_background(index_reference_answers(scorer))
+    
+    return {"questions": total, "topics": question_bank.topics()}
+
+# Одна выгрузка за раз: запуски делят watermark в EXPORT_DIR
+export_lock = asyncio.Lock()
+
+@app.post("/api/admin/export", dependencies=[Depends(require_admin)])
+async def export_interview_results(format: str = config.EXPORT_FORMAT, full: bool = False):
+    """
+    Выгрузить ответы новее прошлой выгрузки в EXPORT_DIR (Parquet/Arrow/CSV)
+    
+    - **format**: auto (parquet, если установлен pyarrow, иначе csv), parquet, arrow, csv
+    - **full**: выгрузить все ответы, а не только новее watermark
+    
+    Строки читаются серверным курсором в фоновом потоке, event loop не блокируется.
+    """
+    if not config.DATABASE_URL:
+        raise HTTPException(status_code=400, detail="Выгрузка требует PostgreSQL (DATABASE_URL)")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Формат должен быть одним из: {', '.join(EXPORT_FORMATS)}")
+    if export_lock.locked():
+        raise HTTPException(status_code=409, detail="Выгрузка уже выполняется")
+    
+    async with export_lock:
+        try:
+            return await asyncio.to_thread(
+                export_results, config.DATABASE_URL, config.EXPORT_DIR, format,
+                config.EXPORT_BATCH_SIZE, config.EXPORT_LAG_SECONDS, full,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+# Вспомогательные функции
+
+def analyze_answer_simple(user_answer: str, correct_answer: str) -> int:
+    """
+    Анализ ответа по ключевым словам без предварительного индекса
+    
+    Для вопросов из базы используйте question_bank.keyword_index.score: эталон там уже разобран
+    """
+    index = KeywordIndex()
+    index.add("", correct_answer)
+    return index.get("").score(tokenize_answer(user_answer))
+
+async def fallback_feedback(http_request: Request, question: dict, answer: str) -> Feedback:
+    """
+    Фидбэк без LLM-оценки: по близости эмбеддингов к эталонному ответу,
+    а если эмбеддинги недоступны - по ключевым словам
+    """
+    score = None
+    scorer = get_semantic_scorer(http_request)
+    if scorer is not None and model_ready(http_request, scorer.model):
+        try:
+            score = await scorer.score(question, answer)
+        except Exception as e:
+            logger.warning(f"Семантическая оценка недоступна, используем простой анализ: {e}")
+    if score is None:
+        score = question_bank.keyword_index.score(question, answer)
+    return generate_feedback(score, answer, question["correct_answer"])
+
+def build_feedback(evaluation: AnswerEvaluation, user_answer: str, correct_answer: str) -> Feedback:
+    """Фидбэк по оценке модели"""
+    feedback = generate_feedback(evaluation.score, user_answer, correct_answer)
+    if evaluation.comment:
+        feedback.comment = evaluation.comment
+    if evaluation.suggestions:
+        feedback.suggestions = evaluation.suggestions
+    return feedback
 
 def generate_feedback(score: int, user_answer: str, correct_answer: str) -> Feedback:
     """Генерация фидбэка на основе оценки"""
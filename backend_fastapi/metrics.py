@@ -0,0 +1,320 @@
+"""
+Метрики приложения в формате Prometheus (text exposition 0.0.4)
+
+Счетчики и гистограммы - простые объекты со __slots__, которые меняются
+без блокировок: все обработчики выполняются в одном event loop, а
+отдельный инкремент атрибута атомарен под GIL. Дочерние метрики с
+метками создаются один раз и запоминаются вызывающим кодом, поэтому на
+горячем пути нет ни словарей меток, ни форматирования строк - только
+поиск по ключу и сложение. Текст формируется при запросе /metrics.
+
+При нескольких воркерах uvicorn у каждого процесса свои метрики:
+Prometheus собирает их по отдельности (или через агрегирующий прокси).
+"""
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Границы корзин (секунды) для задержек HTTP и запросов к Ollama
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Загрузка модели в память занимает от долей секунды до минут
+LOAD_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 400)
+
+# charset добавляет PlainTextResponse
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        # Последняя ячейка - корзина +Inf
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricFamily:
+    """Метрика с фиксированным набором имен меток и дочерними метриками по значениям"""
+
+    def __init__(self, name: str, help_text: str, kind: str, label_names: Sequence[str] = (),
+                 buckets: Optional[Sequence[float]] = None):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets) if buckets is not None else None
+        # значения меток -> (текст меток, метрика)
+        self._children: Dict[Tuple[str, ...], Tuple[str, object]] = {}
+
+    def labels(self, *values: str):
+        """Дочерняя метрика для значений меток (вызывайте один раз и храните результат)"""
+        child = self._children.get(values)
+        if child is None:
+            metric = Histogram(self.buckets) if self.kind == "histogram" else Counter()
+            child = (_label_text(self.label_names, values), metric)
+            self._children[values] = child
+        return child[1]
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, metric in self._children.values():
+            if self.kind == "histogram":
+                prefix = labels + "," if labels else ""
+                cumulative = 0
+                for bound, count in zip(self.bounds_with_inf, metric.counts):
+                    cumulative += count
+                    yield f'{self.name}_bucket{{{prefix}le="{_format_value(bound)}"}} {cumulative}'
+                suffix = f"{{{labels}}}" if labels else ""
+                yield f"{self.name}_sum{suffix} {_format_value(metric.sum)}"
+                yield f"{self.name}_count{suffix} {metric.count}"
+            else:
+                suffix = f"{{{labels}}}" if labels else ""
+                yield f"{self.name}{suffix} {_format_value(metric.value)}"
+
+    @property
+    def bounds_with_inf(self) -> Tuple[float, ...]:
+        return self.buckets + (float("inf"),)
+
+
+class GaugeFunction:
+    """Значение, вычисляемое при сборе метрик (размеры очередей, доли попаданий в кеш)"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} gauge"
+        for values, value in self.collect():
+            labels = _label_text(self.label_names, values)
+            suffix = f"{{{labels}}}" if labels else ""
+            yield f"{self.name}{suffix} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families: List[object] = []
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> MetricFamily:
+        family = MetricFamily(name, help_text, "counter", label_names)
+        self._families.append(family)
+        return family
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+        family = MetricFamily(name, help_text, "histogram", label_names, buckets)
+        self._families.append(family)
+        return family
+
+    def gauge_function(self, name: str, help_text: str,
+                       collect: Callable[[], Iterable[Tuple[Sequence[str], float]]],
+                       label_names: Sequence[str] = ()) -> GaugeFunction:
+        gauge = GaugeFunction(name, help_text, label_names, collect)
+        self._families.append(gauge)
+        return gauge
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self._families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+class _ModelMetrics:
+    __slots__ = ("load", "prompt_eval", "eval", "tokens_per_second", "prompt_tokens", "eval_tokens")
+
+
+class OllamaMetrics:
+    """Метрики вызовов Ollama; методы вызываются из OllamaClient"""
+
+    ENDPOINTS = ("/api/generate", "/api/embeddings", "/api/chat", "/api/tags", "/api/pull")
+    PRIORITIES = ("interactive", "report", "background")
+
+    def __init__(self, registry: MetricsRegistry):
+        queue_wait = registry.histogram(
+            "ollama_queue_wait_seconds", "Ожидание слота генерации в очереди клиента", ("priority",)
+        )
+        self._queue_wait = {priority: queue_wait.labels(priority) for priority in self.PRIORITIES}
+        requests = registry.histogram(
+            "ollama_request_duration_seconds", "Время запроса к Ollama API", ("endpoint",)
+        )
+        errors = registry.counter("ollama_request_errors_total", "Неудачные запросы к Ollama API", ("endpoint",))
+        self._requests = {endpoint: requests.labels(endpoint) for endpoint in self.ENDPOINTS}
+        self._errors = {endpoint: errors.labels(endpoint) for endpoint in self.ENDPOINTS}
+
+        self._load = registry.histogram(
+            "ollama_load_duration_seconds", "Загрузка модели (load_duration)", ("model",), LOAD_BUCKETS
+        )
+        self._prompt_eval = registry.histogram(
+            "ollama_prompt_eval_duration_seconds", "Обработка промпта (prompt_eval_duration)", ("model",)
+        )
+        self._eval = registry.histogram(
+            "ollama_eval_duration_seconds", "Генерация ответа (eval_duration)", ("model",)
+        )
+        self._tokens_per_second = registry.histogram(
+            "ollama_tokens_per_second", "Скорость генерации (eval_count / eval_duration)", ("model",),
+            TOKENS_PER_SECOND_BUCKETS,
+        )
+        self._prompt_tokens = registry.counter("ollama_prompt_tokens_total", "Токены промпта", ("model",))
+        self._eval_tokens = registry.counter("ollama_eval_tokens_total", "Сгенерированные токены", ("model",))
+        self._models: Dict[str, _ModelMetrics] = {}
+
+    def _model(self, model: str) -> _ModelMetrics:
+        metrics = self._models.get(model)
+        if metrics is None:
+            metrics = _ModelMetrics()
+            metrics.load = self._load.labels(model)
+            metrics.prompt_eval = self._prompt_eval.labels(model)
+            metrics.eval = self._eval.labels(model)
+            metrics.tokens_per_second = self._tokens_per_second.labels(model)
+            metrics.prompt_tokens = self._prompt_tokens.labels(model)
+            metrics.eval_tokens = self._eval_tokens.labels(model)
+            self._models[model] = metrics
+        return metrics
+
+    def observe_queue_wait(self, seconds: float, priority: str = "interactive") -> None:
+        self._queue_wait[priority].observe(seconds)
+
+    def observe_request(self, endpoint: str, seconds: float, failed: bool) -> None:
+        histogram = self._requests.get(endpoint)
+        if histogram is None:
+            return
+        histogram.observe(seconds)
+        if failed:
+            self._errors[endpoint].inc()
+
+    def observe_generation(self, data: dict) -> None:
+        """Учесть длительности из финальной записи генерации (поля в наносекундах)"""
+        model = data.get("model")
+        if not model:
+            return
+        metrics = self._model(model)
+        load = data.get("load_duration")
+        if load:
+            metrics.load.observe(load / 1e9)
+        prompt_eval = data.get("prompt_eval_duration")
+        if prompt_eval:
+            metrics.prompt_eval.observe(prompt_eval / 1e9)
+        if data.get("prompt_eval_count"):
+            metrics.prompt_tokens.inc(data["prompt_eval_count"])
+        eval_duration = data.get("eval_duration")
+        eval_count = data.get("eval_count")
+        if eval_duration:
+            metrics.eval.observe(eval_duration / 1e9)
+            if eval_count:
+                metrics.tokens_per_second.observe(eval_count * 1e9 / eval_duration)
+        if eval_count:
+            metrics.eval_tokens.inc(eval_count)
+
+
+class _RouteMetrics:
+    __slots__ = ("latency", "statuses", "family", "path")
+
+    def __init__(self, latency: Histogram, family: MetricFamily, path: str):
+        self.latency = latency
+        self.family = family
+        self.path = path
+        self.statuses: Dict[int, Counter] = {}
+
+    def status(self, code: int) -> Counter:
+        counter = self.statuses.get(code)
+        if counter is None:
+            counter = self.family.labels(self.path, str(code))
+            self.statuses[code] = counter
+        return counter
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: время обработки и коды ответов по маршрутам
+
+    Время считается до отправки последней части тела, то есть для SSE
+    включает всю генерацию. Пути, которых нет среди маршрутов приложения,
+    учитываются под меткой "other", чтобы число рядов не росло.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self._latency = registry.histogram(
+            "http_request_duration_seconds", "Время обработки HTTP запроса", ("path",)
+        )
+        self._requests = registry.counter("http_requests_total", "HTTP запросы по коду ответа", ("path", "status"))
+        self._routes: Dict[str, _RouteMetrics] = {}
+        self._known_paths: Optional[frozenset] = None
+
+    def _route(self, scope) -> _RouteMetrics:
+        path = scope["path"]
+        route = self._routes.get(path)
+        if route is not None:
+            return route
+        if self._known_paths is None:
+            self._known_paths = frozenset(
+                getattr(r, "path", "") for r in getattr(scope.get("app"), "routes", ())
+            )
+        label = path if path in self._known_paths else "other"
+        route = self._routes.get(label)
+        if route is None:
+            route = _RouteMetrics(self._latency.labels(label), self._requests, label)
+            self._routes[label] = route
+        if label == path:
+            self._routes[path] = route
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route(scope)
+            route.latency.observe(time.perf_counter() - started)
+            route.status(status_code).inc()
@@ -0,0 +1,286 @@
+"""
+Прогрев моделей Ollama и удержание их в памяти
+
+Ollama выгружает модель после простоя (keep_alive), и первый запрос после
+этого платит load_duration - для модели 7B это секунды. Менеджер загружает
+нужные модели при старте приложения, периодически отправляет пустые
+запросы с keep_alive, чтобы модель не выгружалась, и по наблюдаемому
+load_duration замечает, что модель все-таки была выгружена: такая модель
+снова считается прогреваемой, пока пинг не подтвердит, что она загружена.
+Пока модель не прогрета, is_warm() возвращает False, и приложение
+оценивает ответы без LLM, а не заставляет кандидата ждать загрузки.
+
+С роутером (OllamaRouter) состояние ведется по каждому узлу отдельно:
+модель считается готовой, если она прогрета хотя бы на одном узле.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from llm_queue import LLMOverloaded, Priority, llm_priority
+from ollama_client import OllamaClient, OllamaGenerateRequest
+
+logger = logging.getLogger(__name__)
+
+STATE_COLD = "cold"
+STATE_WARMING = "warming"
+STATE_WARM = "warm"
+STATE_MISSING = "missing"
+
+
+class ModelState:
+    """Состояние одной модели на одном узле Ollama"""
+
+    __slots__ = ("name", "node", "client", "embedding", "state", "warmed_at", "last_attempt_at", "last_ping_at",
+                 "last_load_duration", "max_load_duration", "loads", "evictions", "ping_failures", "warm_event")
+
+    def __init__(self, name: str, client: OllamaClient, embedding: bool):
+        self.name = name
+        self.node = client.base_url
+        self.client = client
+        self.embedding = embedding
+        self.state = STATE_COLD
+        self.warmed_at: Optional[float] = None
+        self.last_attempt_at = float("-inf")
+        self.last_ping_at: Optional[float] = None
+        self.last_load_duration = 0.0
+        self.max_load_duration = 0.0
+        self.loads = 0
+        self.evictions = 0
+        self.ping_failures = 0
+        self.warm_event = asyncio.Event()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "embedding": self.embedding,
+            "last_load_duration": round(self.last_load_duration, 3),
+            "max_load_duration": round(self.max_load_duration, 3),
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "ping_failures": self.ping_failures,
+        }
+
+
+class ModelWarmer:
+    """
+    Фоновый менеджер прогрева моделей
+
+    client - OllamaClient или OllamaRouter (тогда прогреваются все узлы).
+    models - модели генерации, embedding_models - модели эмбеддингов
+    (прогреваются через /api/embeddings). load_threshold - load_duration
+    (секунды), начиная с которого загрузка считается холодной: если она
+    случилась у модели, которую мы считали прогретой, значит Ollama ее
+    выгрузила. Холодные модели (Ollama недоступна, ошибка загрузки)
+    пробуем прогреть снова не чаще раза в retry_interval секунд.
+    """
+
+    def __init__(
+        self,
+        client,
+        models: Iterable[str],
+        embedding_models: Iterable[str] = (),
+        keep_alive: str = "30m",
+        ping_interval: float = 240.0,
+        load_threshold: float = 1.0,
+        retry_interval: float = 15.0,
+    ):
+        self.clients: List[OllamaClient] = list(getattr(client, "clients", None) or [client])
+        self.keep_alive = keep_alive
+        self.ping_interval = ping_interval
+        self.load_threshold = load_threshold
+        self.retry_interval = retry_interval
+        # узел -> модель -> состояние
+        self.nodes: Dict[str, Dict[str, ModelState]] = {}
+        for node_client in self.clients:
+            states = self.nodes.setdefault(node_client.base_url, {})
+            for name in models:
+                states.setdefault(name, ModelState(name, node_client, embedding=False))
+            for name in embedding_models:
+                states.setdefault(name, ModelState(name, node_client, embedding=True))
+        self._listeners: List[Tuple[OllamaClient, Callable[[dict], None]]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._warming: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    def states(self) -> Iterable[ModelState]:
+        for states in self.nodes.values():
+            yield from states.values()
+
+    async def start(self) -> None:
+        """Запустить прогрев в фоне: старт приложения не ждет загрузки моделей"""
+        for node_client in self.clients:
+            listener = functools.partial(self.observe_generation, node_client.base_url)
+            node_client.add_generation_listener(listener)
+            self._listeners.append((node_client, listener))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        for node_client, listener in self._listeners:
+            node_client.remove_generation_listener(listener)
+        self._listeners.clear()
+        tasks = [t for t in (self._task, *self._warming.values()) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._warming.clear()
+
+    def _model_states(self, model: str) -> List[ModelState]:
+        return [states[model] for states in self.nodes.values() if model in states]
+
+    def is_warm(self, model: str, node: Optional[str] = None) -> bool:
+        """
+        Можно ли отправлять модели трафик (на узел node или хотя бы на один узел).
+        Неизвестные менеджеру модели не ограничиваются
+        """
+        if node is not None:
+            state = self.nodes.get(node, {}).get(model)
+            return state is None or state.state == STATE_WARM
+        states = self._model_states(model)
+        return not states or any(state.state == STATE_WARM for state in states)
+
+    def ensure_warm(self, model: str) -> None:
+        """Запустить прогрев холодной модели на всех узлах, не дожидаясь его"""
+        now = time.monotonic()
+        for state in self._model_states(model):
+            if (
+                state.state == STATE_COLD
+                and (state.node, model) not in self._warming
+                and now - state.last_attempt_at >= self.retry_interval
+            ):
+                self._spawn_warm(state)
+
+    async def wait_warm(self, model: str, timeout: Optional[float] = None) -> bool:
+        """Дождаться прогрева модели хотя бы на одном узле (False - не успела за timeout)"""
+        if self.is_warm(model):
+            return True
+        self.ensure_warm(model)
+        waiters = [asyncio.create_task(state.warm_event.wait()) for state in self._model_states(model)]
+        done, pending = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        return bool(done)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keep_alive": self.keep_alive,
+            "ping_interval": self.ping_interval,
+            "nodes": {
+                node: {name: state.snapshot() for name, state in states.items()}
+                for node, states in self.nodes.items()
+            },
+        }
+
+    def observe_generation(self, node: str, data: dict) -> None:
+        """Учесть load_duration из финальной записи любой генерации узла (слушатель OllamaClient)"""
+        state = self.nodes.get(node, {}).get(data.get("model"))
+        load_duration = data.get("load_duration")
+        if state is None or not load_duration:
+            return
+        self._record_load(state, load_duration / 1e9)
+
+    def _record_load(self, state: ModelState, load_duration: float) -> None:
+        state.last_load_duration = load_duration
+        if load_duration > state.max_load_duration:
+            state.max_load_duration = load_duration
+        if load_duration < self.load_threshold:
+            return
+        state.loads += 1
+        if state.state == STATE_WARM and state.warmed_at is not None:
+            state.evictions += 1
+            logger.warning(f"Модель {state.name} была выгружена Ollama {state.node} (загрузка {load_duration:.1f} с)")
+            # Трафик уходит с узла, пока пинг не подтвердит загрузку (если пинг уже идет - его результат)
+            self._set_state(state, STATE_WARMING)
+            if (state.node, state.name) not in self._warming:
+                self._spawn_warm(state)
+
+    def _set_state(self, state: ModelState, value: str) -> None:
+        state.state = value
+        if value == STATE_WARM:
+            state.warmed_at = time.monotonic()
+            state.warm_event.set()
+        else:
+            state.warm_event.clear()
+
+    def _spawn_warm(self, state: ModelState) -> asyncio.Task:
+        key = (state.node, state.name)
+        task = asyncio.create_task(self._warm(state))
+        self._warming[key] = task
+        task.add_done_callback(lambda _: self._warming.pop(key, None))
+        return task
+
+    async def _ping(self, state: ModelState) -> float:
+        """Пустой запрос, который загружает модель и продлевает keep_alive. Возвращает load_duration"""
+        with llm_priority(Priority.BACKGROUND):
+            return await self._ping_request(state)
+
+    async def _ping_request(self, state: ModelState) -> float:
+        if state.embedding:
+            started = time.perf_counter()
+            await state.client.embeddings(state.name, "", keep_alive=self.keep_alive)
+            # /api/embeddings не сообщает load_duration: оцениваем по времени запроса
+            return time.perf_counter() - started
+        response = await state.client.generate(OllamaGenerateRequest(
+            model=state.name, prompt="", keep_alive=self.keep_alive
+        ))
+        return (response.load_duration or 0) / 1e9
+
+    async def _warm(self, state: ModelState) -> None:
+        state.last_attempt_at = time.monotonic()
+        previous = state.state
+        if state.state != STATE_WARM:
+            self._set_state(state, STATE_WARMING)
+        try:
+            load_duration = await self._ping(state)
+        except asyncio.CancelledError:
+            raise
+        except LLMOverloaded:
+            # Очередь занята оценками - значит, модель и так используется; повторим при следующем пинге
+            if state.state != previous:
+                self._set_state(state, previous)
+            return
+        except Exception as e:
+            state.ping_failures += 1
+            self._set_state(state, STATE_COLD)
+            logger.warning(f"Не удалось прогреть модель {state.name} на {state.node}: {e}")
+            return
+        state.last_ping_at = time.monotonic()
+        # Для генерации load_duration уже учтен слушателем observe_generation
+        if state.embedding:
+            self._record_load(state, load_duration)
+        if state.state != STATE_WARM:
+            logger.info(f"Модель {state.name} прогрета на {state.node} (загрузка {load_duration:.1f} с)")
+            self._set_state(state, STATE_WARM)
+
+    async def _check_installed(self, node_client: OllamaClient) -> None:
+        try:
+            installed = {model.name for model in await node_client.list_models()}
+        except Exception as e:
+            logger.warning(f"Не удалось получить список моделей Ollama {node_client.base_url}: {e}")
+            return
+        # Ollama дописывает тег :latest, если он не указан
+        installed |= {name.split(":")[0] for name in installed if name.endswith(":latest")}
+        for state in self.nodes[node_client.base_url].values():
+            if state.name not in installed:
+                self._set_state(state, STATE_MISSING)
+                logger.warning(
+                    f"Модель {state.name} не найдена в Ollama {state.node}: выполните `ollama pull {state.name}`"
+                )
+            elif state.state == STATE_MISSING:
+                self._set_state(state, STATE_COLD)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.gather(*(self._check_installed(c) for c in self.clients))
+            pending = [
+                self._warming.get((state.node, state.name)) or self._spawn_warm(state)
+                for state in self.states()
+                if state.state != STATE_MISSING
+            ]
+            await asyncio.gather(*pending, return_exceptions=True)
+            all_warm = all(state.state == STATE_WARM for state in self.states())
+            await asyncio.sleep(self.ping_interval if all_warm else min(self.retry_interval, self.ping_interval))
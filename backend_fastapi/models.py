@@ -0,0 +1,52 @@
+"""
+Модели данных API (Pydantic)
+"""
+
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import List, Optional, Tuple
+from datetime import datetime
+
+class InterviewStartRequest(BaseModel):
+    topic: str
+    difficulty: str = "middle"
+    question_count: int = 10
+    # Только вопросы с этими тегами (пусто - все вопросы темы)
+    tags: List[str] = []
+
+class InterviewSession(BaseModel):
+    id: str
+    topic: str
+    difficulty: str
+    current_question: int
+    total_questions: int
+    score: int = 0
+    start_time: datetime
+    is_active: bool = True
+    tags: List[str] = []
+    # Вопрос, выбранный для текущего шага (None - вопросы по порядку темы)
+    current_question_id: Optional[str] = None
+    # Уже заданные вопросы; в ответах API не отдаются
+    asked_question_ids: List[str] = Field(default_factory=list, exclude=True)
+    # Битовая маска заданных вопросов для снимка банка: (снимок, маска), см. question_selector
+    _asked_mask: Optional[Tuple[object, int]] = PrivateAttr(default=None)
+
+class Question(BaseModel):
+    id: str
+    text: str
+    topic: str
+    difficulty: str
+    question_number: int
+    # Подсказка модели (None, если не успела сгенерироваться или подсказки выключены)
+    hint: Optional[str] = None
+
+class AnswerRequest(BaseModel):
+    interview_id: str
+    question_id: str
+    answer: str
+    time_spent: int
+
+class Feedback(BaseModel):
+    score: int
+    comment: str
+    suggestions: List[str]
+    correct_answer: str
@@ -3,12 +3,32 @@
 """
 
 import asyncio
-import aiohttp
+import concurrent.futures
+import hashlib
 import json
-from typing import Optional, Dict, Any, List
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, Dict, Any, List, Sequence, Tuple, Union
 from pydantic import BaseModel
 import logging
 
+from llm_queue import PRIORITY_NAMES, LLMJobQueue, Priority, QueueTicket, current_priority
+from metrics import OllamaMetrics
+
+try:
+    # Необязательная зависимость: разбор потока генерации в несколько раз быстрее json
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+
+if TYPE_CHECKING:
+    # aiohttp импортируется при открытии сессии (start): импорт модуля не тянет HTTP-стек
+    import aiohttp
+
 logger = logging.getLogger(__name__)
 
 class OllamaGenerateRequest(BaseModel):
@@ -21,6 +41,8 @@ class OllamaGenerateRequest(BaseModel):
     context: Optional[List[int]] = None
     raw: Optional[bool] = None
     format: Optional[str] = None
+    # Сколько держать модель в памяти после запроса ("30m", секунды; -1 - всегда)
+    keep_alive: Optional[Union[str, int]] = None
 
 class OllamaGenerateResponse(BaseModel):
     model: str
@@ -42,32 +64,311 @@ class OllamaModelInfo(BaseModel):
     digest: str
     details: Optional[Dict[str, Any]] = None
 
+class OllamaClientStats:
+    """Счетчики нагрузки на Ollama: очередь на семафоре и время выполнения запросов"""
+
+    def __init__(self):
+        self.waiting = 0
+        self.in_flight = 0
+        self.requests_total = 0
+        self.errors_total = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        # Вызовы, которые не пошли в Ollama, а дождались чужой такой же генерации
+        self.coalesced_generate = 0
+        self.coalesced_stream = 0
+
+    def record(self, queue_wait: float, latency: float, failed: bool) -> None:
+        self.requests_total += 1
+        if failed:
+            self.errors_total += 1
+        self.queue_wait_total += queue_wait
+        self.latency_total += latency
+        if queue_wait > self.queue_wait_max:
+            self.queue_wait_max = queue_wait
+        if latency > self.latency_max:
+            self.latency_max = latency
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущее состояние счетчиков (время в секундах)"""
+        done = self.requests_total or 1
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "queue_wait_avg": round(self.queue_wait_total / done, 4),
+            "queue_wait_max": round(self.queue_wait_max, 4),
+            "latency_avg": round(self.latency_total / done, 4),
+            "latency_max": round(self.latency_max, 4),
+            "coalesced_generate": self.coalesced_generate,
+            "coalesced_stream": self.coalesced_stream,
+        }
+
+class StreamToken:
+    """
+    Промежуточный фрагмент потоковой генерации
+
+    На каждый токен создается только этот объект со __slots__, без
+    валидации pydantic. Полная модель OllamaGenerateResponse (с context
+    и длительностями) строится лишь для финальной записи done.
+    """
+
+    __slots__ = ("model", "created_at", "response")
+
+    done = False
+    context = None
+
+    def __init__(self, model: str, created_at: str, response: str):
+        self.model = model
+        self.created_at = created_at
+        self.response = response
+
+
+class NDJSONDecoder:
+    """
+    Разбор NDJSON из произвольных кусков байт
+
+    Куски из сети не совпадают с границами строк: хвост без перевода
+    строки остается в буфере (один bytearray на поток) до следующего куска.
+    """
+
+    __slots__ = ("_buffer",)
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        buffer = self._buffer
+        end = data.rfind(b"\n")
+        if end < 0:
+            buffer += data
+            return []
+        if buffer:
+            buffer += data[:end]
+            lines = buffer.split(b"\n")
+            buffer.clear()
+        else:
+            lines = data[:end].split(b"\n")
+        buffer += data[end + 1:]
+        return self._parse(lines)
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Последняя строка, если поток не закончился переводом строки"""
+        lines = [bytes(self._buffer)]
+        self._buffer.clear()
+        return self._parse(lines)
+
+    @staticmethod
+    def _parse(lines) -> List[Dict[str, Any]]:
+        records = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                records.append(json_loads(line))
+            except ValueError:
+                logger.warning(f"Пропущена некорректная строка потока Ollama: {line[:200]!r}")
+        return records
+
+
+class _StreamBroadcast:
+    """
+    Один поток генерации, раздаваемый нескольким подписчикам
+
+    Фрагменты накапливаются, поэтому подписчик, пришедший позже,
+    сначала получает уже сгенерированное, а затем - новые фрагменты.
+    Когда уходит последний подписчик, генерация отменяется.
+    """
+
+    def __init__(self):
+        self.chunks: List[Union["StreamToken", "OllamaGenerateResponse"]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.ticket: Optional[QueueTicket] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: Union["StreamToken", "OllamaGenerateResponse"]) -> None:
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def subscribe(self):
+        self.subscribers += 1
+        try:
+            position = 0
+            while True:
+                while position < len(self.chunks):
+                    yield self.chunks[position]
+                    position += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done and self.task is not None:
+                self.task.cancel()
+
 class OllamaClient:
-    """Клиент для работы с Ollama API"""
+    """
+    Клиент для работы с Ollama API
+
+    Один экземпляр рассчитан на все время жизни приложения: держит пул
+    keep-alive соединений и ограничивает число одновременных генераций
+    (max_concurrency), остальные запросы ждут своей очереди по приоритету
+    (llm_queue). max_queue - лимит очереди каждого приоритета, сверх него
+    запрос сразу завершается LLMOverloaded.
+
+    При coalesce=True одинаковые запросы (модель, промпт, параметры),
+    пришедшие одновременно, выполняются в Ollama один раз, а результат
+    (или поток фрагментов) получают все ожидающие.
+
+    Если передан metrics, каждый запрос, ожидание слота и длительности
+    из финальной записи генерации (загрузка модели, промпт, токены/с)
+    попадают в метрики Prometheus. Финальные записи генераций также
+    получают слушатели, добавленные через add_generation_listener.
+    """
     
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        max_concurrency: int = 4,
+        max_connections: int = 32,
+        max_connections_per_host: int = 8,
+        keepalive_timeout: float = 60.0,
+        request_timeout: float = 300.0,
+        coalesce: bool = True,
+        metrics: Optional[OllamaMetrics] = None,
+        max_queue: Optional[Sequence[int]] = None,
+    ):
         self.base_url = base_url.rstrip('/')
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self.coalesce = coalesce
+        self.stats = OllamaClientStats()
+        self.metrics = metrics
+        self._generation_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.queue = LLMJobQueue(max_concurrency, max_queue)
+        # Генерации в работе по ключу запроса (single-flight): задача и ее место в очереди
+        self._inflight_generate: Dict[str, Tuple[asyncio.Task, QueueTicket]] = {}
+        self._inflight_stream: Dict[str, _StreamBroadcast] = {}
+    
+    async def start(self):
+        """Открыть HTTP сессию с пулом соединений"""
+        if self.session and not self.session.closed:
+            return
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        # Общий таймаут не ставим: потоковая генерация может идти долго,
+        # ограничиваем только ожидание очередной порции данных
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=self.request_timeout)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+    
+    async def close(self):
+        """Закрыть HTTP сессию"""
+        if self.session:
+            await self.session.close()
+            self.session = None
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        await self.start()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        await self.close()
+    
+    def add_generation_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Вызывать listener(запись) для финальной записи каждой генерации (с длительностями)"""
+        self._generation_listeners.append(listener)
+    
+    def remove_generation_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        if listener in self._generation_listeners:
+            self._generation_listeners.remove(listener)
+    
+    def _observe_generation(self, data: Dict[str, Any]) -> None:
+        if self.metrics is not None:
+            self.metrics.observe_generation(data)
+        for listener in self._generation_listeners:
+            try:
+                listener(data)
+            except Exception as e:
+                logger.error(f"Ошибка в слушателе генераций: {e}")
+    
+    def admission_check(self, priority: Optional[Priority] = None, pending: int = 0) -> None:
+        """Отказать сразу (LLMOverloaded), если очередь приоритета заполнена; pending - запросы на подходе"""
+        self.queue.check(current_priority() if priority is None else priority, pending)
+    
+    @asynccontextmanager
+    async def _limited(self, ticket: Optional[QueueTicket] = None):
+        """
+        Занять слот генерации, учитывая время ожидания в очереди и время выполнения
+
+        ticket - место в очереди объединенного запроса (его поднимает присоединившийся вызов)
+        """
+        stats = self.stats
+        if ticket is None:
+            ticket = QueueTicket(current_priority())
+        queued_at = time.perf_counter()
+        stats.waiting += 1
+        try:
+            await self.queue.acquire(ticket.priority, ticket)
+        finally:
+            stats.waiting -= 1
+        started_at = time.perf_counter()
+        if self.metrics is not None:
+            self.metrics.observe_queue_wait(started_at - queued_at, PRIORITY_NAMES[ticket.priority])
+        stats.in_flight += 1
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            stats.in_flight -= 1
+            held = time.perf_counter() - started_at
+            self.queue.release(held)
+            stats.record(started_at - queued_at, held, failed)
     
     async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict[str, Any]:
         """Выполнить HTTP запрос к Ollama API"""
         if not self.session:
-            raise RuntimeError("Сессия не инициализирована. Используйте async with OllamaClient() as client:")
+            raise RuntimeError("Сессия не инициализирована. Используйте async with OllamaClient() as client: или await client.start()")
+        import aiohttp
         
         url = f"{self.base_url}{endpoint}"
+        started_at = time.perf_counter()
+        failed = True
         
         try:
             async with self.session.request(method, url, json=data) as response:
                 if response.status == 200:
-                    return await response.json()
+                    result = await response.json()
+                    failed = False
                 else:
                     error_text = await response.text()
                     logger.error(f"Ошибка API: {response.status} - {error_text}")
@@ -75,6 +376,13 @@ class OllamaClient:
         except aiohttp.ClientError as e:
             logger.error(f"Ошибка подключения к Ollama: {e}")
             raise Exception(f"Не удается подключиться к Ollama API: {e}")
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_request(endpoint, time.perf_counter() - started_at, failed)
+        
+        if endpoint == "/api/generate":
+            self._observe_generation(result)
+        return result
     
     async def health_check(self) -> bool:
         """Проверить доступность Ollama API"""
@@ -97,30 +405,124 @@ class OllamaClient:
         data = {"name": model_name}
         return await self._make_request("POST", "/api/pull", data)
     
-    async def generate(self, request: OllamaGenerateRequest) -> OllamaGenerateResponse:
-        """Сгенерировать ответ от модели"""
-        response_data = await self._make_request("POST", "/api/generate", request.dict())
+    @staticmethod
+    def _request_key(request: OllamaGenerateRequest) -> str:
+        payload = json.dumps(request.model_dump(exclude={"stream"}), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    async def generate(self, request: OllamaGenerateRequest, session_key: Optional[str] = None) -> OllamaGenerateResponse:
+        """
+        Сгенерировать ответ от модели
+
+        session_key нужен OllamaRouter (закрепление сессии за узлом), одиночный клиент его игнорирует
+        """
+        if not self.coalesce:
+            return await self._generate(request)
+        
+        key = self._request_key(request)
+        inflight = self._inflight_generate.get(key)
+        if inflight is not None:
+            self.stats.coalesced_generate += 1
+            task, ticket = inflight
+            # Запрос, запущенный с фоновым приоритетом, не должен задерживать присоединившийся интерактивный
+            self.queue.promote(ticket, current_priority())
+        else:
+            ticket = QueueTicket(current_priority())
+            task = asyncio.create_task(self._generate(request, ticket))
+            self._inflight_generate[key] = (task, ticket)
+            task.add_done_callback(lambda done: self._generate_done(key, done))
+        # shield: отмена одного ожидающего не должна прерывать генерацию для остальных
+        return await asyncio.shield(task)
+    
+    def _generate_done(self, key: str, task: asyncio.Task) -> None:
+        inflight = self._inflight_generate.get(key)
+        if inflight is not None and inflight[0] is task:
+            del self._inflight_generate[key]
+        if not task.cancelled():
+            # Забираем исключение, даже если все ожидающие уже ушли
+            task.exception()
+    
+    async def _generate(self, request: OllamaGenerateRequest, ticket: Optional[QueueTicket] = None) -> OllamaGenerateResponse:
+        async with self._limited(ticket):
+            response_data = await self._make_request("POST", "/api/generate", request.model_dump())
         return OllamaGenerateResponse(**response_data)
     
-    async def generate_stream(self, request: OllamaGenerateRequest):
-        """Сгенерировать ответ от модели в потоковом режиме"""
+    async def generate_stream(self, request: OllamaGenerateRequest, session_key: Optional[str] = None):
+        """
+        Сгенерировать ответ от модели в потоковом режиме (session_key - как у generate)
+
+        Фрагменты - легкие StreamToken, последний (done) - OllamaGenerateResponse
+        с context и длительностями
+        """
         if not self.session:
             raise RuntimeError("Сессия не инициализирована")
         
+        if not self.coalesce:
+            async for chunk in self._generate_stream(request):
+                yield chunk
+            return
+        
+        key = self._request_key(request)
+        broadcast = self._inflight_stream.get(key)
+        if broadcast is not None:
+            self.stats.coalesced_stream += 1
+            self.queue.promote(broadcast.ticket, current_priority())
+        else:
+            broadcast = _StreamBroadcast()
+            broadcast.ticket = QueueTicket(current_priority())
+            self._inflight_stream[key] = broadcast
+            broadcast.task = asyncio.create_task(self._pump_stream(key, request, broadcast))
+        
+        async for chunk in broadcast.subscribe():
+            yield chunk
+    
+    async def _pump_stream(self, key: str, request: OllamaGenerateRequest, broadcast: _StreamBroadcast) -> None:
+        """Читать поток из Ollama и раздавать фрагменты подписчикам"""
+        try:
+            async for chunk in self._generate_stream(request, broadcast.ticket):
+                broadcast.publish(chunk)
+            broadcast.finish()
+        except asyncio.CancelledError:
+            broadcast.finish(RuntimeError("Генерация отменена"))
+        except Exception as e:
+            broadcast.finish(e)
+        finally:
+            if self._inflight_stream.get(key) is broadcast:
+                del self._inflight_stream[key]
+    
+    async def _generate_stream(self, request: OllamaGenerateRequest, ticket: Optional[QueueTicket] = None):
         url = f"{self.base_url}/api/generate"
+        payload = request.model_dump()
+        payload["stream"] = True
         
-        async with self.session.post(url, json=request.dict()) as response:
-            if response.status != 200:
-                error_text = await response.text()
-                raise Exception(f"Ошибка API: {response.status} - {error_text}")
-            
-            async for line in response.content:
-                if line:
-                    try:
-                        data = json.loads(line.decode('utf-8'))
-                        yield OllamaGenerateResponse(**data)
-                    except json.JSONDecodeError:
-                        continue
+        metrics = self.metrics
+        async with self._limited(ticket):
+            started_at = time.perf_counter()
+            failed = True
+            try:
+                async with self.session.post(url, json=payload) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        raise Exception(f"Ошибка API: {response.status} - {error_text}")
+                    
+                    decoder = NDJSONDecoder()
+                    async for data in response.content.iter_any():
+                        for record in decoder.feed(data):
+                            yield self._stream_chunk(record)
+                    for record in decoder.flush():
+                        yield self._stream_chunk(record)
+                failed = False
+            finally:
+                if metrics is not None:
+                    metrics.observe_request("/api/generate", time.perf_counter() - started_at, failed)
+    
+    def _stream_chunk(self, record: Dict[str, Any]) -> Union[StreamToken, OllamaGenerateResponse]:
+        if record.get("done"):
+            self._observe_generation(record)
+            return OllamaGenerateResponse(**record)
+        if "error" in record:
+            raise Exception(f"Ошибка генерации Ollama: {record['error']}")
+        return StreamToken(record.get("model", ""), record.get("created_at", ""), record.get("response", ""))
     
     async def chat(self, model: str, messages: List[Dict[str, str]], stream: bool = False) -> Dict[str, Any]:
         """Чат с моделью"""
@@ -129,54 +531,142 @@ class OllamaClient:
             "messages": messages,
             "stream": stream
         }
-        return await self._make_request("POST", "/api/chat", data)
+        async with self._limited():
+            return await self._make_request("POST", "/api/chat", data)
     
-    async def embeddings(self, model: str, prompt: str) -> Dict[str, Any]:
+    async def embeddings(self, model: str, prompt: str, keep_alive: Optional[Union[str, int]] = None) -> Dict[str, Any]:
         """Получить эмбеддинги для текста"""
         data = {
             "model": model,
             "prompt": prompt
         }
-        return await self._make_request("POST", "/api/embeddings", data)
+        if keep_alive is not None:
+            data["keep_alive"] = keep_alive
+        async with self._limited():
+            return await self._make_request("POST", "/api/embeddings", data)
 
 # Синхронная обертка для удобства использования
 class OllamaClientSync:
-    """Синхронная обертка для OllamaClient"""
+    """
+    Синхронный клиент Ollama для скриптов и воркеров без event loop
+
+    Держит один фоновый поток со своим event loop и одним OllamaClient
+    (пул keep-alive соединений на все вызовы). Методы отправляют корутины
+    в этот loop через run_coroutine_threadsafe и ждут результат, поэтому
+    клиент можно вызывать из нескольких потоков одновременно, в том числе
+    из кода, у которого свой event loop уже запущен (но такой вызов
+    блокирует этот loop на время запроса - в async коде используйте
+    OllamaClient напрямую).
+
+    Поток запускается при первом вызове и заново после fork (воркеры
+    Celery в режиме prefork наследуют объект, но не поток). Параметры
+    client_kwargs передаются в OllamaClient. timeout - сколько ждать
+    результата одного вызова (None - без ограничения).
+    """
     
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    def __init__(self, base_url: str = "http://localhost:11434", timeout: Optional[float] = None, **client_kwargs):
         self.base_url = base_url
+        self.timeout = timeout
+        self.client_kwargs = client_kwargs
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[OllamaClient] = None
+        self._pid: Optional[int] = None
+    
+    def __enter__(self):
+        self._ensure_started()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _ensure_started(self) -> OllamaClient:
+        if self._client is not None and self._pid == os.getpid():
+            return self._client
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                return self._client
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="ollama-client-sync", daemon=True)
+            thread.start()
+            
+            async def create_client() -> OllamaClient:
+                # Семафор и сессия должны принадлежать фоновому loop
+                client = OllamaClient(self.base_url, **self.client_kwargs)
+                await client.start()
+                return client
+            
+            self._client = asyncio.run_coroutine_threadsafe(create_client(), loop).result()
+            self._loop = loop
+            self._thread = thread
+            self._pid = os.getpid()
+            return self._client
+    
+    def _run(self, make_coro: Callable[[OllamaClient], Any]) -> Any:
+        client = self._ensure_started()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("OllamaClientSync нельзя вызывать из его собственного event loop")
+        future = asyncio.run_coroutine_threadsafe(make_coro(client), self._loop)
+        try:
+            return future.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Ollama не ответила за {self.timeout} с")
+    
+    def close(self) -> None:
+        """Закрыть сессию и остановить фоновый поток"""
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            self._loop = self._thread = self._client = None
+            if client is None or self._pid != os.getpid():
+                return
+            asyncio.run_coroutine_threadsafe(client.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+    
+    @property
+    def stats(self) -> "OllamaClientStats":
+        return self._ensure_started().stats
     
     def health_check(self) -> bool:
         """Проверить доступность Ollama API"""
-        return asyncio.run(self._async_health_check())
-    
-    async def _async_health_check(self) -> bool:
-        async with OllamaClient(self.base_url) as client:
-            return await client.health_check()
+        return self._run(lambda client: client.health_check())
     
     def list_models(self) -> List[OllamaModelInfo]:
         """Получить список доступных моделей"""
-        return asyncio.run(self._async_list_models())
-    
-    async def _async_list_models(self) -> List[OllamaModelInfo]:
-        async with OllamaClient(self.base_url) as client:
-            return await client.list_models()
+        return self._run(lambda client: client.list_models())
     
     def generate(self, request: OllamaGenerateRequest) -> OllamaGenerateResponse:
         """Сгенерировать ответ от модели"""
-        return asyncio.run(self._async_generate(request))
+        return self._run(lambda client: client.generate(request))
+    
+    def generate_stream(self, request: OllamaGenerateRequest) -> Iterator[Union[StreamToken, OllamaGenerateResponse]]:
+        """Сгенерировать ответ потоком: фрагменты приходят по мере генерации"""
+        stream = self._ensure_started().generate_stream(request)
+        try:
+            while True:
+                try:
+                    yield self._run(lambda _: stream.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Прерванный потребителем поток закрываем в loop клиента
+            if self._client is not None:
+                self._run(lambda _: stream.aclose())
     
-    async def _async_generate(self, request: OllamaGenerateRequest) -> OllamaGenerateResponse:
-        async with OllamaClient(self.base_url) as client:
-            return await client.generate(request)
+    def chat(self, model: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Чат с моделью"""
+        return self._run(lambda client: client.chat(model, messages))
+    
+    def embeddings(self, model: str, prompt: str, keep_alive: Optional[Union[str, int]] = None) -> Dict[str, Any]:
+        """Получить эмбеддинги для текста"""
+        return self._run(lambda client: client.embeddings(model, prompt, keep_alive=keep_alive))
     
     def pull_model(self, model_name: str) -> Dict[str, Any]:
         """Загрузить модель"""
-        return asyncio.run(self._async_pull_model(model_name))
-    
-    async def _async_pull_model(self, model_name: str) -> Dict[str, Any]:
-        async with OllamaClient(self.base_url) as client:
-            return await client.pull_model(model_name)
+        return self._run(lambda client: client.pull_model(model_name))
 
 # Пример использования
 async def example_usage():
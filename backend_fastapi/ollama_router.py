@@ -0,0 +1,404 @@
+"""
+Роутер запросов по нескольким серверам Ollama
+
+Каждый узел - отдельный OllamaClient со своим пулом соединений и
+семафором. Генерация уходит на наименее загруженный доступный узел:
+загрузка - запросы в работе и в очереди относительно max_concurrency
+узла, с поправкой на наблюдаемую скорость генерации (токены/с). Ошибки
+узла считает circuit breaker: после failure_threshold ошибок подряд узел
+выводится из ротации на reset_timeout секунд, а фоновая проверка
+health_check возвращает его, как только он снова отвечает. Запрос,
+упавший на одном узле, повторяется на другом (поток - только если он
+еще не начал отдавать фрагменты).
+
+Узел, очередь которого переполнена (LLMOverloaded), не считается
+сбойным: запрос просто уходит на следующий, а если переполнены все -
+отказ передается вызывающему.
+
+Сессии с session_key закрепляются за узлом: следующий запрос того же
+интервью с context попадает туда, где этот префикс уже обработан, если
+только узел не перегружен заметно сильнее остальных.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from llm_queue import LLMOverloaded, Priority, check_admission, current_priority
+from ollama_client import OllamaClient, OllamaGenerateRequest, OllamaGenerateResponse, OllamaModelInfo
+
+logger = logging.getLogger(__name__)
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Выключатель узла: closed -> open после серии ошибок -> half_open после паузы"""
+
+    __slots__ = ("failure_threshold", "reset_timeout", "state", "failures", "opened_at", "trips")
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+
+    def available(self) -> bool:
+        """Можно ли отправить запрос (после паузы открытый выключатель пропускает пробные запросы)"""
+        if self.state == BREAKER_OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = BREAKER_HALF_OPEN
+        return self.state != BREAKER_OPEN
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = BREAKER_CLOSED
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == BREAKER_HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != BREAKER_OPEN:
+                self.trips += 1
+            self.state = BREAKER_OPEN
+            self.opened_at = time.monotonic()
+
+
+class OllamaNode:
+    """Узел пула: клиент, выключатель и скользящая оценка скорости генерации"""
+
+    # Вес нового наблюдения в скользящем среднем токенов/с
+    SPEED_ALPHA = 0.2
+
+    def __init__(self, client: OllamaClient, breaker: CircuitBreaker):
+        self.client = client
+        self.breaker = breaker
+        self.tokens_per_second = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def base_url(self) -> str:
+        return self.client.base_url
+
+    @property
+    def load(self) -> float:
+        """Занятость узла: запросы в работе и в очереди на один слот генерации"""
+        stats = self.client.stats
+        return (stats.in_flight + stats.waiting) / self.client.max_concurrency
+
+    def observe_generation(self, data: dict) -> None:
+        eval_count = data.get("eval_count")
+        eval_duration = data.get("eval_duration")
+        if eval_count and eval_duration:
+            speed = eval_count * 1e9 / eval_duration
+            if self.tokens_per_second:
+                speed = self.SPEED_ALPHA * speed + (1 - self.SPEED_ALPHA) * self.tokens_per_second
+            self.tokens_per_second = speed
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "load": round(self.load, 3),
+            "tokens_per_second": round(self.tokens_per_second, 1),
+            "requests": self.requests,
+            "failures": self.failures,
+            **self.client.stats.snapshot(),
+        }
+
+
+class RouterStats:
+    """Суммарные счетчики узлов (тот же набор полей, что у OllamaClientStats)"""
+
+    def __init__(self, nodes: Sequence[OllamaNode]):
+        self._nodes = nodes
+
+    def _sum(self, field: str):
+        return sum(getattr(node.client.stats, field) for node in self._nodes)
+
+    waiting = property(lambda self: self._sum("waiting"))
+    in_flight = property(lambda self: self._sum("in_flight"))
+    requests_total = property(lambda self: self._sum("requests_total"))
+    errors_total = property(lambda self: self._sum("errors_total"))
+    coalesced_generate = property(lambda self: self._sum("coalesced_generate"))
+    coalesced_stream = property(lambda self: self._sum("coalesced_stream"))
+
+    def snapshot(self) -> Dict[str, Any]:
+        done = self.requests_total or 1
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "queue_wait_avg": round(self._sum("queue_wait_total") / done, 4),
+            "queue_wait_max": round(max(n.client.stats.queue_wait_max for n in self._nodes), 4),
+            "latency_avg": round(self._sum("latency_total") / done, 4),
+            "latency_max": round(max(n.client.stats.latency_max for n in self._nodes), 4),
+            "coalesced_generate": self.coalesced_generate,
+            "coalesced_stream": self.coalesced_stream,
+        }
+
+
+class OllamaRouter:
+    """
+    Пул серверов Ollama с тем же интерфейсом, что у OllamaClient
+
+    client_kwargs передаются каждому OllamaClient (max_concurrency и пул
+    соединений - на узел). pin_slack - насколько загрузка закрепленного
+    узла может превышать загрузку лучшего, чтобы сессия осталась на нем.
+    """
+
+    def __init__(
+        self,
+        base_urls: Sequence[str],
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        health_interval: float = 10.0,
+        max_pinned_sessions: int = 10000,
+        pin_slack: float = 1.0,
+        **client_kwargs,
+    ):
+        if not base_urls:
+            raise ValueError("Нужен хотя бы один адрес Ollama")
+        self.nodes = [
+            OllamaNode(OllamaClient(url, **client_kwargs), CircuitBreaker(failure_threshold, reset_timeout))
+            for url in base_urls
+        ]
+        self.health_interval = health_interval
+        self.max_pinned_sessions = max_pinned_sessions
+        self.pin_slack = pin_slack
+        self.stats = RouterStats(self.nodes)
+        self.metrics = client_kwargs.get("metrics")
+        # Менеджер прогрева (ModelWarmer): холодные узлы получают трафик, только если нет прогретых
+        self.warmer = None
+        self._pins: "OrderedDict[str, OllamaNode]" = OrderedDict()
+        self._health_task: Optional[asyncio.Task] = None
+        self.pinned_requests = 0
+        self.failovers = 0
+
+    @property
+    def clients(self) -> List[OllamaClient]:
+        return [node.client for node in self.nodes]
+
+    @property
+    def base_url(self) -> str:
+        return ",".join(node.base_url for node in self.nodes)
+
+    @property
+    def max_concurrency(self) -> int:
+        return sum(node.client.max_concurrency for node in self.nodes)
+
+    async def start(self):
+        for node in self.nodes:
+            await node.client.start()
+            node.client.add_generation_listener(node.observe_generation)
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for node in self.nodes:
+            node.client.remove_generation_listener(node.observe_generation)
+            await node.client.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def add_generation_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        for node in self.nodes:
+            node.client.add_generation_listener(listener)
+
+    def remove_generation_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        for node in self.nodes:
+            node.client.remove_generation_listener(listener)
+
+    def admission_check(self, priority: Optional[Priority] = None, pending: int = 0) -> None:
+        """Как у OllamaClient, по суммарной очереди доступных узлов"""
+        queues = [node.client.queue for node in self.nodes if node.breaker.available()]
+        check_admission(queues, current_priority() if priority is None else priority, pending)
+
+    def nodes_stats(self) -> Dict[str, Any]:
+        return {
+            "nodes": {node.base_url: node.snapshot() for node in self.nodes},
+            "pinned_sessions": len(self._pins),
+            "pinned_requests": self.pinned_requests,
+            "failovers": self.failovers,
+        }
+
+    # Выбор узла
+
+    def _cost(self, node: OllamaNode, fastest: float) -> float:
+        # Стоимость нового запроса: очередь на слот, растянутая медленной генерацией узла
+        cost = node.load + 1 / node.client.max_concurrency
+        if fastest and node.tokens_per_second:
+            cost *= fastest / node.tokens_per_second
+        return cost
+
+    def _pick(self, model: Optional[str], session_key: Optional[str], reuse_context: bool,
+              exclude: Sequence[OllamaNode]) -> Optional[OllamaNode]:
+        candidates = [node for node in self.nodes if node not in exclude and node.breaker.available()]
+        if not candidates:
+            return None
+        if self.warmer is not None and model:
+            warm = [node for node in candidates if self.warmer.is_warm(model, node.base_url)]
+            candidates = warm or candidates
+
+        fastest = max(node.tokens_per_second for node in candidates)
+        best = min(candidates, key=lambda node: self._cost(node, fastest))
+
+        if session_key is not None and reuse_context:
+            pinned = self._pins.get(session_key)
+            if (
+                pinned is not None
+                and pinned in candidates
+                and self._cost(pinned, fastest) <= self._cost(best, fastest) + self.pin_slack
+            ):
+                self.pinned_requests += 1
+                return pinned
+        return best
+
+    def _pin(self, session_key: Optional[str], node: OllamaNode) -> None:
+        if session_key is None:
+            return
+        self._pins[session_key] = node
+        self._pins.move_to_end(session_key)
+        while len(self._pins) > self.max_pinned_sessions:
+            self._pins.popitem(last=False)
+
+    def unpin(self, session_key: str) -> None:
+        """Забыть узел сессии (интервью завершено)"""
+        self._pins.pop(session_key, None)
+
+    def _record_failure(self, node: OllamaNode, error: Exception) -> None:
+        node.failures += 1
+        node.breaker.record_failure()
+        logger.warning(f"Ollama {node.base_url}: {error}")
+
+    def _record_success(self, node: OllamaNode) -> None:
+        node.breaker.record_success()
+
+    async def _call(self, model: Optional[str], session_key: Optional[str], reuse_context: bool, call):
+        """Выполнить call(client) на лучшем узле, при ошибке - на следующем"""
+        tried: List[OllamaNode] = []
+        last_error: Optional[Exception] = None
+        while True:
+            node = self._pick(model, session_key, reuse_context, tried)
+            if node is None:
+                if last_error is not None:
+                    raise last_error
+                raise Exception("Нет доступных серверов Ollama")
+            if tried:
+                self.failovers += 1
+            tried.append(node)
+            node.requests += 1
+            try:
+                result = await call(node.client)
+            except asyncio.CancelledError:
+                raise
+            except LLMOverloaded as e:
+                last_error = e
+                continue
+            except Exception as e:
+                self._record_failure(node, e)
+                last_error = e
+                continue
+            self._record_success(node)
+            self._pin(session_key, node)
+            return result
+
+    # Интерфейс OllamaClient
+
+    async def health_check(self) -> bool:
+        return any(await asyncio.gather(*(node.client.health_check() for node in self.nodes)))
+
+    async def list_models(self) -> List[OllamaModelInfo]:
+        """Модели, установленные хотя бы на одном доступном узле"""
+        models: Dict[str, OllamaModelInfo] = {}
+        for node in self.nodes:
+            if not node.breaker.available():
+                continue
+            try:
+                for model in await node.client.list_models():
+                    models.setdefault(model.name, model)
+            except Exception as e:
+                self._record_failure(node, e)
+        return list(models.values())
+
+    async def pull_model(self, model_name: str) -> Dict[str, Any]:
+        """Загрузить модель на все узлы"""
+        results = await asyncio.gather(*(node.client.pull_model(model_name) for node in self.nodes))
+        return {node.base_url: result for node, result in zip(self.nodes, results)}
+
+    async def generate(self, request: OllamaGenerateRequest, session_key: Optional[str] = None) -> OllamaGenerateResponse:
+        return await self._call(
+            request.model, session_key, bool(request.context), lambda client: client.generate(request)
+        )
+
+    async def generate_stream(self, request: OllamaGenerateRequest, session_key: Optional[str] = None):
+        tried: List[OllamaNode] = []
+        overloaded: Optional[LLMOverloaded] = None
+        while True:
+            node = self._pick(request.model, session_key, bool(request.context), tried)
+            if node is None:
+                if overloaded is not None:
+                    raise overloaded
+                raise Exception("Нет доступных серверов Ollama")
+            if tried:
+                self.failovers += 1
+            tried.append(node)
+            node.requests += 1
+            started = False
+            try:
+                async for chunk in node.client.generate_stream(request):
+                    started = True
+                    yield chunk
+            except asyncio.CancelledError:
+                raise
+            except LLMOverloaded as e:
+                overloaded = e
+                continue
+            except Exception as e:
+                self._record_failure(node, e)
+                # Часть ответа уже отдана: повтор на другом узле дал бы другой текст
+                if started:
+                    raise
+                continue
+            self._record_success(node)
+            self._pin(session_key, node)
+            return
+
+    async def chat(self, model: str, messages: List[Dict[str, str]], stream: bool = False) -> Dict[str, Any]:
+        return await self._call(model, None, False, lambda client: client.chat(model, messages, stream))
+
+    async def embeddings(self, model: str, prompt: str, keep_alive: Optional[Union[str, int]] = None) -> Dict[str, Any]:
+        return await self._call(model, None, False, lambda client: client.embeddings(model, prompt, keep_alive))
+
+    # Проверка узлов
+
+    async def _check_node(self, node: OllamaNode) -> None:
+        if await node.client.health_check():
+            if node.breaker.state != BREAKER_CLOSED:
+                logger.info(f"Ollama {node.base_url} снова доступна")
+            node.breaker.record_success()
+        else:
+            node.breaker.record_failure()
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.gather(*(self._check_node(node) for node in self.nodes))
+            await asyncio.sleep(self.health_interval)
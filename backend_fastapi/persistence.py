@@ -0,0 +1,610 @@
+"""
+Хранилище сессий интервью и ответов
+
+MemoryInterviewStore - компактные записи в памяти процесса (один воркер,
+данные теряются при перезапуске, завершенные и брошенные интервью
+удаляются по TTL вместе с ответами). PrismaInterviewStore - PostgreSQL через async
+Prisma client: состояние интервью пишется сразу, строки InterviewAnswer
+копятся в буфере и вставляются пачками (write-behind), а чтения сессий
+обслуживаются из небольшого кеша воркера.
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from models import Feedback, InterviewSession
+
+logger = logging.getLogger(__name__)
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_COMPLETED = "completed"
+
+# Оценка, начиная с которой ответ считается верным (InterviewAnswer.isCorrect)
+CORRECT_SCORE = 7
+
+# Изменение состояния интервью для update (может вызываться повторно при конфликте записи)
+SessionUpdate = Callable[[InterviewSession], None]
+
+# Ответ в памяти: (question_id, user_answer, score, feedback, time_spent, answered_at)
+AnswerRow = Tuple[str, str, int, str, int, float]
+
+
+def answer_dict(question_id: str, user_answer: str, score: float, feedback: Optional[str],
+                time_spent: Optional[int], answered_at: datetime) -> Dict[str, Any]:
+    """Ответ кандидата в общем для хранилищ виде (для итогового отчета)"""
+    return {
+        "question_id": question_id,
+        "user_answer": user_answer,
+        "score": score,
+        "feedback": feedback,
+        "time_spent": time_spent,
+        "answered_at": answered_at,
+    }
+
+
+class SessionRecord:
+    """
+    Компактное состояние интервью в памяти процесса
+
+    Строки (тема, сложность, теги, id вопросов) интернируются и общие для
+    всех сессий, время - float вместо datetime, списки - кортежи.
+    InterviewSession собирается из записи при чтении.
+    """
+
+    __slots__ = (
+        "id", "topic", "difficulty", "current_question", "total_questions", "score",
+        "start_time", "is_active", "tags", "current_question_id", "asked_question_ids", "expires_at",
+    )
+
+    def __init__(self, session: InterviewSession, expires_at: float):
+        self.id = session.id
+        self.start_time = session.start_time.timestamp()
+        self.topic = sys.intern(session.topic)
+        self.tags = tuple(sys.intern(tag) for tag in session.tags)
+        self.update(session, expires_at)
+
+    def update(self, session: InterviewSession, expires_at: float) -> None:
+        self.difficulty = sys.intern(session.difficulty)
+        self.current_question = session.current_question
+        self.total_questions = session.total_questions
+        self.score = session.score
+        self.is_active = session.is_active
+        self.current_question_id = (
+            sys.intern(session.current_question_id) if session.current_question_id is not None else None
+        )
+        self.asked_question_ids = tuple(sys.intern(question_id) for question_id in session.asked_question_ids)
+        self.expires_at = expires_at
+
+    def to_session(self) -> InterviewSession:
+        return InterviewSession(
+            id=self.id,
+            topic=self.topic,
+            difficulty=self.difficulty,
+            current_question=self.current_question,
+            total_questions=self.total_questions,
+            score=self.score,
+            start_time=datetime.fromtimestamp(self.start_time),
+            is_active=self.is_active,
+            tags=list(self.tags),
+            current_question_id=self.current_question_id,
+            asked_question_ids=list(self.asked_question_ids),
+        )
+
+
+class MemoryInterviewStore:
+    """
+    Сессии в словаре процесса
+
+    Завершенные интервью хранятся finished_ttl секунд после последнего
+    обращения, брошенные (активные, к которым не обращались) - idle_ttl.
+    Просроченные записи удаляет фоновая очистка раз в sweep_interval
+    секунд (и чтение, если оно успело раньше). Сверх max_sessions
+    вытесняются сессии, к которым дольше всего не обращались.
+    on_evict(interview_id) вызывается для каждой удаленной сессии.
+    Ответы (для итогового отчета) хранятся и удаляются вместе с сессией.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 100000,
+        idle_ttl: float = 4 * 3600.0,
+        finished_ttl: float = 600.0,
+        sweep_interval: float = 60.0,
+        on_evict: Optional[Callable[[str], None]] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.finished_ttl = finished_ttl
+        self.sweep_interval = sweep_interval
+        self.on_evict = on_evict
+        # Порядок - от давно не использованных к недавним
+        self.sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self._answers: Dict[str, List[AnswerRow]] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+        self.expired = 0
+        self.evicted = 0
+        self.sweeps = 0
+
+    async def start(self) -> None:
+        if self._sweeper is None and self.sweep_interval > 0:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    def _expires_at(self, session: InterviewSession) -> float:
+        return time.monotonic() + (self.idle_ttl if session.is_active else self.finished_ttl)
+
+    def _remove(self, interview_id: str) -> None:
+        del self.sessions[interview_id]
+        self._answers.pop(interview_id, None)
+        if self.on_evict is not None:
+            try:
+                self.on_evict(interview_id)
+            except Exception as e:
+                logger.warning(f"Ошибка освобождения ресурсов сессии {interview_id}: {e}")
+
+    def _put(self, session: InterviewSession) -> None:
+        record = self.sessions.get(session.id)
+        if record is None:
+            self.sessions[session.id] = SessionRecord(session, self._expires_at(session))
+            while len(self.sessions) > self.max_sessions:
+                self._remove(next(iter(self.sessions)))
+                self.evicted += 1
+        else:
+            record.update(session, self._expires_at(session))
+            self.sessions.move_to_end(session.id)
+
+    async def create(self, session: InterviewSession) -> None:
+        self._put(session)
+
+    async def get(self, interview_id: str) -> Optional[InterviewSession]:
+        record = self.sessions.get(interview_id)
+        if record is None:
+            return None
+        if record.expires_at <= time.monotonic():
+            self._remove(interview_id)
+            self.expired += 1
+            return None
+        return record.to_session()
+
+    async def save(self, session: InterviewSession) -> None:
+        self._put(session)
+
+    async def update(self, interview_id: str, apply: SessionUpdate) -> Optional[InterviewSession]:
+        """Изменить текущее состояние интервью; между чтением и записью нет await"""
+        session = await self.get(interview_id)
+        if session is None:
+            return None
+        apply(session)
+        self._put(session)
+        return session
+
+    async def add_answer(self, session: InterviewSession, question_id: str, answer: str,
+                         feedback: Feedback, time_spent: int) -> None:
+        if session.id not in self.sessions:
+            return
+        self._answers.setdefault(session.id, []).append(
+            (sys.intern(question_id), answer, feedback.score, feedback.comment, time_spent, time.time())
+        )
+
+    async def answers(self, interview_id: str) -> List[Dict[str, Any]]:
+        """Ответы интервью в порядке поступления"""
+        return [
+            answer_dict(question_id, answer, score, comment, time_spent, datetime.fromtimestamp(answered_at))
+            for question_id, answer, score, comment, time_spent, answered_at in self._answers.get(interview_id, ())
+        ]
+
+    async def save_report(self, interview_id: str, report: Dict[str, Any]) -> None:
+        # Отчет живет в задании конвейера отчетов (interview_reports.py)
+        pass
+
+    async def load_report(self, interview_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Ошибка очистки сессий: {e}")
+
+    async def sweep(self, chunk: int = 1000) -> int:
+        """Удалить просроченные сессии; проход частями, чтобы не блокировать event loop"""
+        now = time.monotonic()
+        expired = []
+        for i, (interview_id, record) in enumerate(list(self.sessions.items())):
+            if record.expires_at <= now:
+                expired.append(interview_id)
+            if i % chunk == chunk - 1:
+                await asyncio.sleep(0)
+        removed = 0
+        for interview_id in expired:
+            record = self.sessions.get(interview_id)
+            # Пока шел проход, к сессии могли обратиться
+            if record is not None and record.expires_at <= now:
+                self._remove(interview_id)
+                removed += 1
+        self.expired += removed
+        self.sweeps += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        active = sum(1 for record in self.sessions.values() if record.is_active)
+        return {
+            "backend": "memory",
+            "sessions": len(self.sessions),
+            "active_sessions": active,
+            "max_sessions": self.max_sessions,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "sweeps": self.sweeps,
+        }
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """Ошибка данных (нарушение ключа, неверное значение): повтор той же записи не поможет"""
+    try:
+        from prisma.errors import DataError
+    except ImportError:
+        return False
+    return isinstance(error, DataError)
+
+
+def with_pool_settings(database_url: str, pool_size: int, pool_timeout: int) -> str:
+    """Добавить в DATABASE_URL параметры пула соединений Prisma, если они не заданы"""
+    parts = urlsplit(database_url)
+    query = dict(parse_qsl(parts.query))
+    query.setdefault("connection_limit", str(pool_size))
+    query.setdefault("pool_timeout", str(pool_timeout))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class PrismaInterviewStore:
+    """
+    Сессии в PostgreSQL через async Prisma client
+
+    Кеш воркера короткий (cache_ttl): при нескольких воркерах без sticky
+    sessions чтение может вернуть состояние до ответа, обработанного другим
+    воркером, не позже чем через cache_ttl секунд после него. Поэтому
+    изменения (update) кеш не используют: состояние читается из базы и
+    записывается условно - только если currentQuestion и status не
+    изменились с момента чтения, иначе чтение и изменение повторяются.
+    """
+
+    MAX_UPDATE_ATTEMPTS = 5
+    # Пачка ответов, которую не удалось записать (база недоступна), возвращается в
+    # начало буфера и повторяется с растущей паузой; после MAX_FLUSH_RETRIES - отбрасывается
+    MAX_FLUSH_RETRIES = 5
+    MAX_FLUSH_BACKOFF = 30.0
+
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        pool_size: int = 10,
+        pool_timeout: int = 10,
+        cache_size: int = 1024,
+        cache_ttl: float = 5.0,
+        flush_interval: float = 0.5,
+        flush_batch_size: int = 200,
+    ):
+        self.database_url = database_url
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+
+        self.db = None
+        # interview_id -> (expires_at, session)
+        self._cache: "OrderedDict[str, Tuple[float, InterviewSession]]" = OrderedDict()
+        self._pending_answers: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        # Неудачные попытки подряд и time.monotonic(), раньше которого не повторять
+        self._flush_failures = 0
+        self._retry_at = 0.0
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.update_conflicts = 0
+        self.answers_flushed = 0
+        self.answers_dropped = 0
+        self.flush_retries = 0
+        self.flushes = 0
+
+    async def start(self) -> None:
+        from prisma import Prisma
+
+        if self.database_url:
+            url = with_pool_settings(self.database_url, self.pool_size, self.pool_timeout)
+            self.db = Prisma(datasource={"url": url})
+        else:
+            self.db = Prisma()
+        await self.db.connect()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        for _ in range(self.MAX_FLUSH_RETRIES + 1):
+            await self.flush()
+            if not self._pending_answers:
+                break
+            await asyncio.sleep(max(self._retry_at - time.monotonic(), 0.0))
+        if self._pending_answers:
+            self.answers_dropped += len(self._pending_answers)
+            logger.error(f"Ответы не записаны в базу до остановки и потеряны: {len(self._pending_answers)}")
+            self._pending_answers.clear()
+        if self.db is not None:
+            await self.db.disconnect()
+            self.db = None
+
+    async def load_questions(self) -> Dict[str, List[dict]]:
+        """Активные вопросы из таблицы Question в формате банка вопросов"""
+        rows = await self.db.question.find_many(where={"isActive": True}, order={"createdAt": "asc"})
+        questions_by_topic: Dict[str, List[dict]] = {}
+        for row in rows:
+            questions_by_topic.setdefault(row.category, []).append({
+                "id": row.id,
+                "text": row.text,
+                "topic": row.category,
+                "difficulty": row.difficulty,
+                "correct_answer": row.correctAnswer,
+                "tags": list(row.tags or []),
+                "keywords": list(row.keywords or []),
+                "embedding": list(row.embedding or []),
+                "embedding_model": row.embeddingModel,
+            })
+        return questions_by_topic
+
+    # Сессии
+
+    def _cache_put(self, session: InterviewSession) -> None:
+        self._cache[session.id] = (time.monotonic() + self.cache_ttl, session)
+        self._cache.move_to_end(session.id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _to_session(row) -> InterviewSession:
+        return InterviewSession(
+            id=row.id,
+            topic=row.topic,
+            difficulty=row.difficulty,
+            current_question=row.currentQuestion,
+            total_questions=row.totalQuestions,
+            score=int(row.score or 0),
+            start_time=row.startedAt,
+            is_active=row.status == STATUS_IN_PROGRESS,
+            tags=list(row.tags or []),
+            current_question_id=row.currentQuestionId,
+            asked_question_ids=list(row.askedQuestionIds or []),
+        )
+
+    async def create(self, session: InterviewSession) -> None:
+        await self.db.interview.create(data={
+            "id": session.id,
+            "topic": session.topic,
+            "difficulty": session.difficulty,
+            "status": STATUS_IN_PROGRESS,
+            "score": session.score,
+            "totalQuestions": session.total_questions,
+            "currentQuestion": session.current_question,
+            "currentQuestionId": session.current_question_id,
+            "askedQuestionIds": session.asked_question_ids,
+            "tags": session.tags,
+            "startedAt": session.start_time,
+        })
+        self._cache_put(session)
+
+    async def get(self, interview_id: str) -> Optional[InterviewSession]:
+        entry = self._cache.get(interview_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._cache.move_to_end(interview_id)
+            self.cache_hits += 1
+            return entry[1]
+
+        self.cache_misses += 1
+        row = await self.db.interview.find_unique(where={"id": interview_id})
+        if row is None:
+            self._cache.pop(interview_id, None)
+            return None
+        session = self._to_session(row)
+        self._cache_put(session)
+        return session
+
+    @staticmethod
+    def _state_data(session: InterviewSession) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "score": session.score,
+            "currentQuestion": session.current_question,
+            "completedQuestions": session.current_question - 1,
+            "currentQuestionId": session.current_question_id,
+            "askedQuestionIds": {"set": session.asked_question_ids},
+            "status": STATUS_IN_PROGRESS if session.is_active else STATUS_COMPLETED,
+        }
+        if not session.is_active:
+            data["endedAt"] = datetime.now(timezone.utc)
+        return data
+
+    async def save(self, session: InterviewSession) -> None:
+        """Перезаписать состояние интервью целиком (для изменения по текущему состоянию - update)"""
+        await self.db.interview.update(where={"id": session.id}, data=self._state_data(session))
+        self._cache_put(session)
+
+    async def update(self, interview_id: str, apply: SessionUpdate) -> Optional[InterviewSession]:
+        """
+        Прочитать состояние из базы (не из кеша), изменить apply и записать, если
+        другой воркер не изменил интервью за это время; иначе повторить
+        """
+        for _ in range(self.MAX_UPDATE_ATTEMPTS):
+            row = await self.db.interview.find_unique(where={"id": interview_id})
+            if row is None:
+                self._cache.pop(interview_id, None)
+                return None
+            session = self._to_session(row)
+            apply(session)
+            updated = await self.db.interview.update_many(
+                where={"id": interview_id, "currentQuestion": row.currentQuestion, "status": row.status},
+                data=self._state_data(session),
+            )
+            if updated:
+                self._cache_put(session)
+                return session
+            self.update_conflicts += 1
+        raise RuntimeError(f"Интервью {interview_id} одновременно изменяется другими запросами")
+
+    # Ответы (write-behind)
+
+    async def add_answer(self, session: InterviewSession, question_id: str, answer: str,
+                         feedback: Feedback, time_spent: int) -> None:
+        self._pending_answers.append({
+            "interviewId": session.id,
+            "questionId": question_id,
+            "userAnswer": answer,
+            "isCorrect": feedback.score >= CORRECT_SCORE,
+            "score": float(feedback.score),
+            "feedback": feedback.comment,
+            "timeSpent": time_spent,
+            "answeredAt": datetime.now(timezone.utc),
+        })
+        if len(self._pending_answers) >= self.flush_batch_size:
+            self._flush_wakeup.set()
+
+    async def answers(self, interview_id: str) -> List[Dict[str, Any]]:
+        """Ответы интервью: записанные в базу и еще ожидающие в буфере"""
+        rows = await self.db.interviewanswer.find_many(
+            where={"interviewId": interview_id}, order={"answeredAt": "asc"}
+        )
+        result = [
+            answer_dict(row.questionId, row.userAnswer, row.score, row.feedback, row.timeSpent, row.answeredAt)
+            for row in rows
+        ]
+        # Снимок буфера: пока шел запрос, часть ответов могла уйти в базу и попасть в rows
+        written = {(row.questionId, row.answeredAt) for row in rows}
+        for pending in list(self._pending_answers):
+            if pending["interviewId"] == interview_id and (pending["questionId"], pending["answeredAt"]) not in written:
+                result.append(answer_dict(
+                    pending["questionId"], pending["userAnswer"], pending["score"],
+                    pending["feedback"], pending["timeSpent"], pending["answeredAt"],
+                ))
+        return result
+
+    async def save_report(self, interview_id: str, report: Dict[str, Any]) -> None:
+        """Итоговый отчет - в Interview.feedback: виден всем воркерам"""
+        from prisma import Json
+
+        await self.db.interview.update(where={"id": interview_id}, data={"feedback": Json(report)})
+
+    async def load_report(self, interview_id: str) -> Optional[Dict[str, Any]]:
+        row = await self.db.interview.find_unique(where={"id": interview_id})
+        return row.feedback if row is not None and row.feedback else None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            if time.monotonic() < self._retry_at:
+                continue
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка записи ответов в базу: {e}")
+
+    async def flush(self) -> int:
+        """
+        Вставить накопленные ответы пачками create_many. Пачка, которую не удалось
+        записать, возвращается в начало буфера (повтор - не раньше _retry_at);
+        при ошибке данных строки пачки пишутся по одной, отбрасываются только ошибочные
+        """
+        async with self._flush_lock:
+            written = 0
+            while self._pending_answers:
+                batch = self._pending_answers[:self.flush_batch_size]
+                del self._pending_answers[:self.flush_batch_size]
+                try:
+                    written += await self.db.interviewanswer.create_many(data=batch)
+                except Exception as e:
+                    if not is_permanent_error(e):
+                        self._flush_failed(batch, e)
+                        break
+                    rows_written, rest = await self._write_rows(batch)
+                    written += rows_written
+                    if rest:
+                        break
+                    continue
+                self._flush_failures = 0
+                self._retry_at = 0.0
+                self.flushes += 1
+            self.answers_flushed += written
+            return written
+
+    async def _write_rows(self, batch: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Записать строки по одной; возвращает число записанных и строки, ушедшие на повтор"""
+        written = 0
+        for position, row in enumerate(batch):
+            try:
+                await self.db.interviewanswer.create(data=row)
+            except Exception as e:
+                if is_permanent_error(e):
+                    self.answers_dropped += 1
+                    logger.error(f"Ответ на вопрос {row['questionId']} интервью {row['interviewId']} отброшен: {e}")
+                    continue
+                rest = batch[position:]
+                self._flush_failed(rest, e)
+                return written, rest
+            written += 1
+        return written, []
+
+    def _flush_failed(self, batch: List[Dict[str, Any]], error: Exception) -> None:
+        self._flush_failures += 1
+        if self._flush_failures > self.MAX_FLUSH_RETRIES:
+            self.answers_dropped += len(batch)
+            logger.error(f"Не удалось записать {len(batch)} ответов после {self.MAX_FLUSH_RETRIES} повторов: {error}")
+            self._flush_failures = 0
+        else:
+            # Ответы остаются в буфере (и видны answers) до следующей попытки
+            self._pending_answers[:0] = batch
+            self.flush_retries += 1
+            logger.warning(f"Не удалось записать {len(batch)} ответов, повтор #{self._flush_failures}: {error}")
+        backoff = min(self.flush_interval * 2 ** self._flush_failures, self.MAX_FLUSH_BACKOFF)
+        self._retry_at = time.monotonic() + backoff
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "backend": "prisma",
+            "cached_sessions": len(self._cache),
+            "cache_hit_ratio": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            "update_conflicts": self.update_conflicts,
+            "pending_answers": len(self._pending_answers),
+            "answers_flushed": self.answers_flushed,
+            "answers_dropped": self.answers_dropped,
+            "flush_retries": self.flush_retries,
+            "flushes": self.flushes,
+        }
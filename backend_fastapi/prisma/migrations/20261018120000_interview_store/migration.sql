@@ -0,0 +1,35 @@
+-- Состояние интервью для PrismaInterviewStore: тема, текущий шаг и адаптивный
+-- выбор вопросов; анонимные интервью (userId не обязателен).
+-- Тема уже существующих интервью восстанавливается по категории вопроса из
+-- первого ответа; интервью без ответов получают 'javascript' (до выбора темы
+-- API проводил интервью только по JavaScript).
+
+-- AlterTable
+ALTER TABLE "interviews" ALTER COLUMN "userId" DROP NOT NULL,
+ADD COLUMN "topic" TEXT,
+ADD COLUMN "difficulty" TEXT NOT NULL DEFAULT 'middle',
+ADD COLUMN "currentQuestion" INTEGER NOT NULL DEFAULT 1,
+ADD COLUMN "currentQuestionId" TEXT,
+ADD COLUMN "askedQuestionIds" TEXT[],
+ADD COLUMN "tags" TEXT[];
+
+-- Backfill
+UPDATE "interviews" i SET
+    "topic" = COALESCE(
+        (SELECT q."category"
+         FROM "interview_answers" a
+         JOIN "questions" q ON q."id" = a."questionId"
+         WHERE a."interviewId" = i."id"
+         ORDER BY a."answeredAt"
+         LIMIT 1),
+        'javascript'
+    ),
+    "currentQuestion" = i."completedQuestions" + 1;
+
+ALTER TABLE "interviews" ALTER COLUMN "topic" SET NOT NULL;
+
+-- CreateIndex
+CREATE INDEX "interviews_status_idx" ON "interviews"("status");
+
+-- CreateIndex
+CREATE INDEX "interview_answers_interviewId_idx" ON "interview_answers"("interviewId");
@@ -0,0 +1,33 @@
+-- Идемпотентный импорт вопросов (scripts/import_questions.py): ключ contentHash
+-- и производные данные эталона. Для уже существующих вопросов contentHash
+-- считается так же, как content_hash() скрипта импорта:
+--   sha256(категория в нижнем регистре || U+001F || текст в нижнем регистре
+--          с пробельными символами, схлопнутыми в один пробел, без краевых)
+-- keywords и embedding остаются пустыми: ключевые слова считаются при загрузке
+-- банка, векторы - при старте (semantic_scorer) или при следующем импорте.
+
+-- AlterTable
+ALTER TABLE "questions" ADD COLUMN "contentHash" TEXT,
+ADD COLUMN "keywords" TEXT[],
+ADD COLUMN "embedding" DOUBLE PRECISION[],
+ADD COLUMN "embeddingModel" TEXT;
+
+-- Backfill
+UPDATE "questions" SET "contentHash" = encode(sha256(convert_to(
+    regexp_replace(lower("category"), '^\s+|\s+$', '', 'g')
+    || chr(31)
+    || regexp_replace(regexp_replace(lower("text"), '\s+', ' ', 'g'), '^ | $', '', 'g'),
+    'UTF8'
+)), 'hex');
+
+-- Одинаковые после нормализации вопросы: ключ остается у самого раннего, у
+-- остальных к хешу добавляется id, иначе уникальный индекс не построить
+UPDATE "questions" q SET "contentHash" = q."contentHash" || ':' || q."id"
+FROM "questions" earlier
+WHERE earlier."contentHash" = q."contentHash"
+  AND (earlier."createdAt", earlier."id") < (q."createdAt", q."id");
+
+ALTER TABLE "questions" ALTER COLUMN "contentHash" SET NOT NULL;
+
+-- CreateIndex
+CREATE UNIQUE INDEX "questions_contentHash_key" ON "questions"("contentHash");
@@ -0,0 +1,144 @@
+"""
+Репозиторий вопросов с индексами для поиска за O(1)
+
+Индексы (id -> вопрос, тема -> упорядоченные id, (тема, сложность) -> id),
+битовые маски пулов для адаптивного выбора ((тема, уровень, тег) -> маска
+позиций вопросов в теме) и индекс ключевых слов строятся один раз при
+загрузке банка. Перезагрузка
+собирает новый снимок в отдельном потоке и подменяет ссылку целиком:
+запросы, уже получившие старый снимок, дорабатывают с ним.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from keyword_scorer import KeywordIndex
+
+logger = logging.getLogger(__name__)
+
+# Уровни сложности по возрастанию; в таблице Question встречаются и easy/medium/hard
+DIFFICULTY_LEVELS = ("junior", "middle", "senior")
+DIFFICULTY_ALIASES = {"easy": "junior", "medium": "middle", "hard": "senior"}
+
+
+def difficulty_level(difficulty: Optional[str]) -> int:
+    """Номер уровня сложности (неизвестная сложность считается средней)"""
+    name = DIFFICULTY_ALIASES.get(difficulty, difficulty)
+    return DIFFICULTY_LEVELS.index(name) if name in DIFFICULTY_LEVELS else 1
+
+
+class QuestionBankSnapshot:
+    """Неизменяемый после построения набор индексов"""
+
+    __slots__ = ("by_id", "by_topic", "by_topic_difficulty", "position", "pools", "keyword_index")
+
+    def __init__(self, questions_by_topic: Dict[str, List[dict]]):
+        self.by_id: Dict[str, dict] = {}
+        self.by_topic: Dict[str, Tuple[str, ...]] = {}
+        by_topic_difficulty: Dict[Tuple[str, str], List[str]] = {}
+        # id -> позиция в by_topic[тема] (номер бита в масках пулов)
+        self.position: Dict[str, int] = {}
+        # (тема, уровень, тег или None - все теги) -> битовая маска позиций
+        self.pools: Dict[Tuple[str, int, Optional[str]], int] = {}
+
+        for topic, questions in questions_by_topic.items():
+            ids = []
+            for question in questions:
+                question_id = question["id"]
+                if question_id in self.by_id:
+                    logger.warning(f"Повторяющийся id вопроса '{question_id}' в теме '{topic}', пропущен")
+                    continue
+                self.by_id[question_id] = question
+                bit = 1 << len(ids)
+                self.position[question_id] = len(ids)
+                ids.append(question_id)
+                by_topic_difficulty.setdefault((topic, question["difficulty"]), []).append(question_id)
+                level = difficulty_level(question["difficulty"])
+                for tag in (None, *question.get("tags", ())):
+                    key = (topic, level, tag)
+                    self.pools[key] = self.pools.get(key, 0) | bit
+            self.by_topic[topic] = tuple(ids)
+
+        self.by_topic_difficulty: Dict[Tuple[str, str], Tuple[str, ...]] = {
+            key: tuple(ids) for key, ids in by_topic_difficulty.items()
+        }
+        self.keyword_index = KeywordIndex.from_questions(self.by_id.values())
+
+    def pool(self, topic: str, level: int, tags: Iterable[str] = ()) -> int:
+        """Маска вопросов темы уровня level (с любым из тегов tags, если они заданы)"""
+        pools = self.pools
+        if not tags:
+            return pools.get((topic, level, None), 0)
+        mask = 0
+        for tag in tags:
+            mask |= pools.get((topic, level, tag), 0)
+        return mask
+
+
+class QuestionBank:
+    """Банк вопросов по темам"""
+
+    def __init__(self, questions_by_topic: Dict[str, List[dict]]):
+        self._snapshot = QuestionBankSnapshot(questions_by_topic)
+
+    @property
+    def snapshot(self) -> QuestionBankSnapshot:
+        return self._snapshot
+
+    @property
+    def keyword_index(self) -> KeywordIndex:
+        return self._snapshot.keyword_index
+
+    def __len__(self) -> int:
+        return len(self._snapshot.by_id)
+
+    def has_topic(self, topic: str) -> bool:
+        return topic in self._snapshot.by_topic
+
+    def topics(self) -> List[str]:
+        return list(self._snapshot.by_topic)
+
+    def topic_size(self, topic: str) -> int:
+        return len(self._snapshot.by_topic.get(topic, ()))
+
+    def get(self, question_id: str) -> Optional[dict]:
+        return self._snapshot.by_id.get(question_id)
+
+    def get_in_topic(self, topic: str, question_id: str) -> Optional[dict]:
+        """Вопрос по id, если он относится к теме"""
+        question = self._snapshot.by_id.get(question_id)
+        if question is None or question["topic"] != topic:
+            return None
+        return question
+
+    def question_at(self, topic: str, position: int) -> Optional[dict]:
+        """Вопрос темы по порядковому номеру (с 0)"""
+        snapshot = self._snapshot
+        ids = snapshot.by_topic.get(topic, ())
+        if not 0 <= position < len(ids):
+            return None
+        return snapshot.by_id[ids[position]]
+
+    def ids_for(self, topic: str, difficulty: Optional[str] = None) -> Sequence[str]:
+        """Упорядоченные id вопросов темы (и сложности)"""
+        if difficulty is None:
+            return self._snapshot.by_topic.get(topic, ())
+        return self._snapshot.by_topic_difficulty.get((topic, difficulty), ())
+
+    def replace(self, questions_by_topic: Dict[str, List[dict]]) -> None:
+        """Синхронно пересобрать индексы (для скриптов и старта приложения)"""
+        self._snapshot = QuestionBankSnapshot(questions_by_topic)
+
+    async def reload(self, questions_by_topic: Dict[str, List[dict]]) -> int:
+        """Пересобрать индексы в фоновом потоке и атомарно подменить снимок"""
+        snapshot = await asyncio.to_thread(QuestionBankSnapshot, questions_by_topic)
+        self._snapshot = snapshot
+        return len(snapshot.by_id)
+
+
+def load_questions_file(path: str) -> Dict[str, List[dict]]:
+    """Прочитать банк вопросов из JSON файла вида {"тема": [{"id": ..., "text": ..., ...}]}"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
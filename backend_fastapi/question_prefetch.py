@@ -0,0 +1,282 @@
+"""
+Подсказки к вопросам и их упреждающая генерация
+
+Подсказка (одна фраза, направляющая кандидата без раскрытия ответа)
+генерируется моделью. Чтобы get_question не ждал генерацию, подсказку
+следующего вопроса начинаем готовить, пока кандидат отвечает на текущий:
+ожидаемый следующий вопрос кладется в слот сессии, а генерация идет в
+фоне - не больше max_parallel одновременно и с фоновым приоритетом очереди
+Ollama (llm_queue), то есть после оценок ответов.
+
+Когда get_question выдает вопрос, слот сессии расходуется: готовая
+подсказка отдается сразу, а если она не готова, вопрос выдается без
+подсказки (inline_timeout=0, по умолчанию) - генерация продолжается в фоне
+и заполняет кеш для следующих интервью. С inline_timeout > 0 подсказку
+ждем не дольше него: еще не готовая фоновая генерация отменяется и
+запускается заново с обычным приоритетом (за оценками в очереди она могла
+бы простоять дольше, чем кандидат готов ждать).
+Если следующим оказался другой вопрос (адаптивный выбор по оценке),
+слот заменяется, а генерация, до которой не дошла очередь и которая
+больше никому не нужна, не выполняется. Подсказка зависит только от
+вопроса, поэтому готовые подсказки хранятся в общем LRU и переиспользуются
+всеми сессиями.
+
+Эталонный ответ в промпт не передается: подсказку видит кандидат, и модель
+не должна иметь возможности его пересказать.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from llm_queue import LLMOverloaded, Priority, llm_priority
+from ollama_client import OllamaClient, OllamaGenerateRequest
+
+logger = logging.getLogger(__name__)
+
+HINT_SYSTEM_PROMPT = (
+    "Ты помогаешь кандидату на техническом интервью. Ты никогда не отвечаешь "
+    "на вопрос, а только подсказываешь, в какую сторону думать."
+)
+
+HINT_PROMPT_TEMPLATE = """Вопрос: {question}
+
+Напиши одну короткую подсказку (одно предложение): о каком понятии или механизме стоит вспомнить, не отвечая на вопрос.
+Формат:
+Подсказка: <текст>"""
+
+# Подсказка - одно предложение: длинная генерация не нужна
+HINT_MAX_TOKENS = 64
+HINT_MAX_LENGTH = 300
+
+
+def build_hint_request(model: str, question: dict) -> OllamaGenerateRequest:
+    return OllamaGenerateRequest(
+        model=model,
+        prompt=HINT_PROMPT_TEMPLATE.format(question=question["text"]),
+        system=HINT_SYSTEM_PROMPT,
+        options={"temperature": 0, "num_predict": HINT_MAX_TOKENS},
+    )
+
+
+def parse_hint(text: str) -> Optional[str]:
+    """Первая непустая строка ответа без префикса "Подсказка:" """
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.lower().startswith("подсказка:"):
+            line = line.split(":", 1)[1].strip()
+        return line[:HINT_MAX_LENGTH] or None
+    return None
+
+
+class QuestionMaterialPrefetcher:
+    """
+    Общий кеш подсказок и слоты упреждающей генерации по сессиям
+
+    client - OllamaClient или OllamaRouter
+    """
+
+    def __init__(
+        self,
+        client: OllamaClient,
+        model: str,
+        max_entries: int = 10000,
+        max_sessions: int = 10000,
+        max_parallel: int = 1,
+        inline_timeout: float = 0.0,
+    ):
+        self.client = client
+        self.model = model
+        self.max_entries = max_entries
+        self.max_sessions = max_sessions
+        self.inline_timeout = inline_timeout
+        self._semaphore = asyncio.Semaphore(max_parallel)
+        # id вопроса -> подсказка
+        self._hints: "OrderedDict[str, str]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Вопросы, подсказка к которым генерируется с фоновым приоритетом
+        self._background: set = set()
+        # id сессии -> id вопроса, который для нее готовится
+        self._slots: "OrderedDict[str, str]" = OrderedDict()
+        # Сколько слотов и ожидающих get_question нуждаются в подсказке вопроса
+        self._wanted: Dict[str, int] = {}
+
+        self.ready = 0
+        self.missed = 0
+        self.waited = 0
+        self.inline = 0
+        self.promoted = 0
+        self.timeouts = 0
+        self.speculated = 0
+        self.discarded = 0
+        self.skipped = 0
+        self.generated = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def close(self) -> None:
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._inflight.clear()
+        self._background.clear()
+        self._slots.clear()
+        self._wanted.clear()
+
+    def _want(self, question_id: str, delta: int) -> None:
+        count = self._wanted.get(question_id, 0) + delta
+        if count > 0:
+            self._wanted[question_id] = count
+        else:
+            self._wanted.pop(question_id, None)
+
+    def _release_slot(self, session_id: str) -> Optional[str]:
+        question_id = self._slots.pop(session_id, None)
+        if question_id is not None:
+            self._want(question_id, -1)
+        return question_id
+
+    def speculate(self, session_id: str, question: Optional[dict]) -> None:
+        """Начать готовить подсказку вопроса, который сессия, вероятно, получит следующим"""
+        if question is None:
+            return
+        question_id = question["id"]
+        current = self._slots.get(session_id)
+        if current == question_id:
+            return
+        if current is not None:
+            self._release_slot(session_id)
+            self.discarded += 1
+        if question_id in self._hints:
+            return
+        self._slots[session_id] = question_id
+        self._want(question_id, 1)
+        while len(self._slots) > self.max_sessions:
+            self._release_slot(next(iter(self._slots)))
+        if question_id not in self._inflight:
+            self.speculated += 1
+            self._start(question, low_priority=True)
+
+    def drop(self, session_id: str) -> None:
+        """Сессия завершена: ее слот больше не нужен"""
+        if self._release_slot(session_id) is not None:
+            self.discarded += 1
+
+    async def material_for(self, session_id: str, question: dict) -> Optional[str]:
+        """
+        Подсказка к выдаваемому вопросу: готовая сразу; не готовая - None
+        (генерация идет в фоне), с inline_timeout > 0 - ждем не дольше него
+        """
+        question_id = question["id"]
+        slot = self._release_slot(session_id)
+        if slot is not None and slot != question_id:
+            self.discarded += 1
+
+        hint = self._hints.get(question_id)
+        if hint is not None:
+            self._hints.move_to_end(question_id)
+            self.ready += 1
+            return hint
+
+        task = self._inflight.get(question_id)
+        if self.inline_timeout <= 0:
+            # Запрос вопроса не ждет модель: подсказка достанется следующим интервью
+            self.missed += 1
+            if task is None:
+                task = self._start(question, low_priority=True)
+            # Слот сессии уже освобожден: без этого генерация, ждущая очереди, была бы пропущена
+            self._want(question_id, 1)
+            task.add_done_callback(lambda done: self._want(question_id, -1))
+            return None
+        if task is not None and question_id in self._background:
+            # Фоновая генерация может стоять за оценками в очереди Ollama: кандидат ждать не должен
+            task.cancel()
+            task = None
+            self._background.discard(question_id)
+            self.promoted += 1
+        if task is not None:
+            self.waited += 1
+        else:
+            self.inline += 1
+            task = self._start(question, low_priority=False)
+        self._want(question_id, 1)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.inline_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return None
+        except Exception:
+            return None
+        finally:
+            self._want(question_id, -1)
+
+    def _start(self, question: dict, low_priority: bool) -> asyncio.Task:
+        question_id = question["id"]
+        task = asyncio.create_task(self._generate(question, low_priority))
+        self._inflight[question_id] = task
+        if low_priority:
+            self._background.add(question_id)
+        task.add_done_callback(lambda done: self._generation_done(question_id, done))
+        return task
+
+    def _generation_done(self, question_id: str, task: asyncio.Task) -> None:
+        if self._inflight.get(question_id) is task:
+            del self._inflight[question_id]
+            self._background.discard(question_id)
+        if not task.cancelled():
+            task.exception()
+
+    async def _generate(self, question: dict, low_priority: bool) -> Optional[str]:
+        question_id = question["id"]
+        if low_priority:
+            async with self._semaphore:
+                # Пока ждали очереди, сессия могла получить другой вопрос
+                if question_id not in self._wanted:
+                    self.skipped += 1
+                    return None
+                with llm_priority(Priority.BACKGROUND):
+                    return await self._request_hint(question)
+        return await self._request_hint(question)
+
+    async def _request_hint(self, question: dict) -> Optional[str]:
+        try:
+            response = await self.client.generate(build_hint_request(self.model, question))
+        except LLMOverloaded:
+            self.rejected += 1
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Не удалось сгенерировать подсказку к вопросу {question['id']}: {e}")
+            raise
+        hint = parse_hint(response.response)
+        self.generated += 1
+        if hint is not None:
+            self._hints[question["id"]] = hint
+            while len(self._hints) > self.max_entries:
+                self._hints.popitem(last=False)
+        return hint
+
+    def stats(self) -> Dict[str, Any]:
+        served = self.ready + self.missed + self.waited + self.inline
+        return {
+            "hints": len(self._hints),
+            "slots": len(self._slots),
+            "inflight": len(self._inflight),
+            "ready": self.ready,
+            "missed": self.missed,
+            "waited": self.waited,
+            "inline": self.inline,
+            "promoted": self.promoted,
+            "ready_ratio": round(self.ready / served, 4) if served else 0.0,
+            "timeouts": self.timeouts,
+            "speculated": self.speculated,
+            "discarded": self.discarded,
+            "skipped": self.skipped,
+            "generated": self.generated,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,134 @@
+"""
+Адаптивный выбор вопросов интервью
+
+Первый вопрос берется из пула запрошенной сложности, следующие - на
+уровень выше, если средняя оценка кандидата не ниже raise_at, и на
+уровень ниже, если она меньше lower_below. Когда пул нужного уровня
+исчерпан, берется ближайший уровень.
+
+Пулы - битовые маски позиций вопросов темы, посчитанные при загрузке
+банка (QuestionBankSnapshot.pools), заданные вопросы сессии - такая же
+маска. Свободные вопросы уровня - pool & ~asked, следующий из них - младший
+установленный бит: выбор не перебирает вопросы и не создает списков.
+Чтобы кандидаты получали разные вопросы, поиск начинается со смещения,
+зависящего от id интервью.
+
+Следующий вопрос для каждого возможного исхода (уровень выше, тот же,
+ниже) можно выбрать заранее, пока оценивается текущий ответ
+(candidates), а после оценки только взять нужный (advance).
+"""
+
+import zlib
+from typing import Dict, List, Optional
+
+from models import InterviewSession
+from question_bank import DIFFICULTY_LEVELS, QuestionBank, QuestionBankSnapshot, difficulty_level
+
+
+def _lowest_bit(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+class QuestionSelector:
+    def __init__(self, bank: QuestionBank, raise_at: float = 8.0, lower_below: float = 5.0):
+        self.bank = bank
+        self.raise_at = raise_at
+        self.lower_below = lower_below
+
+    def available_count(self, topic: str, tags: List[str]) -> int:
+        """Сколько вопросов темы (с тегами tags) можно задать"""
+        snapshot = self.bank.snapshot
+        return sum(snapshot.pool(topic, level, tags).bit_count() for level in range(len(DIFFICULTY_LEVELS)))
+
+    def target_level(self, session: InterviewSession) -> int:
+        """Уровень следующего вопроса по средней оценке уже отвеченных"""
+        level = difficulty_level(session.difficulty)
+        answered = session.current_question - 1
+        if answered > 0:
+            average = session.score / answered
+            if average >= self.raise_at:
+                level += 1
+            elif average < self.lower_below:
+                level -= 1
+        return min(max(level, 0), len(DIFFICULTY_LEVELS) - 1)
+
+    def asked_mask(self, session: InterviewSession, snapshot: QuestionBankSnapshot) -> int:
+        """Маска заданных вопросов; после перезагрузки банка пересобирается по id"""
+        cached = session._asked_mask
+        if cached is not None and cached[0] is snapshot:
+            return cached[1]
+        mask = 0
+        for question_id in session.asked_question_ids:
+            position = snapshot.position.get(question_id)
+            if position is not None:
+                mask |= 1 << position
+        session._asked_mask = (snapshot, mask)
+        return mask
+
+    def _mark_asked(self, session: InterviewSession, question_id: str, snapshot: QuestionBankSnapshot) -> None:
+        mask = self.asked_mask(session, snapshot) | (1 << snapshot.position[question_id])
+        session.asked_question_ids.append(question_id)
+        session._asked_mask = (snapshot, mask)
+
+    @staticmethod
+    def _level_order(level: int) -> List[int]:
+        """Уровень level, затем ближайшие: выше, ниже, через один"""
+        order = [level, level + 1, level - 1, level + 2, level - 2]
+        return [lvl for lvl in order if 0 <= lvl < len(DIFFICULTY_LEVELS)]
+
+    def pick(self, session: InterviewSession, level: int) -> Optional[dict]:
+        """Незаданный вопрос уровня level (или ближайшего), не отмечая его заданным"""
+        snapshot = self.bank.snapshot
+        topic_ids = snapshot.by_topic.get(session.topic, ())
+        if not topic_ids:
+            return None
+        asked = self.asked_mask(session, snapshot)
+        offset = zlib.crc32(session.id.encode("utf-8")) % len(topic_ids)
+        for lvl in self._level_order(level):
+            available = snapshot.pool(session.topic, lvl, session.tags) & ~asked
+            if not available:
+                continue
+            after_offset = available >> offset
+            position = offset + _lowest_bit(after_offset) if after_offset else _lowest_bit(available)
+            return snapshot.by_id[topic_ids[position]]
+        return None
+
+    def _assign(self, session: InterviewSession, question: Optional[dict]) -> Optional[dict]:
+        if question is None:
+            session.current_question_id = None
+            return None
+        session.current_question_id = question["id"]
+        self._mark_asked(session, question["id"], self.bank.snapshot)
+        return question
+
+    def first_question(self, session: InterviewSession) -> Optional[dict]:
+        """Выбрать первый вопрос новой сессии"""
+        return self._assign(session, self.pick(session, self.target_level(session)))
+
+    def candidates(self, session: InterviewSession) -> Dict[int, Optional[str]]:
+        """
+        Следующий вопрос для каждого уровня, возможного после текущего ответа.
+        Вызывается до оценки ответа, результат передается в advance
+        """
+        if session.current_question >= session.total_questions:
+            return {}
+        level = difficulty_level(session.difficulty)
+        result = {}
+        for lvl in range(max(level - 1, 0), min(level + 2, len(DIFFICULTY_LEVELS))):
+            question = self.pick(session, lvl)
+            result[lvl] = question["id"] if question is not None else None
+        return result
+
+    def advance(self, session: InterviewSession, candidates: Optional[Dict[int, Optional[str]]] = None) -> Optional[dict]:
+        """Перейти к следующему вопросу после учета оценки (session.current_question уже увеличен)"""
+        if session.current_question > session.total_questions:
+            session.current_question_id = None
+            return None
+        level = self.target_level(session)
+        question_id = (candidates or {}).get(level)
+        snapshot = self.bank.snapshot
+        question = snapshot.by_id.get(question_id) if question_id is not None else None
+        # Банк мог перезагрузиться, пока оценивался ответ: тогда выбираем заново
+        if question is None or self.asked_mask(session, snapshot) >> snapshot.position[question_id] & 1:
+            question = self.pick(session, level)
+        return self._assign(session, question)
@@ -0,0 +1,321 @@
+"""
+Выгрузка результатов интервью для офлайн-аналитики
+
+Ответы (interview_answers) вместе с полями интервью выгружаются одной
+плоской таблицей в колоночный файл: Parquet или Arrow IPC (нужен pyarrow),
+без pyarrow - CSV. Строки читаются серверным курсором PostgreSQL
+(psycopg2, именованный курсор) пачками по batch_size и пишутся в файл
+по мере чтения: ни выборка, ни файл не собираются в памяти целиком.
+
+Выгрузка инкрементальная: в каталоге выгрузки хранится watermark -
+(answeredAt, id) последней выгруженной строки, следующий запуск берет
+только более новые строки и пишет их в новый файл. Ответы пишутся в базу
+пачками с задержкой (write-behind), поэтому строки моложе lag секунд не
+выгружаются: иначе опоздавшая строка с меньшим answeredAt была бы
+пропущена следующим запуском.
+"""
+
+import csv
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+FORMAT_AUTO = "auto"
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+FORMAT_CSV = "csv"
+FORMATS = (FORMAT_AUTO, FORMAT_PARQUET, FORMAT_ARROW, FORMAT_CSV)
+
+FILE_EXTENSIONS = {FORMAT_PARQUET: ".parquet", FORMAT_ARROW: ".arrow", FORMAT_CSV: ".csv"}
+
+WATERMARK_FILE = "_watermark.json"
+
+# Колонки выгрузки: (имя, тип для pyarrow)
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("answer_id", "string"),
+    ("interview_id", "string"),
+    ("question_id", "string"),
+    ("answered_at", "timestamp"),
+    ("score", "float64"),
+    ("is_correct", "bool"),
+    ("time_spent", "int32"),
+    ("user_answer", "string"),
+    ("feedback", "string"),
+    ("topic", "string"),
+    ("difficulty", "string"),
+    ("interview_status", "string"),
+    ("interview_score", "float64"),
+    ("total_questions", "int32"),
+    ("started_at", "timestamp"),
+    ("ended_at", "timestamp"),
+    ("user_id", "string"),
+)
+
+EXPORT_QUERY = """
+SELECT a."id", a."interviewId", a."questionId", a."answeredAt", a."score", a."isCorrect", a."timeSpent",
+       a."userAnswer", a."feedback", i."topic", i."difficulty", i."status", i."score", i."totalQuestions",
+       i."startedAt", i."endedAt", i."userId"
+FROM interview_answers a
+JOIN interviews i ON i."id" = a."interviewId"
+WHERE (a."answeredAt", a."id") > (%s, %s) AND a."answeredAt" < %s
+ORDER BY a."answeredAt", a."id"
+"""
+
+# Параметры строки подключения, которые понимает только Prisma
+PRISMA_URL_PARAMS = ("schema", "connection_limit", "pool_timeout", "pgbouncer", "socket_timeout", "statement_cache_size")
+
+# Начальный watermark: выгрузить все
+EPOCH = datetime(1970, 1, 1)
+
+
+def pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_format(export_format: str) -> str:
+    """auto -> parquet, если установлен pyarrow, иначе csv"""
+    if export_format not in FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {export_format}")
+    if export_format == FORMAT_AUTO:
+        return FORMAT_PARQUET if pyarrow_available() else FORMAT_CSV
+    if export_format != FORMAT_CSV and not pyarrow_available():
+        raise ValueError(f"Для формата {export_format} нужен pyarrow (pip install pyarrow); доступен csv")
+    return export_format
+
+
+def libpq_url(database_url: str) -> str:
+    """
+    Строка подключения Prisma -> libpq: параметры Prisma убираются,
+    schema превращается в search_path
+    """
+    parts = urlsplit(database_url)
+    query = []
+    schema = None
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        if key == "schema":
+            schema = value
+        elif key not in PRISMA_URL_PARAMS:
+            query.append((key, value))
+    if schema:
+        query.append(("options", f"-csearch_path={schema}"))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+# Watermark
+
+def read_watermark(output_dir: str) -> Dict[str, Any]:
+    path = os.path.join(output_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {"answered_at": None, "answer_id": "", "files": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_watermark(output_dir: str, watermark: Dict[str, Any]) -> None:
+    path = os.path.join(output_dir, WATERMARK_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(watermark, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+# Запись файлов
+
+class CsvBatchWriter:
+    """CSV с заголовком; время - ISO 8601 в UTC, пустые значения - пустые ячейки"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(name for name, _ in COLUMNS)
+
+    def write(self, rows: Sequence[tuple]) -> None:
+        self._writer.writerows(
+            tuple(value.isoformat() if isinstance(value, datetime) else value for value in row) for row in rows
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ArrowBatchWriter:
+    """Parquet (по row group на пачку) или Arrow IPC (по record batch на пачку)"""
+
+    def __init__(self, path: str, export_format: str):
+        import pyarrow as pa
+
+        self._pa = pa
+        types = {
+            "string": pa.string(),
+            "float64": pa.float64(),
+            "bool": pa.bool_(),
+            "int32": pa.int32(),
+            "timestamp": pa.timestamp("ms", tz="UTC"),
+        }
+        self.schema = pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+        if export_format == FORMAT_PARQUET:
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, rows: Sequence[tuple]) -> None:
+        columns = list(zip(*rows))
+        batch = self._pa.RecordBatch.from_arrays(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def open_writer(path: str, export_format: str):
+    if export_format == FORMAT_CSV:
+        return CsvBatchWriter(path)
+    return ArrowBatchWriter(path, export_format)
+
+
+# Выгрузка
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Prisma хранит DateTime как timestamp без зоны в UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def normalize_row(row: tuple) -> tuple:
+    (answer_id, interview_id, question_id, answered_at, score, is_correct, time_spent, user_answer, feedback,
+     topic, difficulty, status, interview_score, total_questions, started_at, ended_at, user_id) = row
+    return (
+        answer_id, interview_id, question_id, _as_utc(answered_at), score, is_correct, time_spent,
+        user_answer, feedback, topic, difficulty, status, interview_score, total_questions,
+        _as_utc(started_at), _as_utc(ended_at), user_id,
+    )
+
+
+def write_batches(batches: Iterable[List[tuple]], path: str, export_format: str) -> Tuple[int, Optional[tuple]]:
+    """
+    Записать пачки строк (в порядке answeredAt, id) в файл; возвращает
+    число строк и последнюю строку. Файл появляется под именем path только
+    целиком записанным
+    """
+    tmp_path = f"{path}.tmp"
+    writer = open_writer(tmp_path, export_format)
+    rows_written = 0
+    last = None
+    try:
+        for batch in batches:
+            rows = [normalize_row(row) for row in batch]
+            writer.write(rows)
+            rows_written += len(rows)
+            last = rows[-1]
+    except BaseException:
+        writer.close()
+        os.remove(tmp_path)
+        raise
+    writer.close()
+    if rows_written:
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+    return rows_written, last
+
+
+def fetch_batches(database_url: str, since: Tuple[datetime, str], until: datetime,
+                  batch_size: int) -> Iterator[List[tuple]]:
+    """Строки выгрузки серверным курсором: в памяти не больше batch_size строк"""
+    import psycopg2
+
+    connection = psycopg2.connect(libpq_url(database_url))
+    try:
+        # Именованный курсор живет в транзакции; выгрузке нужна только согласованная выборка
+        connection.set_session(readonly=True)
+        with connection.cursor(name="results_export") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(EXPORT_QUERY, (since[0], since[1], until))
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+        connection.rollback()
+    finally:
+        connection.close()
+
+
+def export_results(
+    database_url: str,
+    output_dir: str,
+    export_format: str = FORMAT_AUTO,
+    batch_size: int = 10000,
+    lag: float = 60.0,
+    full: bool = False,
+    fetch: Callable[..., Iterable[List[tuple]]] = fetch_batches,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Выгрузить ответы новее watermark (full - все) в новый файл output_dir;
+    watermark сдвигается только после успешной записи файла
+    """
+    export_format = resolve_format(export_format)
+    os.makedirs(output_dir, exist_ok=True)
+    watermark = read_watermark(output_dir)
+    if full or watermark["answered_at"] is None:
+        since = (EPOCH, "")
+    else:
+        since = (datetime.fromisoformat(watermark["answered_at"]).replace(tzinfo=None), watermark["answer_id"])
+    # Время в базе - UTC без зоны
+    until = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=lag)
+
+    started = time.perf_counter()
+    # Номер запуска в имени: файлы упорядочены и не перезаписывают друг друга
+    run = len(watermark.get("files", [])) + 1
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    name = f"answers_{run:05d}_{stamp}{FILE_EXTENSIONS[export_format]}"
+    path = os.path.join(output_dir, name)
+
+    def counted(batches):
+        total = 0
+        for batch in batches:
+            total += len(batch)
+            if progress is not None:
+                progress(total)
+            yield batch
+
+    batches = fetch(database_url, since, until, batch_size)
+    try:
+        rows, last = write_batches(counted(batches), path, export_format)
+    finally:
+        # Курсор и соединение закрываются, даже если запись файла прервалась
+        if hasattr(batches, "close"):
+            batches.close()
+    if rows:
+        watermark = {
+            "answered_at": last[3].replace(tzinfo=None).isoformat(),
+            "answer_id": last[0],
+            "files": [*watermark.get("files", []), name],
+        }
+        write_watermark(output_dir, watermark)
+    return {
+        "rows": rows,
+        "file": path if rows else None,
+        "format": export_format,
+        "since": since[0].isoformat() if since[0] != EPOCH else None,
+        "until": until.isoformat(),
+        "watermark": watermark["answered_at"],
+        "seconds": round(time.perf_counter() - started, 3),
+    }
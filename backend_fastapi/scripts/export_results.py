@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Выгрузка результатов интервью (Parquet / Arrow IPC / CSV) для аналитики
+
+Каждый запуск выгружает ответы новее watermark предыдущего запуска в
+новый файл каталога выгрузки (подходит для ночного cron). Подробности -
+в results_export.py.
+
+    python scripts/export_results.py --output-dir exports --format parquet
+    python scripts/export_results.py --full --format csv
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from results_export import FORMATS, export_results  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка результатов интервью")
+    parser.add_argument("--output-dir", default=config.EXPORT_DIR)
+    parser.add_argument("--format", choices=FORMATS, default=config.EXPORT_FORMAT,
+                        help="auto - parquet, если установлен pyarrow, иначе csv")
+    parser.add_argument("--batch-size", type=int, default=config.EXPORT_BATCH_SIZE)
+    parser.add_argument("--lag", type=float, default=config.EXPORT_LAG_SECONDS,
+                        help="Не выгружать ответы моложе стольких секунд")
+    parser.add_argument("--full", action="store_true", help="Выгрузить все ответы, не только новее watermark")
+    args = parser.parse_args()
+
+    database_url = config.DATABASE_URL
+    if not database_url:
+        parser.error("Нужен DATABASE_URL")
+
+    print(f"📤 Выгрузка результатов в {args.output_dir}")
+    result = export_results(
+        database_url, args.output_dir, args.format, args.batch_size, args.lag, args.full,
+        progress=lambda rows: print(f"   строк: {rows}", end="\r"),
+    )
+    if result["rows"]:
+        print(f"🎉 Готово: {result['rows']} строк за {result['seconds']} с -> {result['file']}")
+    else:
+        print("✅ Новых ответов нет")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Потоковый импорт банка вопросов в базу данных
+
+Файл (JSONL или CSV) читается построчно генератором и пишется пачками
+create_many. Каждый вопрос получает contentHash (категория + текст вопроса),
+поэтому повторный запуск на том же файле ничего не дублирует: новые вопросы
+вставляются, измененные - обновляются, остальные пропускаются. В том же
+проходе считаются производные данные: основы ключевых слов эталона и,
+по желанию, эмбеддинг эталона через Ollama.
+
+    python scripts/import_questions.py questions.jsonl --chunk-size 1000 --embeddings
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_scorer import tokenize  # noqa: E402
+
+# Поля, изменение которых требует обновления существующей строки
+UPDATABLE_FIELDS = ("difficulty", "correctAnswer", "explanation", "tags")
+
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: некорректный JSON: {e}")
+
+
+def read_csv(path: str) -> Iterator[Dict[str, Any]]:
+    """CSV с заголовком; теги перечисляются через ';'"""
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            tags = row.get("tags") or ""
+            row["tags"] = [tag.strip() for tag in tags.split(";") if tag.strip()]
+            yield row
+
+
+def read_questions(path: str) -> Iterator[Dict[str, Any]]:
+    if path.endswith(".csv"):
+        return read_csv(path)
+    return read_jsonl(path)
+
+
+def normalize_question(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Привести запись к полям модели Question (допускаются snake_case имена)"""
+    text = (raw.get("text") or "").strip()
+    category = (raw.get("category") or raw.get("topic") or "").strip()
+    correct_answer = (raw.get("correctAnswer") or raw.get("correct_answer") or "").strip()
+    if not text or not category or not correct_answer:
+        raise ValueError(f"Нужны поля text, category и correctAnswer: {raw}")
+    return {
+        "text": text,
+        "category": category,
+        "difficulty": (raw.get("difficulty") or "medium").strip(),
+        "correctAnswer": correct_answer,
+        "explanation": (raw.get("explanation") or None),
+        "tags": list(raw.get("tags") or []),
+    }
+
+
+def content_hash(question: Dict[str, Any]) -> str:
+    """Идентичность вопроса: категория и текст без учета регистра и пробелов"""
+    key = question["category"].lower() + "\x1f" + " ".join(question["text"].lower().split())
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def chunked(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.embedded = 0
+        self.started_at = time.perf_counter()
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.perf_counter() - self.started_at
+        return self.read / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"прочитано {self.read}, создано {self.created}, обновлено {self.updated}, "
+                f"без изменений {self.unchanged}, эмбеддингов {self.embedded}, "
+                f"{self.rows_per_second:.0f} строк/с")
+
+
+class QuestionImporter:
+    """Импорт вопросов пачками с проверкой contentHash"""
+
+    def __init__(self, db, chunk_size: int = 1000, ollama=None, embedding_model: Optional[str] = None):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.ollama = ollama
+        self.embedding_model = embedding_model
+
+    async def run(self, raw_questions: Iterable[Dict[str, Any]], progress: bool = True) -> ImportStats:
+        stats = ImportStats()
+        normalized = (normalize_question(raw) for raw in raw_questions)
+        for chunk in chunked(normalized, self.chunk_size):
+            await self._import_chunk(chunk, stats)
+            if progress:
+                print(f"  ... {stats.summary()}")
+        return stats
+
+    async def _import_chunk(self, chunk: List[Dict[str, Any]], stats: ImportStats) -> None:
+        stats.read += len(chunk)
+
+        # Дубликаты внутри одной пачки: побеждает последняя запись
+        by_hash: Dict[str, Dict[str, Any]] = {}
+        for question in chunk:
+            question["contentHash"] = content_hash(question)
+            by_hash[question["contentHash"]] = question
+
+        existing = {
+            row.contentHash: row
+            for row in await self.db.question.find_many(where={"contentHash": {"in": list(by_hash)}})
+        }
+
+        to_create = []
+        to_update = []
+        for question_hash, question in by_hash.items():
+            row = existing.get(question_hash)
+            if row is None:
+                to_create.append(question)
+            elif any(getattr(row, field) != question[field] for field in UPDATABLE_FIELDS):
+                to_update.append((row, question))
+            else:
+                stats.unchanged += 1
+
+        # Производные данные считаем только для новых и измененных вопросов
+        changed = to_create + [question for _, question in to_update]
+        for question in changed:
+            question["keywords"] = sorted(tokenize(question["correctAnswer"]))
+        if self.ollama is not None and changed:
+            await self._embed(changed, stats)
+
+        if to_create:
+            stats.created += await self.db.question.create_many(data=to_create, skip_duplicates=True)
+        for row, question in to_update:
+            data = {field: question[field] for field in UPDATABLE_FIELDS}
+            data["keywords"] = question["keywords"]
+            if "embedding" in question:
+                data["embedding"] = question["embedding"]
+                data["embeddingModel"] = question["embeddingModel"]
+            elif row.correctAnswer != question["correctAnswer"]:
+                # Вектор старого эталона больше не годится: его пересчитает semantic_scorer при старте
+                data["embedding"] = {"set": []}
+                data["embeddingModel"] = None
+            await self.db.question.update(where={"id": row.id}, data=data)
+            stats.updated += 1
+
+    async def _embed(self, questions: List[Dict[str, Any]], stats: ImportStats) -> None:
+        responses = await asyncio.gather(*(
+            self.ollama.embeddings(self.embedding_model, question["correctAnswer"]) for question in questions
+        ))
+        for question, response in zip(questions, responses):
+            question["embedding"] = response["embedding"]
+            question["embeddingModel"] = self.embedding_model
+        stats.embedded += len(questions)
+
+
+async def import_questions(raw_questions: Iterable[Dict[str, Any]], chunk_size: int = 1000,
+                           embeddings: bool = False, progress: bool = True) -> ImportStats:
+    """Подключиться к базе (и Ollama) и импортировать вопросы"""
+    from prisma import Prisma
+
+    import config
+    from ollama_client import OllamaClient
+
+    prisma = Prisma()
+    await prisma.connect()
+    ollama = None
+    try:
+        if embeddings:
+            ollama = OllamaClient(config.OLLAMA_BASE_URL, max_concurrency=config.OLLAMA_MAX_CONCURRENCY)
+            await ollama.start()
+        importer = QuestionImporter(
+            prisma,
+            chunk_size=chunk_size,
+            ollama=ollama,
+            embedding_model=config.OLLAMA_EMBEDDING_MODEL,
+        )
+        return await importer.run(raw_questions, progress=progress)
+    finally:
+        if ollama is not None:
+            await ollama.close()
+        await prisma.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт банка вопросов (JSONL/CSV)")
+    parser.add_argument("path", help="Файл .jsonl или .csv")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--embeddings", action="store_true", help="Посчитать эмбеддинги эталонов через Ollama")
+    args = parser.parse_args()
+
+    print(f"📥 Импорт вопросов из {args.path}")
+    stats = asyncio.run(import_questions(read_questions(args.path), args.chunk_size, args.embeddings))
+    print(f"🎉 Готово: {stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
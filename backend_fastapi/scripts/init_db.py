@@ -4,7 +4,8 @@
 """
 
 import asyncio
-from prisma import Prisma
+
+from import_questions import import_questions
 
 # Начальные вопросы для JavaScript интервью
 INITIAL_QUESTIONS = [
@@ -51,37 +52,18 @@ INITIAL_QUESTIONS = [
 ]
 
 async def init_database():
-    """Инициализация базы данных"""
-    prisma = Prisma()
+    """
+    Инициализация базы данных
     
+    Импорт идемпотентный (по contentHash): повторный запуск не создает дубликатов
+    """
     try:
-        await prisma.connect()
-        
-        print("🔗 Подключение к базе данных установлено")
-        
-        # Проверяем, есть ли уже вопросы в базе
-        existing_questions = await prisma.question.find_many()
-        
-        if existing_questions:
-            print(f"📊 В базе уже есть {len(existing_questions)} вопросов")
-            return
-        
-        print("📝 Создание начальных вопросов...")
-        
-        # Создаем начальные вопросы
-        for question_data in INITIAL_QUESTIONS:
-            await prisma.question.create({
-                'data': question_data
-            })
-            print(f"✅ Создан вопрос: {question_data['text'][:50]}...")
-        
-        print(f"🎉 Успешно создано {len(INITIAL_QUESTIONS)} вопросов")
-        
+        print("📝 Загрузка начальных вопросов...")
+        stats = await import_questions(INITIAL_QUESTIONS, progress=False)
+        print(f"🎉 Готово: {stats.summary()}")
     except Exception as e:
         print(f"❌ Ошибка при инициализации базы данных: {e}")
         raise
-    finally:
-        await prisma.disconnect()
 
 if __name__ == "__main__":
     asyncio.run(init_database())
@@ -0,0 +1,164 @@
+"""
+Семантическая оценка ответов по эмбеддингам
+
+Векторы эталонных ответов считаются один раз на вопрос (при старте или
+при первом обращении) и хранятся нормализованной матрицей NumPy. На каждый
+ответ кандидата нужен один запрос эмбеддинга и одно скалярное произведение.
+"""
+
+import asyncio
+import hashlib
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ollama_client import OllamaClient
+
+# (минимальная косинусная близость, оценка) - по убыванию близости
+DEFAULT_THRESHOLDS: Tuple[Tuple[float, int], ...] = ((0.85, 9), (0.7, 7), (0.55, 5))
+DEFAULT_MIN_SCORE = 3
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class SemanticScorer:
+    """Оценка по косинусной близости эмбеддинга ответа к эталонному ответу вопроса"""
+
+    def __init__(
+        self,
+        client: OllamaClient,
+        model: str,
+        thresholds: Sequence[Tuple[float, int]] = DEFAULT_THRESHOLDS,
+        min_score: int = DEFAULT_MIN_SCORE,
+        index_concurrency: int = 4,
+    ):
+        self.client = client
+        # Одновременные запросы эмбеддингов при индексации: очередь клиента ограничена
+        self.index_concurrency = index_concurrency
+        self.model = model
+        self.thresholds = tuple(sorted(thresholds, reverse=True))
+        self.min_score = min_score
+        # question_id -> строка матрицы; хеш эталона, по которому посчитан вектор
+        self._rows: Dict[str, int] = {}
+        self._hashes: Dict[str, str] = {}
+        self._matrix: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def has(self, question_id: str) -> bool:
+        return question_id in self._rows
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Нормализованный эмбеддинг текста"""
+        response = await self.client.embeddings(self.model, text)
+        return self._normalize(np.asarray(response["embedding"], dtype=np.float32))
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def index_questions(self, questions: Iterable[dict]) -> int:
+        """
+        Посчитать векторы эталонных ответов для вопросов, у которых их еще нет
+        (или эталон изменился). Возвращает число посчитанных векторов
+        """
+        pending = [
+            q for q in questions
+            if self._hashes.get(q["id"]) != _text_hash(q["correct_answer"])
+        ]
+        if not pending:
+            return 0
+
+        # Векторы, посчитанные при импорте той же моделью, берем готовыми
+        precomputed = [q for q in pending if q.get("embedding") and q.get("embedding_model") == self.model]
+        if precomputed:
+            self._store(
+                [q["id"] for q in precomputed],
+                [_text_hash(q["correct_answer"]) for q in precomputed],
+                [self._normalize(np.asarray(q["embedding"], dtype=np.float32)) for q in precomputed],
+            )
+            pending = [q for q in pending if not (q.get("embedding") and q.get("embedding_model") == self.model)]
+
+        limiter = asyncio.Semaphore(self.index_concurrency)
+
+        async def embed_limited(text: str) -> np.ndarray:
+            async with limiter:
+                return await self.embed(text)
+
+        vectors = await asyncio.gather(*(embed_limited(q["correct_answer"]) for q in pending))
+        self._store([q["id"] for q in pending], [_text_hash(q["correct_answer"]) for q in pending], vectors)
+        return len(pending)
+
+    async def add_question(self, question: dict) -> None:
+        """Посчитать вектор для нового или измененного вопроса"""
+        await self.index_questions([question])
+
+    def _store(self, question_ids: List[str], hashes: List[str], vectors: List[np.ndarray]) -> None:
+        if not question_ids:
+            return
+        new_rows = []
+        for question_id, text_hash, vector in zip(question_ids, hashes, vectors):
+            row = self._rows.get(question_id)
+            if row is not None:
+                self._matrix[row] = vector
+            else:
+                self._rows[question_id] = len(self._rows)
+                new_rows.append(vector)
+            self._hashes[question_id] = text_hash
+        if new_rows:
+            stacked = np.vstack(new_rows)
+            self._matrix = stacked if self._matrix is None else np.vstack([self._matrix, stacked])
+
+    def similarity_to_score(self, similarity: float) -> int:
+        for threshold, score in self.thresholds:
+            if similarity >= threshold:
+                return score
+        return self.min_score
+
+    def similarities(self, question_ids: Sequence[str], answer_vectors: np.ndarray) -> np.ndarray:
+        """Косинусная близость ответов к эталонам (векторно, по строкам)"""
+        rows = np.fromiter((self._rows[q] for q in question_ids), dtype=np.intp, count=len(question_ids))
+        return np.einsum("ij,ij->i", self._matrix[rows], answer_vectors)
+
+    async def score(self, question: dict, answer: str) -> int:
+        """Оценка ответа (вектор эталона считается при первом обращении к вопросу)"""
+        return (await self.score_many([(question, answer)]))[0]
+
+    async def score_many(self, items: Sequence[Tuple[dict, str]]) -> List[int]:
+        """Оценить несколько ответов: эмбеддинги запрашиваются параллельно, близость считается одной операцией"""
+        missing = {q["id"]: q for q, _ in items if not self.has(q["id"])}
+        if missing:
+            await self.index_questions(missing.values())
+        answer_vectors = await asyncio.gather(*(self.embed(answer) for _, answer in items))
+        similarities = self.similarities([q["id"] for q, _ in items], np.vstack(answer_vectors))
+        return [self.similarity_to_score(float(s)) for s in similarities]
+
+    def save(self, path: str) -> None:
+        """Сохранить векторы на диск, чтобы не пересчитывать их при перезапуске"""
+        ids = sorted(self._rows, key=self._rows.get)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                model=np.array(self.model),
+                ids=np.array(ids),
+                hashes=np.array([self._hashes[i] for i in ids]),
+                matrix=self._matrix if self._matrix is not None else np.zeros((0, 0), dtype=np.float32),
+            )
+
+    def load(self, path: str) -> int:
+        """Загрузить векторы, сохраненные для той же модели. Возвращает число векторов"""
+        if not os.path.exists(path):
+            return 0
+        with np.load(path) as data:
+            if str(data["model"]) != self.model or not len(data["ids"]):
+                return 0
+            ids = [str(i) for i in data["ids"]]
+            self._rows = {question_id: row for row, question_id in enumerate(ids)}
+            self._hashes = dict(zip(ids, (str(h) for h in data["hashes"])))
+            self._matrix = data["matrix"].astype(np.float32)
+        return len(ids)
@@ -0,0 +1,156 @@
+"""
+Контекст модели (KV cache) для оценок в рамках одного интервью
+
+Без контекста каждая оценка заново отправляет системный промпт с
+правилами, и Ollama заново считает по нему prompt eval. /api/generate
+возвращает context - токены всего диалога; если передать его в
+следующий запрос, Ollama продолжит с уже обработанного префикса
+(пока он лежит в кеше слота), а досчитает только новый вопрос с ответом.
+
+Хранилище держит последний context каждого интервью в компактном
+array('i') (4 байта на токен вместо ~36 у списка int) и ограничивает
+память: число сессий, токены на сессию (context вместе с новым промптом
+должен помещаться в num_ctx модели, иначе Ollama обрежет начало) и
+токены суммарно. При превышении context сессии отбрасывается, и
+следующая оценка начинается с полного промпта.
+
+KV cache у Ollama только в OLLAMA_NUM_PARALLEL слотах. Если одновременных
+интервью больше, слот успевает занять другая сессия, и переданный
+context считается заново целиком - это дороже полного промпта. Такой
+промах видно по prompt_eval_count не меньше длины context. Хранилище
+следит за долей попаданий (EWMA) и, если она ниже min_hit_rate,
+перестает отдавать context, пробуя его лишь раз в probe_interval оценок.
+
+Экономию считаем по prompt_eval_count и prompt_eval_duration из ответов
+Ollama: средние на запрос с полным промптом и на запрос с контекстом.
+"""
+
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ollama_client import OllamaGenerateResponse
+
+
+class _PromptEvalStats:
+    __slots__ = ("requests", "tokens", "seconds")
+
+    def __init__(self):
+        self.requests = 0
+        self.tokens = 0
+        self.seconds = 0.0
+
+    def observe(self, response: OllamaGenerateResponse) -> None:
+        self.requests += 1
+        self.tokens += response.prompt_eval_count or 0
+        self.seconds += (response.prompt_eval_duration or 0) / 1e9
+
+    def average(self) -> Tuple[float, float]:
+        if not self.requests:
+            return 0.0, 0.0
+        return self.tokens / self.requests, self.seconds / self.requests
+
+
+class SessionContextStore:
+    """LRU хранилище context по ключу сессии (id интервью)"""
+
+    # Вес последнего наблюдения в доле попаданий в KV cache
+    HIT_RATE_ALPHA = 0.1
+
+    def __init__(self, max_sessions: int = 1000, max_tokens_per_session: int = 1536,
+                 max_total_tokens: int = 1_000_000, min_hit_rate: float = 0.5, probe_interval: int = 20):
+        self.max_sessions = max_sessions
+        self.max_tokens_per_session = max_tokens_per_session
+        self.max_total_tokens = max_total_tokens
+        self.min_hit_rate = min_hit_rate
+        self.probe_interval = probe_interval
+        # сессия -> (модель, context)
+        self._contexts: "OrderedDict[str, Tuple[str, array]]" = OrderedDict()
+        self._total_tokens = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.overflows = 0
+        self.kv_hit_rate = 1.0
+        self.kv_misses = 0
+        self.gated = 0
+        self._fresh = _PromptEvalStats()
+        self._reused = _PromptEvalStats()
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    def get(self, session_key: str, model: str) -> Optional[List[int]]:
+        """Context сессии для модели model или None (тогда нужен полный промпт)"""
+        entry = self._contexts.get(session_key)
+        if entry is None or entry[0] != model:
+            self.misses += 1
+            return None
+        self._contexts.move_to_end(session_key)
+        if self.kv_hit_rate < self.min_hit_rate:
+            self.gated += 1
+            if self.gated % self.probe_interval:
+                return None
+        self.hits += 1
+        return entry[1].tolist()
+
+    def set(self, session_key: str, model: str, context: Optional[List[int]]) -> None:
+        """Запомнить context из ответа модели; слишком длинный context сбрасывает сессию"""
+        self.drop(session_key)
+        if not context:
+            return
+        if len(context) > self.max_tokens_per_session:
+            self.overflows += 1
+            return
+        self._contexts[session_key] = (model, array("i", context))
+        self._total_tokens += len(context)
+        while len(self._contexts) > self.max_sessions or self._total_tokens > self.max_total_tokens:
+            _, (_, evicted) = self._contexts.popitem(last=False)
+            self._total_tokens -= len(evicted)
+            self.evictions += 1
+
+    def drop(self, session_key: str) -> None:
+        entry = self._contexts.pop(session_key, None)
+        if entry is not None:
+            self._total_tokens -= len(entry[1])
+
+    def record(self, session_key: str, model: str, sent_context: Optional[List[int]],
+               response: OllamaGenerateResponse) -> None:
+        """Учесть ответ модели на запрос с sent_context (или с полным промптом) и запомнить новый context"""
+        if sent_context is None:
+            self._fresh.observe(response)
+        else:
+            self._reused.observe(response)
+            hit = (response.prompt_eval_count or 0) < len(sent_context)
+            if not hit:
+                self.kv_misses += 1
+            self.kv_hit_rate += self.HIT_RATE_ALPHA * ((1.0 if hit else 0.0) - self.kv_hit_rate)
+        self.set(session_key, model, response.context)
+
+    def stats(self) -> Dict[str, Any]:
+        fresh_tokens, fresh_seconds = self._fresh.average()
+        reused_tokens, reused_seconds = self._reused.average()
+        # Экономия оценивается только когда есть с чем сравнить
+        compared = self._fresh.requests and self._reused.requests
+        return {
+            "sessions": len(self._contexts),
+            "tokens": self._total_tokens,
+            "memory_bytes": self._total_tokens * array("i").itemsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "overflows": self.overflows,
+            "kv_hit_rate": round(self.kv_hit_rate, 3),
+            "kv_misses": self.kv_misses,
+            "gated": self.gated,
+            "fresh_requests": self._fresh.requests,
+            "reused_requests": self._reused.requests,
+            "avg_prompt_tokens_fresh": round(fresh_tokens, 1),
+            "avg_prompt_tokens_reused": round(reused_tokens, 1),
+            "avg_prompt_eval_seconds_fresh": round(fresh_seconds, 4),
+            "avg_prompt_eval_seconds_reused": round(reused_seconds, 4),
+            "prompt_tokens_saved": round((fresh_tokens - reused_tokens) * self._reused.requests) if compared else 0,
+            "prompt_eval_seconds_saved": (
+                round((fresh_seconds - reused_seconds) * self._reused.requests, 3) if compared else 0.0
+            ),
+        }
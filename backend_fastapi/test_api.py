@@ -1,5 +1,6 @@
 import requests
 import json
+import time
 
 # Базовый URL API
 BASE_URL = "http://localhost:8000"
@@ -64,6 +65,21 @@ def test_end_interview(interview_id):
     result = response.json()
     print(f"Response: {json.dumps(result, indent=2, ensure_ascii=False)}")
     print()
+    return result.get("report_job_id") if response.status_code == 200 else None
+
+def test_interview_report(job_id, timeout=60):
+    """Тест итогового отчета: опрос задания до готовности"""
+    print("=== Тест итогового отчета ===")
+    deadline = time.time() + timeout
+    while True:
+        response = requests.get(f"{BASE_URL}/api/interview/report", params={"job_id": job_id})
+        result = response.json()
+        if response.status_code != 200 or result["status"] in ("done", "failed") or time.time() > deadline:
+            break
+        time.sleep(1)
+    print(f"Status: {response.status_code}")
+    print(f"Response: {json.dumps(result, indent=2, ensure_ascii=False)}")
+    print()
 
 def main():
     """Основная функция тестирования"""
@@ -91,7 +107,11 @@ def main():
             test_submit_answer(interview_id, "q2")
             
             # Тест 7: Завершение интервью
-            test_end_interview(interview_id)
+            job_id = test_end_interview(interview_id)
+            
+            # Тест 8: Итоговый отчет
+            if job_id:
+                test_interview_report(job_id)
     
     print("✅ Тестирование завершено!")
 
@@ -0,0 +1,38 @@
+import asyncio
+
+from answer_stats import SCOPE_ALL, AnswerStatsStore
+
+
+def test_histogram_counts_values_per_bucket():
+    store = AnswerStatsStore()
+    for time_spent in (3, 5, 7, 45, 1000):
+        store.record_answer("javascript", "q1", score=8, time_spent=time_spent)
+
+    histogram = store.metric(SCOPE_ALL, "", "time_spent")["histogram"]
+    assert histogram[0] == {"gt": "-Inf", "le": 5, "count": 2}
+    assert histogram[1] == {"gt": 5, "le": 10, "count": 1}
+    assert histogram[3] == {"gt": 30, "le": 60, "count": 1}
+    assert histogram[-1] == {"gt": 600, "le": "+Inf", "count": 1}
+    assert sum(bucket["count"] for bucket in histogram) == 5
+
+
+def test_flush_merges_counters_of_all_workers(tmp_path):
+    async def scenario():
+        db_path = str(tmp_path / "answer_stats.db")
+        first, second = AnswerStatsStore(db_path), AnswerStatsStore(db_path)
+        first.record_answer("javascript", "q1", score=8, time_spent=10)
+        second.record_answer("javascript", "q1", score=4, time_spent=20)
+        assert second.question("q1")["answers"] == 1
+
+        assert await first.flush() > 0
+        await second.flush()
+        # Второй воркер видит и свой прирост, и записанный первым
+        assert second.question("q1")["answers"] == 2
+        assert second.question("q1")["score"]["mean"] == 6
+        # Повторный flush без новых ответов ничего не добавляет
+        assert await first.flush() == 0
+        assert first.question("q1")["answers"] == 2
+        await first.close()
+        await second.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+
+import config
+import main
+from models import AnswerRequest
+
+QUESTION = {"id": "q1", "text": "Что такое замыкание?", "correct_answer": "Функция с окружением"}
+TOKENS = ["Оценка: 8\n", "Комментарий: ", "верно"]
+
+
+class StreamingOllama:
+    def __init__(self):
+        self.finished = asyncio.Event()
+
+    def admission_check(self, priority=None, pending=0):
+        pass
+
+    async def generate_stream(self, request, session_key=None):
+        for text in TOKENS:
+            await asyncio.sleep(0)
+            yield SimpleNamespace(response=text, done=False)
+        self.finished.set()
+
+
+def test_answer_is_recorded_when_client_leaves_mid_stream(monkeypatch):
+    async def scenario():
+        recorded = []
+
+        async def get_answer_context(request, http_request):
+            return SimpleNamespace(id=request.interview_id), QUESTION
+
+        async def record_answer(http_request, session, request, feedback, upcoming=None):
+            recorded.append(feedback.score)
+
+        monkeypatch.setattr(config, "OLLAMA_FEEDBACK_ENABLED", True)
+        monkeypatch.setattr(main, "get_answer_context", get_answer_context)
+        monkeypatch.setattr(main, "prefetch_next_questions", lambda session: None)
+        monkeypatch.setattr(main, "record_answer", record_answer)
+        state = SimpleNamespace(ollama=StreamingOllama(), feedback_cache=None, session_contexts=None,
+                                evaluation_batcher=None, model_warmer=None)
+        http_request = SimpleNamespace(app=SimpleNamespace(state=state))
+        request = AnswerRequest(interview_id="i1", question_id="q1", answer="ответ", time_spent=10)
+
+        response = await main.submit_answer_stream(request, http_request)
+        stream = response.body_iterator
+        assert (await stream.__anext__()).startswith("event: token")
+        # Клиент закрыл соединение после первого фрагмента
+        await stream.aclose()
+
+        await asyncio.wait_for(asyncio.gather(*main.background_tasks), 1)
+        assert recorded == [8]
+
+    asyncio.run(scenario())
@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from batching import EvaluationBatcher
+
+
+class HangingClient:
+    """Клиент, у которого генерация не завершается до отмены"""
+
+    def admission_check(self, priority=None, pending=0):
+        pass
+
+    async def generate(self, request, session_key=None):
+        await asyncio.Event().wait()
+
+
+class ScriptedClient:
+    """Клиент, который оценивает ответ по его тексту и запоминает порядок моделей"""
+
+    def __init__(self):
+        self.models = []
+
+    def admission_check(self, priority=None, pending=0):
+        pass
+
+    async def generate(self, request, session_key=None):
+        self.models.append(request.model)
+        await asyncio.sleep(0)
+        if "ошибка" in request.prompt:
+            raise RuntimeError("Ollama недоступна")
+        return SimpleNamespace(response="Оценка: 8\nКомментарий: хорошо", context=None)
+
+
+def test_jobs_in_window_form_one_batch_grouped_by_model():
+    async def scenario():
+        client = ScriptedClient()
+        batcher = EvaluationBatcher(client, max_batch_size=8, max_wait=0.05, max_parallel=1)
+        await batcher.start()
+        results = await asyncio.gather(*(
+            batcher.submit(model, "question", "reference", "answer")
+            for model in ("a", "b", "a", "b")
+        ))
+        await batcher.close()
+
+        assert [result.score for result in results] == [8, 8, 8, 8]
+        assert client.models == ["a", "a", "b", "b"]
+        assert (batcher.batches_total, batcher.jobs_total, batcher.pending) == (1, 4, 0)
+
+    asyncio.run(scenario())
+
+
+def test_failed_job_does_not_fail_the_rest_of_batch():
+    async def scenario():
+        batcher = EvaluationBatcher(ScriptedClient(), max_batch_size=8, max_wait=0.05)
+        await batcher.start()
+        results = await asyncio.gather(
+            batcher.submit("model", "question", "reference", "ошибка"),
+            batcher.submit("model", "question", "reference", "answer"),
+            return_exceptions=True,
+        )
+        await batcher.close()
+
+        assert isinstance(results[0], RuntimeError)
+        assert results[1].score == 8
+        assert batcher.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_close_fails_jobs_collected_into_batch():
+    async def scenario():
+        # Окно сбора больше времени теста: оценка остается в локальной пачке сборщика
+        batcher = EvaluationBatcher(HangingClient(), max_batch_size=8, max_wait=60)
+        await batcher.start()
+        submitted = asyncio.create_task(batcher.submit("model", "question", "reference", "answer"))
+        await asyncio.sleep(0.01)
+        assert batcher._queue.empty()
+
+        await batcher.close()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(submitted, 1)
+        assert batcher.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_close_fails_jobs_of_running_batch():
+    async def scenario():
+        batcher = EvaluationBatcher(HangingClient(), max_batch_size=1, max_wait=0)
+        await batcher.start()
+        submitted = asyncio.create_task(batcher.submit("model", "question", "reference", "answer"))
+        await asyncio.sleep(0.01)
+        assert batcher._dispatches
+
+        await batcher.close()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(submitted, 1)
+
+    asyncio.run(scenario())
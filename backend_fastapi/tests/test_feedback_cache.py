@@ -0,0 +1,129 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import feedback_cache
+from evaluation import AnswerEvaluation
+from feedback_cache import FeedbackCache
+
+EVALUATION = AnswerEvaluation(score=8, comment="Хороший ответ", suggestions=["Приведите пример"])
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def frozen_clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(feedback_cache, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+def disk_keys(db_path: str) -> set:
+    with sqlite3.connect(db_path) as db:
+        return {row[0] for row in db.execute("SELECT question_id FROM feedback_cache")}
+
+
+def test_normalized_answers_share_entry_and_lru_evicts_oldest():
+    async def scenario():
+        cache = FeedbackCache("v1", max_entries=2)
+        await cache.set("q1", "model", "Замыкание - это функция!", EVALUATION)
+        assert await cache.get("q1", "model", "замыкание это   функция") == EVALUATION
+
+        await cache.set("q2", "model", "ответ", EVALUATION)
+        # q1 использован последним: при переполнении вытесняется q2
+        assert await cache.get("q1", "model", "замыкание это функция") == EVALUATION
+        await cache.set("q3", "model", "ответ", EVALUATION)
+
+        assert await cache.get("q2", "model", "ответ") is None
+        assert await cache.get("q1", "model", "замыкание это функция") == EVALUATION
+        stats = cache.stats()
+        assert (stats["size"], stats["evictions"], stats["memory_hits"], stats["misses"]) == (2, 1, 3, 1)
+
+    asyncio.run(scenario())
+
+
+def test_expired_entry_is_a_miss_in_memory_and_on_disk(tmp_path, monkeypatch):
+    async def scenario():
+        clock = frozen_clock(monkeypatch)
+        cache = FeedbackCache("v1", ttl=10, db_path=str(tmp_path / "feedback.db"))
+        await cache.set("q1", "model", "ответ", EVALUATION)
+
+        clock.now += 9
+        assert await cache.get("q1", "model", "ответ") == EVALUATION
+        clock.now += 2
+        assert await cache.get("q1", "model", "ответ") is None
+        assert cache.stats()["expirations"] == 1
+        assert cache.disk_hits == 0
+        cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    async def scenario():
+        db_path = str(tmp_path / "feedback.db")
+        first = FeedbackCache("v1", db_path=db_path)
+        await first.set("q1", "model", "ответ", EVALUATION)
+
+        # Другой воркер (или перезапуск): в памяти пусто, оценка берется с диска
+        second = FeedbackCache("v1", db_path=db_path)
+        assert await second.get("q1", "model", "ответ") == EVALUATION
+        assert await second.get("q1", "model", "ответ") == EVALUATION
+        assert (second.disk_hits, second.memory_hits) == (1, 1)
+
+        # Новая версия промпта не видит старых оценок
+        other_version = FeedbackCache("v2", db_path=db_path)
+        assert await other_version.get("q1", "model", "ответ") is None
+        for cache in (first, second, other_version):
+            cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_by_question_and_model(tmp_path):
+    async def scenario():
+        db_path = str(tmp_path / "feedback.db")
+        cache = FeedbackCache("v1", db_path=db_path)
+        for question_id, model in (("q1", "m1"), ("q1", "m2"), ("q2", "m1"), ("q3", "m2")):
+            await cache.set(question_id, model, "ответ", EVALUATION)
+
+        # По записи в памяти и на диске
+        assert await cache.invalidate(question_id="q1") == 4
+        assert await cache.invalidate(question_id="q2", model="m2") == 0
+        assert await cache.invalidate(model="m2") == 2
+        assert await cache.get("q1", "m1", "ответ") is None
+        assert await cache.get("q2", "m1", "ответ") == EVALUATION
+        assert disk_keys(db_path) == {"q2"}
+
+        assert await cache.invalidate() == 2
+        assert cache.stats()["size"] == 0 and disk_keys(db_path) == set()
+        cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_disk_prune_drops_expired_then_oldest_rows(tmp_path, monkeypatch):
+    async def scenario():
+        clock = frozen_clock(monkeypatch)
+        db_path = str(tmp_path / "feedback.db")
+        cache = FeedbackCache("v1", ttl=10, db_path=db_path, max_disk_entries=2)
+        cache.DISK_PRUNE_EVERY = 4
+
+        await cache.set("expired", "model", "ответ", EVALUATION)
+        clock.now += 20
+        for question_id in ("oldest", "newer", "newest"):
+            clock.now += 1
+            await cache.set(question_id, "model", "ответ", EVALUATION)
+            if question_id == "newer":
+                assert len(disk_keys(db_path)) == 3
+
+        # Четвертая запись: просроченная строка удалена, из живых остались две новейшие
+        assert disk_keys(db_path) == {"newer", "newest"}
+        cache.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+from scripts.import_questions import QuestionImporter, content_hash, normalize_question
+
+
+class FakeQuestions:
+    """Таблица questions с одной существующей строкой"""
+
+    def __init__(self, row):
+        self.row = row
+        self.updates = []
+
+    async def find_many(self, where):
+        return [self.row] if self.row.contentHash in where["contentHash"]["in"] else []
+
+    async def create_many(self, data, skip_duplicates=False):
+        return len(data)
+
+    async def update(self, where, data):
+        self.updates.append(data)
+
+
+def existing_row(question: dict, **changes):
+    fields = dict(question, contentHash=content_hash(question), id="q1",
+                  embedding=[0.1, 0.2], embeddingModel="nomic-embed-text")
+    fields.update(changes)
+    return SimpleNamespace(**fields)
+
+
+def import_one(table: FakeQuestions, raw: dict):
+    importer = QuestionImporter(SimpleNamespace(question=table))
+    return asyncio.run(importer.run([raw], progress=False))
+
+
+RAW = {"text": "Что такое замыкание?", "category": "javascript", "correctAnswer": "Функция с доступом к внешней области"}
+
+
+def test_changed_reference_answer_clears_stale_embedding():
+    table = FakeQuestions(existing_row(normalize_question(RAW), correctAnswer="Старый эталон"))
+    stats = import_one(table, RAW)
+    assert stats.updated == 1
+    assert table.updates[0]["embedding"] == {"set": []}
+    assert table.updates[0]["embeddingModel"] is None
+
+
+def test_unchanged_reference_answer_keeps_embedding():
+    table = FakeQuestions(existing_row(normalize_question(RAW), difficulty="easy"))
+    import_one(table, RAW)
+    assert "embedding" not in table.updates[0]
+    assert "embeddingModel" not in table.updates[0]
@@ -0,0 +1,61 @@
+import asyncio
+import time
+from datetime import datetime
+
+from interview_reports import STATUS_DONE, STATUS_RUNNING, InterviewReportPipeline, ReportJob
+from models import InterviewSession
+
+
+def make_session(interview_id: str) -> InterviewSession:
+    return InterviewSession(id=interview_id, topic="javascript", difficulty="easy", current_question=3,
+                            total_questions=2, score=14, start_time=datetime.now(), is_active=False)
+
+
+class FakeStore:
+    """Ответы, которые другой воркер запишет в базу позже"""
+
+    def __init__(self):
+        self.rows = []
+        self.reports = {}
+
+    async def answers(self, interview_id):
+        return list(self.rows)
+
+    async def save_report(self, interview_id, report):
+        self.reports[interview_id] = report
+
+
+def answer_row(question_id: str, score: int) -> dict:
+    return {"question_id": question_id, "user_answer": "ответ", "score": score, "feedback": None, "time_spent": 5}
+
+
+def test_report_waits_for_answers_flushed_by_other_workers():
+    async def scenario():
+        store = FakeStore()
+        store.rows.append(answer_row("q1", 8))
+        pipeline = InterviewReportPipeline(store, lambda question_id: None, answers_delay=0.05)
+        await pipeline.start()
+        job = pipeline.submit(make_session("i1"))
+        await asyncio.sleep(0.01)
+        # Последний ответ дошел до базы уже после постановки задания
+        store.rows.append(answer_row("q2", 6))
+
+        while not job.is_finished:
+            await asyncio.sleep(0.01)
+        await pipeline.close()
+        assert job.status == STATUS_DONE
+        assert [answer["question_id"] for answer in job.report["answers"]] == ["q1", "q2"]
+
+    asyncio.run(scenario())
+
+
+def test_expire_skips_running_job_at_head():
+    pipeline = InterviewReportPipeline(FakeStore(), lambda question_id: None, job_ttl=60)
+    running, finished = ReportJob(make_session("i1")), ReportJob(make_session("i2"))
+    running.status = STATUS_RUNNING
+    finished.status = STATUS_DONE
+    finished.finished = time.monotonic() - 120
+    pipeline._jobs.update({running.id: running, finished.id: finished})
+
+    pipeline._expire()
+    assert list(pipeline._jobs) == ["i1"]
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+from llm_queue import LLMJobQueue, LLMOverloaded, Priority, llm_priority
+from ollama_client import OllamaClient, OllamaGenerateRequest
+
+
+RESPONSE = "Подсказка: вспомните про область видимости"
+
+
+def make_request(prompt: str) -> OllamaGenerateRequest:
+    return OllamaGenerateRequest(model="model", prompt=prompt)
+
+
+class RecordingClient(OllamaClient):
+    """OllamaClient без HTTP: запоминает порядок генераций, первая ждет gate"""
+
+    def __init__(self, **kwargs):
+        super().__init__(max_concurrency=1, **kwargs)
+        self.order = []
+        self.gate = asyncio.Event()
+
+    async def _make_request(self, method, endpoint, data=None):
+        self.order.append(data["prompt"])
+        if len(self.order) == 1:
+            await self.gate.wait()
+        return {"model": data["model"], "created_at": "", "response": RESPONSE, "done": True}
+
+
+async def submit(client: OllamaClient, prompt: str, priority: Priority = Priority.INTERACTIVE) -> asyncio.Task:
+    with llm_priority(priority):
+        task = asyncio.create_task(client.generate(make_request(prompt)))
+    await settle()
+    return task
+
+
+async def settle():
+    """Дать созданным задачам дойти до очереди (generate -> задача генерации -> acquire)"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_coalesced_request_is_promoted_to_joining_priority():
+    async def scenario():
+        client = RecordingClient()
+        tasks = [await submit(client, "busy")]
+        tasks += [await submit(client, f"early{i}") for i in range(2)]
+        tasks.append(await submit(client, "hint", Priority.BACKGROUND))
+        # Интерактивный вызов присоединяется к фоновому запросу, стоящему в очереди
+        tasks.append(await submit(client, "hint"))
+        tasks += [await submit(client, f"late{i}") for i in range(3)]
+        assert client.queue.priorities[Priority.BACKGROUND].waiting == 0
+        assert client.queue.priorities[Priority.INTERACTIVE].waiting == 6
+
+        client.gate.set()
+        await asyncio.gather(*tasks)
+        assert client.order == ["busy", "early0", "early1", "hint", "late0", "late1", "late2"]
+        assert client.stats.coalesced_generate == 1
+        assert client.queue.waiting == 0
+
+    asyncio.run(scenario())
+
+
+def test_background_request_waits_behind_interactive():
+    async def scenario():
+        client = RecordingClient()
+        tasks = [await submit(client, "busy")]
+        tasks.append(await submit(client, "hint", Priority.BACKGROUND))
+        tasks += [await submit(client, f"answer{i}") for i in range(2)]
+
+        client.gate.set()
+        await asyncio.gather(*tasks)
+        assert client.order == ["busy", "answer0", "answer1", "hint"]
+
+    asyncio.run(scenario())
+
+
+async def queue_order(queue: LLMJobQueue, requests) -> list:
+    """Поставить (имя, приоритет) в очередь занятого слота и вернуть порядок допуска"""
+    order = []
+
+    async def wait(name, priority):
+        await queue.acquire(priority)
+        order.append(name)
+        queue.release()
+
+    tasks = []
+    for name, priority in requests:
+        tasks.append(asyncio.create_task(wait(name, priority)))
+        await asyncio.sleep(0)
+    queue.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_queue_admits_by_priority_then_arrival():
+    async def scenario():
+        queue = LLMJobQueue(1)
+        await queue.acquire(Priority.INTERACTIVE)
+        order = await queue_order(queue, [
+            ("hint", Priority.BACKGROUND),
+            ("report", Priority.REPORT),
+            ("answer0", Priority.INTERACTIVE),
+            ("answer1", Priority.INTERACTIVE),
+        ])
+        assert order == ["answer0", "answer1", "report", "hint"]
+        assert queue.waiting == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_with_retry_after():
+    async def scenario():
+        queue = LLMJobQueue(1, max_waiting=(1, 0, 0))
+        await queue.acquire(Priority.INTERACTIVE)
+        waiter = asyncio.create_task(queue.acquire(Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+
+        with pytest.raises(LLMOverloaded) as rejected:
+            await queue.acquire(Priority.INTERACTIVE)
+        assert rejected.value.retry_after >= LLMJobQueue.MIN_RETRY_AFTER
+        assert queue.priorities[Priority.INTERACTIVE].rejected == 1
+        # Ожидающие в пачке (pending) считаются очередью
+        with pytest.raises(LLMOverloaded):
+            LLMJobQueue(1, max_waiting=(1, 0, 0)).check(Priority.INTERACTIVE, pending=1)
+        # У фоновой очереди лимита нет
+        background = asyncio.create_task(queue.acquire(Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        assert queue.priorities[Priority.BACKGROUND].waiting == 1
+
+        queue.release()
+        await waiter
+        queue.release()
+        await background
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_passes_slot_on():
+    async def scenario():
+        queue = LLMJobQueue(1)
+        await queue.acquire(Priority.INTERACTIVE)
+        first = asyncio.create_task(queue.acquire(Priority.INTERACTIVE))
+        second = asyncio.create_task(queue.acquire(Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+
+        queue.release()
+        await asyncio.wait_for(second, 1)
+        assert first.cancelled()
+        assert queue.waiting == 0
+        queue.release()
+        assert queue._free == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+
+from model_warmer import STATE_WARM, STATE_WARMING, ModelWarmer
+
+
+class PingClient:
+    """Клиент, у которого пинг ждет release и сообщает load_duration"""
+
+    base_url = "http://node"
+
+    def __init__(self):
+        self.released = asyncio.Event()
+        self.pings = 0
+
+    async def generate(self, request):
+        self.pings += 1
+        await self.released.wait()
+        return SimpleNamespace(load_duration=1_000_000)
+
+
+def test_evicted_model_is_rewarmed_before_taking_traffic():
+    async def scenario():
+        client = PingClient()
+        warmer = ModelWarmer(client, ["model"], load_threshold=1.0)
+        state = warmer.nodes[client.base_url]["model"]
+        warmer._set_state(state, STATE_WARM)
+
+        # Генерация сообщила холодную загрузку у модели, считавшейся прогретой
+        warmer.observe_generation(client.base_url, {"model": "model", "load_duration": 5_000_000_000})
+        assert state.evictions == 1
+        assert state.state == STATE_WARMING
+        assert not warmer.is_warm("model")
+
+        await asyncio.sleep(0)
+        assert client.pings == 1
+        client.released.set()
+        await warmer.wait_warm("model", timeout=1)
+        assert state.state == STATE_WARM
+        await warmer.close()
+
+    asyncio.run(scenario())
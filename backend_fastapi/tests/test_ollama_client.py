@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+from ollama_client import NDJSONDecoder
+from tests.test_llm_queue import RESPONSE, RecordingClient, settle, submit
+
+
+def test_identical_concurrent_requests_share_one_generation():
+    async def scenario():
+        client = RecordingClient()
+        tasks = [await submit(client, "busy")]
+        tasks += [await submit(client, "same") for _ in range(3)]
+        client.gate.set()
+        responses = await asyncio.gather(*tasks)
+
+        assert client.order == ["busy", "same"]
+        assert client.stats.coalesced_generate == 2
+        assert len({id(response) for response in responses[1:]}) == 1
+        assert not client._inflight_generate
+
+    asyncio.run(scenario())
+
+
+class FailingClient(RecordingClient):
+    async def _make_request(self, method, endpoint, data=None):
+        self.order.append(data["prompt"])
+        await self.gate.wait()
+        raise RuntimeError("Ollama недоступна")
+
+
+def test_coalesced_failure_reaches_every_waiter():
+    async def scenario():
+        client = FailingClient()
+        tasks = [await submit(client, "same") for _ in range(2)]
+        client.gate.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert client.order == ["same"]
+        assert all(isinstance(result, RuntimeError) for result in results)
+        # Следующий такой же запрос идет в Ollama заново, а не получает старую ошибку
+        assert not client._inflight_generate
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_shared_generation():
+    async def scenario():
+        client = RecordingClient()
+        leaving = await submit(client, "same")
+        staying = await submit(client, "same")
+        leaving.cancel()
+        await settle()
+        client.gate.set()
+
+        assert (await asyncio.wait_for(staying, 1)).response == RESPONSE
+        assert leaving.cancelled()
+        assert client.order == ["same"]
+
+    asyncio.run(scenario())
+
+
+def ndjson(*records) -> bytes:
+    return b"".join(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records)
+
+
+def test_ndjson_line_split_across_chunks():
+    data = ndjson({"response": RESPONSE, "done": False})
+    # Разрез внутри многобайтного символа UTF-8
+    cut = data.index("вспомните".encode("utf-8")) + 1
+    decoder = NDJSONDecoder()
+
+    assert decoder.feed(data[:cut]) == []
+    assert decoder.feed(data[cut:-1]) == []
+    assert decoder.feed(data[-1:]) == [{"response": RESPONSE, "done": False}]
+    assert decoder.flush() == []
+
+
+def test_ndjson_several_records_in_one_chunk():
+    records = [{"response": f"t{i}", "done": False} for i in range(3)]
+    data = ndjson(*records, {"response": "", "done": True})
+    decoder = NDJSONDecoder()
+
+    # Конец прошлого куска, три записи и начало следующей
+    assert decoder.feed(data[:5]) == []
+    assert decoder.feed(data[5:-4]) == records
+    assert decoder.feed(data[-4:]) == [{"response": "", "done": True}]
+
+
+def test_ndjson_trailing_line_without_newline_is_flushed():
+    decoder = NDJSONDecoder()
+    data = ndjson({"response": "a", "done": False}) + b"\n" + b'{"response": "", "done": true}'
+
+    assert decoder.feed(data) == [{"response": "a", "done": False}]
+    assert decoder.flush() == [{"response": "", "done": True}]
+    assert decoder.flush() == []
+
+
+def test_ndjson_malformed_line_is_skipped():
+    decoder = NDJSONDecoder()
+    data = b'{"response": "a"}\n{"response": \n{"response": "b"}\n'
+
+    assert decoder.feed(data) == [{"response": "a"}, {"response": "b"}]
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from benchmarks.ollama_stub import StubOllama, fake_evaluation
+from ollama_client import OllamaClientSync, OllamaGenerateRequest, OllamaGenerateResponse, StreamToken
+
+MODEL = "codellama:latest"
+PROMPT = "Что такое замыкание?"
+
+
+@pytest.fixture
+def stub_url():
+    """Заглушка Ollama без задержек в собственном потоке с event loop"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    stub = StubOllama(token_latency=0, prompt_latency=0, load_latency=0)
+    url = asyncio.run_coroutine_threadsafe(stub.start(), loop).result()
+    yield url
+    asyncio.run_coroutine_threadsafe(stub.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def make_request(stream: bool = False) -> OllamaGenerateRequest:
+    return OllamaGenerateRequest(model=MODEL, prompt=PROMPT, stream=stream)
+
+
+def test_generate_reuses_background_loop(stub_url):
+    with OllamaClientSync(stub_url) as client:
+        first = client.generate(make_request())
+        thread = client._thread
+        second = client.generate(make_request())
+
+        assert first.response == second.response == fake_evaluation(PROMPT)
+        assert client._thread is thread and thread.is_alive()
+        assert thread is not threading.current_thread()
+    assert not thread.is_alive()
+
+
+def test_generate_stream_yields_tokens_then_final_record(stub_url):
+    with OllamaClientSync(stub_url) as client:
+        chunks = list(client.generate_stream(make_request(stream=True)))
+
+        assert all(isinstance(chunk, StreamToken) for chunk in chunks[:-1])
+        assert isinstance(chunks[-1], OllamaGenerateResponse) and chunks[-1].done
+        assert "".join(chunk.response for chunk in chunks[:-1]).strip() == fake_evaluation(PROMPT)
+
+        # Прерванный поток закрывается в loop клиента, клиент остается рабочим
+        stream = client.generate_stream(make_request(stream=True))
+        assert isinstance(next(stream), StreamToken)
+        stream.close()
+        assert client.generate(make_request()).response == fake_evaluation(PROMPT)
+
+
+def test_call_from_own_loop_is_rejected(stub_url):
+    with OllamaClientSync(stub_url) as client:
+        async def nested_call():
+            return client.health_check()
+
+        future = asyncio.run_coroutine_threadsafe(nested_call(), client._loop)
+        with pytest.raises(RuntimeError):
+            future.result()
+
+
+def test_client_restarts_loop_after_fork(stub_url, monkeypatch):
+    client = OllamaClientSync(stub_url)
+    client.generate(make_request())
+    parent_loop, parent_thread, parent_client = client._loop, client._thread, client._client
+
+    # Дочерний процесс после fork: тот же объект, другой pid, потока нет
+    parent_pid = os.getpid()
+    monkeypatch.setattr(os, "getpid", lambda: parent_pid + 1)
+    assert client.generate(make_request()).response == fake_evaluation(PROMPT)
+    child_thread = client._thread
+    assert child_thread is not parent_thread
+    assert client._loop is not parent_loop
+
+    client.close()
+    assert not child_thread.is_alive()
+
+    # Поток родителя дочерний процесс не трогает: закрываем его от имени родителя
+    monkeypatch.undo()
+    assert parent_thread.is_alive()
+    asyncio.run_coroutine_threadsafe(parent_client.close(), parent_loop).result()
+    parent_loop.call_soon_threadsafe(parent_loop.stop)
+    parent_thread.join()
+    parent_loop.close()
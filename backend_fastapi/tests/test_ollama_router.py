@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from llm_queue import LLMOverloaded, Priority
+from ollama_client import OllamaGenerateRequest
+from ollama_router import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker, OllamaRouter
+
+REQUEST = OllamaGenerateRequest(model="model", prompt="вопрос")
+
+
+def test_breaker_opens_after_threshold_and_probes_after_timeout():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == BREAKER_CLOSED
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.trips == 1
+
+    # После паузы пропускается пробный запрос; его ошибка сразу открывает выключатель
+    assert breaker.available()
+    assert breaker.state == BREAKER_HALF_OPEN
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.trips == 2
+
+    breaker.available()
+    breaker.record_success()
+    assert (breaker.state, breaker.failures) == (BREAKER_CLOSED, 0)
+
+
+def test_open_breaker_keeps_node_out_of_rotation():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert not breaker.available()
+    assert breaker.state == BREAKER_OPEN
+
+
+def make_router(*generates) -> OllamaRouter:
+    """Роутер, у узлов которого generate заменен на переданные функции"""
+    router = OllamaRouter([f"http://node{i}" for i in range(len(generates))], failure_threshold=2, reset_timeout=60)
+    for node, generate in zip(router.nodes, generates):
+        node.client.generate = generate
+    return router
+
+
+def test_failed_node_is_skipped_and_tripped():
+    async def scenario():
+        calls = []
+
+        async def broken(request, session_key=None):
+            calls.append("broken")
+            raise RuntimeError("connection refused")
+
+        async def healthy(request, session_key=None):
+            calls.append("healthy")
+            return "ok"
+
+        router = make_router(broken, healthy)
+        # Один узел впереди по загрузке: первым выбирается сломанный
+        router.nodes[1].client.stats.in_flight = 1
+        assert await router.generate(REQUEST) == "ok"
+        assert await router.generate(REQUEST) == "ok"
+        assert calls == ["broken", "healthy", "broken", "healthy"]
+        assert router.nodes[0].breaker.state == BREAKER_OPEN
+        assert router.failovers == 2
+
+        # Открытый выключатель: узел больше не выбирается
+        assert await router.generate(REQUEST) == "ok"
+        assert calls[-1:] == ["healthy"] and calls.count("broken") == 2
+
+    asyncio.run(scenario())
+
+
+def test_overloaded_node_does_not_trip_breaker():
+    async def scenario():
+        async def overloaded(request, session_key=None):
+            raise LLMOverloaded(Priority.INTERACTIVE, 3)
+
+        router = make_router(overloaded, overloaded)
+        with pytest.raises(LLMOverloaded):
+            await router.generate(REQUEST)
+        assert all(node.breaker.state == BREAKER_CLOSED for node in router.nodes)
+        assert all(node.breaker.failures == 0 for node in router.nodes)
+
+    asyncio.run(scenario())
+
+
+def test_all_nodes_down_raises_last_error():
+    async def scenario():
+        async def broken(request, session_key=None):
+            raise RuntimeError("connection refused")
+
+        router = make_router(broken)
+        for _ in range(2):
+            with pytest.raises(RuntimeError, match="connection refused"):
+                await router.generate(REQUEST)
+        with pytest.raises(Exception, match="Нет доступных серверов"):
+            await router.generate(REQUEST)
+
+    asyncio.run(scenario())
@@ -0,0 +1,33 @@
+import json
+
+from fastapi.routing import APIRoute
+
+import config
+import main
+from export_openapi import generate_openapi_schema
+
+
+def write_schema(tmp_path, monkeypatch) -> dict:
+    schema = generate_openapi_schema()
+    schema["info"]["title"] = "Из файла"
+    path = tmp_path / "openapi_schema.json"
+    path.write_text(json.dumps(schema), encoding="utf-8")
+    monkeypatch.setattr(config, "OPENAPI_SCHEMA_PATH", str(path))
+    monkeypatch.setattr(main.app, "openapi_schema", None)
+    return schema
+
+
+def test_prebuilt_schema_is_served_when_fingerprint_matches(tmp_path, monkeypatch):
+    write_schema(tmp_path, monkeypatch)
+    schema = main.prebuilt_openapi()
+    assert schema["info"]["title"] == "Из файла"
+    assert main.OPENAPI_FINGERPRINT_FIELD not in schema
+
+
+def test_stale_schema_with_same_paths_is_regenerated(tmp_path, monkeypatch):
+    write_schema(tmp_path, monkeypatch)
+    route = next(route for route in main.app.routes if isinstance(route, APIRoute))
+    # Набор путей не меняется, меняется только описание операции
+    monkeypatch.setattr(route, "description", "Новое описание")
+    schema = main.prebuilt_openapi()
+    assert schema["info"]["title"] == main.app.title
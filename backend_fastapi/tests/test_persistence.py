@@ -0,0 +1,242 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import main
+from models import InterviewSession
+from persistence import STATUS_IN_PROGRESS, MemoryInterviewStore, PrismaInterviewStore
+from question_prefetch import QuestionMaterialPrefetcher
+
+
+def new_session(interview_id: str = "i1") -> InterviewSession:
+    return InterviewSession(
+        id=interview_id, topic="javascript", difficulty="middle", current_question=1,
+        total_questions=10, start_time=datetime.now(timezone.utc),
+    )
+
+
+class FakeInterviews:
+    """Таблица interviews: find_unique и update_many с условием, как в Prisma"""
+
+    def __init__(self, session: InterviewSession):
+        self.row = SimpleNamespace(
+            id=session.id, topic=session.topic, difficulty=session.difficulty,
+            currentQuestion=session.current_question, totalQuestions=session.total_questions,
+            score=float(session.score), startedAt=session.start_time, status=STATUS_IN_PROGRESS,
+            tags=[], currentQuestionId=None, askedQuestionIds=[],
+        )
+        # Запись другого воркера, которая успевает перед нашей
+        self.concurrent_writes = []
+
+    async def find_unique(self, where):
+        return SimpleNamespace(**vars(self.row)) if where["id"] == self.row.id else None
+
+    async def update_many(self, where, data):
+        if self.concurrent_writes:
+            self.concurrent_writes.pop(0)(self.row)
+        if any(getattr(self.row, field) != value for field, value in where.items()):
+            return 0
+        for field, value in data.items():
+            setattr(self.row, field, value["set"] if isinstance(value, dict) else value)
+        return 1
+
+
+def prisma_store(session: InterviewSession) -> PrismaInterviewStore:
+    store = PrismaInterviewStore()
+    store.db = SimpleNamespace(interview=FakeInterviews(session))
+    return store
+
+
+def answered(score: int):
+    def apply(session: InterviewSession) -> None:
+        session.score += score
+        session.current_question += 1
+    return apply
+
+
+def test_prisma_update_retries_after_concurrent_write():
+    async def scenario():
+        store = prisma_store(new_session())
+        table = store.db.interview
+
+        def other_worker(row):
+            row.score += 3
+            row.currentQuestion += 1
+
+        table.concurrent_writes.append(other_worker)
+        session = await store.update("i1", answered(5))
+        assert session.score == 8
+        assert session.current_question == 3
+        assert table.row.score == 8 and table.row.currentQuestion == 3
+        assert store.update_conflicts == 1
+
+    asyncio.run(scenario())
+
+
+def test_prisma_update_ignores_stale_cache():
+    async def scenario():
+        store = prisma_store(new_session())
+        await store.get("i1")
+        store._cache_put(new_session())
+        store.db.interview.row.score = 4.0
+        store.db.interview.row.currentQuestion = 2
+        session = await store.update("i1", answered(5))
+        assert (session.score, session.current_question) == (9, 3)
+        # Кеш обновлен записанным состоянием
+        assert (await store.get("i1")).score == 9
+
+    asyncio.run(scenario())
+
+
+def test_memory_update_applies_concurrent_answers():
+    async def scenario():
+        store = MemoryInterviewStore(sweep_interval=0)
+        await store.create(new_session())
+        await asyncio.gather(store.update("i1", answered(5)), store.update("i1", answered(7)))
+        session = await store.get("i1")
+        assert (session.score, session.current_question) == (12, 3)
+        assert await store.update("missing", answered(1)) is None
+
+    asyncio.run(scenario())
+
+
+class FakeAnswers:
+    """Таблица interview_answers: первые failures вызовов create_many падают"""
+
+    def __init__(self, failures: int = 0, bad_questions=()):
+        self.failures = failures
+        self.bad_questions = set(bad_questions)
+        self.rows = []
+
+    async def create_many(self, data):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection reset")
+        if any(row["questionId"] in self.bad_questions for row in data):
+            raise ValueError("foreign key violation")
+        self.rows.extend(data)
+        return len(data)
+
+    async def create(self, data):
+        if data["questionId"] in self.bad_questions:
+            raise ValueError("foreign key violation")
+        self.rows.append(data)
+
+
+def answers_store(table: FakeAnswers, batch_size: int = 2) -> PrismaInterviewStore:
+    store = PrismaInterviewStore(flush_interval=0.001, flush_batch_size=batch_size)
+    store.db = SimpleNamespace(interviewanswer=table)
+    store._pending_answers = [{"interviewId": "i1", "questionId": f"q{n}"} for n in range(3)]
+    return store
+
+
+def test_flush_requeues_batch_after_transient_error():
+    async def scenario():
+        table = FakeAnswers(failures=2)
+        store = answers_store(table)
+        assert await store.flush() == 0
+        # Пачка вернулась в начало буфера, порядок ответов сохранен
+        assert [row["questionId"] for row in store._pending_answers] == ["q0", "q1", "q2"]
+        assert await store.flush() == 0
+        assert await store.flush() == 3
+        assert [row["questionId"] for row in table.rows] == ["q0", "q1", "q2"]
+        assert store.answers_dropped == 0
+        assert store.flush_retries == 2
+
+    asyncio.run(scenario())
+
+
+def test_flush_drops_batch_after_max_retries():
+    async def scenario():
+        table = FakeAnswers(failures=PrismaInterviewStore.MAX_FLUSH_RETRIES + 1)
+        store = answers_store(table)
+        for _ in range(PrismaInterviewStore.MAX_FLUSH_RETRIES + 1):
+            await store.flush()
+        assert store.answers_dropped == 2
+        assert await store.flush() == 1
+        assert [row["questionId"] for row in table.rows] == ["q2"]
+
+    asyncio.run(scenario())
+
+
+def test_flush_writes_rows_one_by_one_on_data_error(monkeypatch):
+    monkeypatch.setattr("persistence.is_permanent_error", lambda error: isinstance(error, ValueError))
+
+    async def scenario():
+        table = FakeAnswers(bad_questions={"q1"})
+        store = answers_store(table)
+        assert await store.flush() == 2
+        assert [row["questionId"] for row in table.rows] == ["q0", "q2"]
+        assert store.answers_dropped == 1
+        assert store._pending_answers == []
+
+    asyncio.run(scenario())
+
+
+def test_memory_sweep_removes_expired_finished_sessions():
+    async def scenario():
+        store = MemoryInterviewStore(idle_ttl=3600, finished_ttl=0)
+        finished, active = new_session("finished"), new_session("active")
+        finished.is_active = False
+        await store.create(finished)
+        await store.create(active)
+
+        assert await store.sweep() == 1
+        assert list(store.sessions) == ["active"]
+        assert await store.get("finished") is None
+        assert store.stats()["expired"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_memory_expired_session_is_not_returned_before_sweep():
+    async def scenario():
+        store = MemoryInterviewStore(idle_ttl=0)
+        await store.create(new_session())
+        assert await store.get("i1") is None
+        assert not store.sessions
+
+    asyncio.run(scenario())
+
+
+def test_memory_cap_evicts_least_recently_updated_session():
+    async def scenario():
+        store = MemoryInterviewStore(max_sessions=2)
+        for interview_id in ("i1", "i2"):
+            await store.create(new_session(interview_id))
+        await store.update("i1", lambda session: None)
+        await store.create(new_session("i3"))
+
+        assert list(store.sessions) == ["i1", "i3"]
+        assert store.evicted == 1
+
+    asyncio.run(scenario())
+
+
+class FakeContexts:
+    def __init__(self):
+        self.dropped = []
+
+    def drop(self, interview_id):
+        self.dropped.append(interview_id)
+
+
+def test_memory_eviction_releases_session_resources(monkeypatch):
+    async def scenario():
+        contexts = FakeContexts()
+        prefetcher = QuestionMaterialPrefetcher(client=None, model="model")
+        monkeypatch.setattr(main.app.state, "session_contexts", contexts, raising=False)
+        monkeypatch.setattr(main.app.state, "question_prefetcher", prefetcher, raising=False)
+        monkeypatch.setattr(main.app.state, "ollama", None, raising=False)
+        store = MemoryInterviewStore(max_sessions=1, on_evict=main.release_session_resources)
+        await store.create(new_session("i1"))
+        # Слот упреждающей генерации сессии (сама генерация не запускается)
+        prefetcher._slots["i1"] = "q1"
+        prefetcher._wanted["q1"] = 1
+
+        await store.create(new_session("i2"))
+        assert contexts.dropped == ["i1"]
+        assert "i1" not in prefetcher._slots
+        assert not prefetcher._wanted
+
+    asyncio.run(scenario())
@@ -0,0 +1,100 @@
+import asyncio
+from types import SimpleNamespace
+
+from question_prefetch import QuestionMaterialPrefetcher, build_hint_request
+from tests.test_llm_queue import RecordingClient, settle, submit
+
+QUESTION = {
+    "id": "q1",
+    "text": "Что такое замыкание?",
+    "correct_answer": "Функция вместе с лексическим окружением",
+}
+
+
+class GatedClient:
+    """Клиент, который отвечает подсказкой только после release"""
+
+    def __init__(self):
+        self.released = asyncio.Event()
+        self.requests = []
+
+    async def generate(self, request):
+        self.requests.append(request)
+        await self.released.wait()
+        return SimpleNamespace(response="Подсказка: вспомните про область видимости")
+
+
+def test_hint_prompt_has_no_reference_answer():
+    request = build_hint_request("model", QUESTION)
+    assert QUESTION["text"] in request.prompt
+    assert QUESTION["correct_answer"] not in request.prompt
+    assert QUESTION["correct_answer"] not in request.system
+
+
+def test_missing_hint_does_not_block_and_fills_cache():
+    async def scenario():
+        client = GatedClient()
+        prefetcher = QuestionMaterialPrefetcher(client, "model")
+
+        assert await asyncio.wait_for(prefetcher.material_for("s1", QUESTION), 0.1) is None
+        await asyncio.sleep(0)
+        assert len(client.requests) == 1
+
+        # Повторная выдача, пока генерация идет, не запускает вторую
+        assert await prefetcher.material_for("s2", QUESTION) is None
+        client.released.set()
+        await asyncio.sleep(0.01)
+
+        assert await prefetcher.material_for("s3", QUESTION) == "вспомните про область видимости"
+        assert len(client.requests) == 1
+        stats = prefetcher.stats()
+        assert (stats["missed"], stats["ready"]) == (2, 1)
+        await prefetcher.close()
+
+    asyncio.run(scenario())
+
+
+def test_promoted_hint_overtakes_later_interactive_requests():
+    async def scenario():
+        client = RecordingClient()
+        tasks = [await submit(client, "busy")]
+        prefetcher = QuestionMaterialPrefetcher(client, "model", inline_timeout=5)
+        prefetcher.speculate("s1", QUESTION)
+        await settle()
+        tasks += [await submit(client, f"answer{i}") for i in range(2)]
+
+        # Кандидат запросил вопрос: фоновая генерация подсказки поднимается к интерактивным
+        material = asyncio.create_task(prefetcher.material_for("s1", QUESTION))
+        await settle()
+        tasks.append(await submit(client, "answer2"))
+        client.gate.set()
+
+        assert await material == "вспомните про область видимости"
+        await asyncio.gather(*tasks)
+        hint_prompt = build_hint_request("model", QUESTION).prompt
+        assert client.order == ["busy", "answer0", "answer1", hint_prompt, "answer2"]
+        assert prefetcher.stats()["promoted"] == 1
+        await prefetcher.close()
+
+    asyncio.run(scenario())
+
+
+def test_queued_speculative_hint_is_kept_after_question_is_served():
+    async def scenario():
+        client = GatedClient()
+        prefetcher = QuestionMaterialPrefetcher(client, "model", max_parallel=1)
+        other = {**QUESTION, "id": "q2", "text": "Что такое промис?"}
+        # Единственный фоновый слот занят: подсказка q1 ждет семафор
+        prefetcher.speculate("s0", other)
+        prefetcher.speculate("s1", QUESTION)
+        await asyncio.sleep(0)
+
+        assert await prefetcher.material_for("s1", QUESTION) is None
+        client.released.set()
+        await asyncio.sleep(0.01)
+
+        assert prefetcher.stats()["skipped"] == 0
+        assert await prefetcher.material_for("s2", QUESTION) == "вспомните про область видимости"
+        await prefetcher.close()
+
+    asyncio.run(scenario())
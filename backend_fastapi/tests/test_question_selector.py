@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from models import InterviewSession
+from question_bank import QuestionBank
+from question_selector import QuestionSelector
+
+LEVELS = {"j": "junior", "m": "middle", "s": "senior"}
+# Позиции в теме: j0 j1 j2 m0 m1 m2 s0 s1 s2
+BANK = QuestionBank({
+    "javascript": [
+        {"id": f"{prefix}{i}", "text": f"Вопрос {prefix}{i}", "topic": "javascript",
+         "difficulty": level, "correct_answer": "ответ"}
+        for prefix, level in LEVELS.items() for i in range(3)
+    ],
+})
+
+
+def new_session(interview_id: str, total_questions: int = 3, difficulty: str = "middle") -> InterviewSession:
+    return InterviewSession(id=interview_id, topic="javascript", difficulty=difficulty, current_question=1,
+                            total_questions=total_questions, start_time=datetime.now())
+
+
+def run_interview(session: InterviewSession, scores) -> list:
+    """Ответить на вопросы с оценками scores так же, как record_answer; вернуть заданные вопросы"""
+    selector = QuestionSelector(BANK, raise_at=8, lower_below=5)
+    asked = [selector.first_question(session)["id"]]
+    for score in scores:
+        candidates = selector.candidates(session)
+        session.score += score
+        session.current_question += 1
+        question = selector.advance(session, candidates)
+        if question is None:
+            break
+        asked.append(question["id"])
+    return asked
+
+
+def test_order_within_level_starts_at_interview_offset_without_repeats():
+    # Смещение поиска - crc32(id) % 9: 4 для "i3", 5 для "interview-1"
+    assert run_interview(new_session("i3"), [6, 6]) == ["m1", "m2", "m0"]
+    assert run_interview(new_session("interview-1"), [6, 6]) == ["m2", "m0", "m1"]
+
+
+def test_exhausted_level_falls_back_to_nearest_level():
+    asked = run_interview(new_session("i2", total_questions=5), [6, 6, 6, 6])
+    assert asked == ["m0", "m1", "m2", "s0", "s1"]
+    assert len(set(asked)) == len(asked)
+
+
+def test_difficulty_follows_average_score():
+    assert run_interview(new_session("i2", total_questions=2), [9]) == ["m0", "s0"]
+    assert run_interview(new_session("i2", total_questions=2), [2]) == ["m0", "j0"]
+    # Средняя оценка, а не последняя: 9 и 2 дают 5.5 - уровень не меняется
+    assert run_interview(new_session("i2"), [9, 2]) == ["m0", "s0", "m1"]
+
+
+def test_pool_exhaustion_ends_selection():
+    session = new_session("a", total_questions=12)
+    asked = run_interview(session, [6] * 11)
+    assert sorted(asked) == sorted(BANK.snapshot.by_id)
+    assert session.current_question_id is None
+    assert QuestionSelector(BANK).available_count("javascript", []) == 9
@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+import config
+import main
+
+
+class FakeOllama:
+    async def generate(self, request, session_key=None):
+        return SimpleNamespace(response="Оценка: 9\nКомментарий: верно", context=[7, 8, 9])
+
+
+class FakeContexts:
+    def __init__(self, context):
+        self.context = context
+
+    def get(self, interview_id, model):
+        return self.context
+
+    def record(self, interview_id, model, context, response):
+        pass
+
+    def drop(self, interview_id):
+        pass
+
+
+class FakeCache:
+    def __init__(self):
+        self.stored = []
+
+    async def get(self, question_id, model, answer):
+        return None
+
+    async def set(self, question_id, model, answer, evaluation):
+        self.stored.append(question_id)
+
+
+def evaluate(monkeypatch, context) -> FakeCache:
+    monkeypatch.setattr(config, "OLLAMA_FEEDBACK_ENABLED", True)
+    cache = FakeCache()
+    state = SimpleNamespace(
+        ollama=FakeOllama(), feedback_cache=cache, session_contexts=FakeContexts(context),
+        evaluation_batcher=None, model_warmer=None,
+    )
+    request = SimpleNamespace(app=SimpleNamespace(state=state))
+    question = {"id": "q1", "text": "Что такое замыкание?", "correct_answer": "Функция с окружением"}
+    evaluation = asyncio.run(main.llm_evaluate(request, question, "ответ", interview_id="i1"))
+    assert evaluation.score == 9
+    return cache
+
+
+def test_evaluation_with_interview_context_is_not_cached(monkeypatch):
+    assert evaluate(monkeypatch, [1, 2, 3]).stored == []
+
+
+def test_first_evaluation_of_interview_is_cached(monkeypatch):
+    assert evaluate(monkeypatch, None).stored == ["q1"]